@@ -1,6 +1,13 @@
 import requests
+from requests.adapters import HTTPAdapter
 from math import radians, sin, cos, sqrt, atan2
 import json
+import numpy as np
+from scipy.spatial import cKDTree
+from air_quality.cache import TTLCache
+from air_quality.resilience import SingleFlight, CircuitBreaker
+from utils.metrics import metrics
+from utils.utils import EARTH_RADIUS_KM, haversine_distances
 
 class AirQuality:
     """
@@ -11,23 +18,163 @@ class AirQuality:
 
     Attributes:
     - config (dict): Configuration parameters for air quality.
-    - stations_json (list): List of stations with air quality data in JSON format.
+    - stations_json (list): List of stations with air quality data in JSON format, None when preloaded.
+    - station_ids (numpy.ndarray): Station identifiers in the order of stations_json.
+    - station_coords (numpy.ndarray): Station latitudes and longitudes in degrees, shape (n, 2).
+    - stations_tree (scipy.spatial.cKDTree): KD-tree over station positions as 3D unit vectors.
+    - session (requests.Session): Pooled keep-alive HTTP session used for upstream requests.
+    - cache (TTLCache): Per-station cache of air quality indices.
+    - single_flight (SingleFlight): Coalesces concurrent upstream requests for the same station.
+    - breaker (CircuitBreaker): Stops upstream requests while the API is failing.
+    - last_known (dict): Last air quality data fetched for every station, served when the upstream fails.
+    - prefetcher (AirQualityPrefetcher): Optional background refresher, None when disabled.
+    - history (AirQualityHistory): Optional local store of fetched indices, None when disabled.
 
     Methods:
     - calculate_distance: Calculates the distance between two points on a sphere.
     - find_nearest_station: Finds the identifier of the nearest station based on coordinates.
+    - find_nearest_stations: Finds the k nearest stations and/or stations within a radius.
+    - parse_air_quality: Converts an API response into air quality data.
+    - fetch_air_quality: Downloads the air quality index of a station.
+    - request_air_quality: Sends one upstream request guarded by the circuit breaker.
     - get_air_quality: Retrieves air quality data for specified coordinates.
+    - after_fork: Prepares an instance created before fork for use in a worker process.
+    - close: Stops background threads and removes the metrics of an instance that is replaced.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, stations=None):
         """
         Initializes the AirQuality object.
 
         Parameters:
         - config (dict): Configuration parameters for air quality.
+        - stations (tuple): Preloaded (station_ids, station_coords), e.g. from the runtime snapshot.
+          If None the stations are read from sensor_list_data and kept in stations_json.
         """
         self.config = config.air_pollution
-        self.stations_json = json.load(open(self.config.sensor_list_data, "r", encoding="utf-8"))
+        self.stations_json = None
+        if stations is None:
+            self.stations_json = json.load(open(self.config.sensor_list_data, "r", encoding="utf-8"))
+            stations = self.parse_stations(self.stations_json)
+        self.station_ids, self.station_coords = stations
+        self.build_index()
+        self.session = self.create_session()
+        cache_config = self.config.cache
+        self.cache = TTLCache(max_size=cache_config.max_size, ttl=cache_config.ttl,
+                              stale_while_revalidate=cache_config.stale_while_revalidate)
+        self.metric_registrations = [
+            metrics.register_collector("app_cache_lookups_total", "result", lambda: dict(self.cache.stats),
+                                       cache="air_quality")]
+        self.single_flight = SingleFlight()
+        breaker_config = self.config.circuit_breaker
+        self.breaker = CircuitBreaker(breaker_config.failure_threshold, breaker_config.reset_timeout)
+        self.last_known = {}
+        self.fallback_stats = {'last_known': 0, 'unavailable': 0}
+        self.metric_registrations += [
+            metrics.register_collector("app_upstream_coalesced_total", "role", lambda: dict(self.single_flight.stats)),
+            metrics.register_collector("app_circuit_breaker_events_total", "event", lambda: dict(self.breaker.stats)),
+            metrics.register_collector("app_air_quality_fallback_total", "result", lambda: dict(self.fallback_stats))]
+        self.history = None
+        if self.config.history.enabled:
+            from air_quality.history import AirQualityHistory
+            self.history = AirQualityHistory(self.config.history)
+            self.metric_registrations.append(metrics.register_collector(
+                "app_air_quality_history_records_total", "result", lambda: dict(self.history.stats)))
+        self.prefetcher = None
+        if self.config.prefetch.enabled:
+            from air_quality.prefetcher import AirQualityPrefetcher
+            self.prefetcher = AirQualityPrefetcher(self)
+            self.prefetcher.start()
+            self.metric_registrations += [
+                metrics.register_collector("app_cache_lookups_total", "result", lambda: dict(self.prefetcher.stats),
+                                           cache="air_quality_prefetch"),
+                metrics.register_gauge("app_air_quality_prefetch_snapshot_age_seconds",
+                                       lambda: self.prefetcher.snapshot_age())]
+
+    def after_fork(self):
+        """
+        Prepares an instance created in a parent process for use in a forked worker process.
+
+        Pooled connections must not be shared between processes and threads do not survive fork, so the
+        HTTP session is created again and the prefetcher and history writer, if enabled, are restarted.
+        """
+        self.session = self.create_session()
+        if self.history is not None:
+            self.history.after_fork()
+        if self.prefetcher is not None:
+            from air_quality.prefetcher import AirQualityPrefetcher
+            self.prefetcher = AirQualityPrefetcher(self)
+            self.prefetcher.start()
+
+    def close(self):
+        """
+        Stops the prefetcher and the history writer and removes the metrics of this instance, e.g. when it is
+        replaced by a reload. Otherwise its counters would be reported next to the new ones and the snapshot age
+        of its stopped prefetcher would keep growing.
+        """
+        metrics.unregister(self.metric_registrations)
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        if self.history is not None:
+            self.history.close()
+
+    def create_session(self):
+        """
+        Creates a pooled keep-alive HTTP session for the air quality API.
+
+        Returns:
+        - requests.Session: Session with a connection pool sized from the config.
+        """
+        http_config = self.config.http
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=http_config.pool_connections,
+                              pool_maxsize=http_config.pool_maxsize,
+                              max_retries=http_config.max_retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def to_unit_vectors(lat, lon):
+        """
+        Converts geographic coordinates to 3D unit vectors.
+
+        Parameters:
+        - lat, lon: Geographic coordinates in degrees (scalars or arrays).
+
+        Returns:
+        - numpy.ndarray: Unit vectors of shape (..., 3).
+        """
+        lat_rad = np.radians(lat)
+        lon_rad = np.radians(lon)
+        return np.stack([np.cos(lat_rad) * np.cos(lon_rad),
+                         np.cos(lat_rad) * np.sin(lon_rad),
+                         np.sin(lat_rad)], axis=-1)
+
+    @staticmethod
+    def parse_stations(stations_json):
+        """
+        Parses station identifiers and coordinates once into arrays.
+
+        Parameters:
+        - stations_json (list): List of stations in the API format.
+
+        Returns:
+        - tuple: (station_ids, station_coords) with coordinates as (lat, lon) in degrees.
+        """
+        station_ids = np.array([station["id"] for station in stations_json])
+        station_coords = np.array([(float(station["gegrLat"]), float(station["gegrLon"]))
+                                   for station in stations_json], dtype=float).reshape(-1, 2)
+        return station_ids, station_coords
+
+    def build_index(self):
+        """
+        Builds the KD-tree used for nearest station lookups.
+
+        Euclidean (chord) distance between unit vectors grows monotonically with the great-circle
+        distance, so the nearest vector is the nearest station on the sphere.
+        """
+        self.stations_tree = cKDTree(self.to_unit_vectors(self.station_coords[:, 0], self.station_coords[:, 1]))
 
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """
@@ -65,20 +212,54 @@ class AirQuality:
         Returns:
         - nearest_station_id: Identifier of the nearest station.
         """
+        if len(self.station_ids) == 0:
+            return None
+        target_lat = float(target_lat)
+        target_lon = float(target_lon)
+        # Re-rank a few tree candidates with the exact haversine so rounding never changes the answer
+        k = min(self.config.nearest_station_candidates, len(self.station_ids))
+        _, candidates = self.stations_tree.query(self.to_unit_vectors(target_lat, target_lon), k=k)
         nearest_station_id = None
         min_distance = float('inf')
-        for station in self.stations_json:
-            station_lat = float(station["gegrLat"])
-            station_lon = float(station["gegrLon"])
-
-            distance = self.calculate_distance(float(target_lat), float(target_lon), station_lat, station_lon)
+        for index in np.sort(np.atleast_1d(candidates)):
+            station_lat, station_lon = self.station_coords[index]
+            distance = self.calculate_distance(target_lat, target_lon, station_lat, station_lon)
 
             if distance < min_distance:
                 min_distance = distance
-                nearest_station_id = station["id"]
+                nearest_station_id = self.station_ids[index].item()
 
         return nearest_station_id
 
+    def find_nearest_stations(self, target_lat, target_lon, k=1, radius=None):
+        """
+        Finds the k nearest stations, optionally limited to a radius around the location.
+
+        Parameters:
+        - target_lat, target_lon: Geographic coordinates of a location.
+        - k: Maximum number of stations to return, None returns every station within the radius.
+        - radius: Search radius in kilometers, None for no limit.
+
+        Returns:
+        - list: Tuples (station_id, distance_km) sorted by distance.
+        """
+        target_lat = float(target_lat)
+        target_lon = float(target_lon)
+        target = self.to_unit_vectors(target_lat, target_lon)
+        if radius is not None:
+            chord = 2 * np.sin(min(radius / EARTH_RADIUS_KM, np.pi) / 2)
+            candidates = np.asarray(self.stations_tree.query_ball_point(target, r=chord), dtype=int)
+        elif k is not None and len(self.station_ids) > 0:
+            _, candidates = self.stations_tree.query(target, k=min(k, len(self.station_ids)))
+            candidates = np.atleast_1d(candidates)
+        else:
+            candidates = np.arange(len(self.station_ids))
+
+        distances = haversine_distances(target_lat, target_lon,
+                                        self.station_coords[candidates, 0], self.station_coords[candidates, 1])
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.station_ids[candidates[i]].item(), distances[i].item()) for i in order]
+
     def get_air_quality(self, lat, lon):
         """
         Retrieves air quality data for specified coordinates.
@@ -92,18 +273,131 @@ class AirQuality:
         if lat is None or lon is None:
             station_id = self.config.default_sensor_id
         else:
-            station_id = self.find_nearest_station(lat, lon)
+            with metrics.stage("air.station_lookup"):
+                station_id = self.find_nearest_station(lat, lon)
 
         if station_id is not None:
-            try:
-                response = requests.get(f'{self.config.air_pollution_url}{station_id}')
-                if response.status_code == 200:
-                    air_data = response.json()
-                    return {
-                        'air_quality': air_data[self.config.air_index_key][self.config.index_level],
-                        'air_quality_id': air_data[self.config.air_index_key]['id'],
-                        'extra_points': self.config.extra_points[air_data[self.config.air_index_key]['id']]
-                    }
-
-            except requests.RequestException as e:
-                print(f"Request error: {e}")
+            if self.prefetcher is not None:
+                prefetched = self.prefetcher.get(station_id)
+                if prefetched is not None:
+                    return prefetched
+            if not self.config.cache.enabled:
+                result = self.fetch_air_quality(station_id)
+            else:
+                result = self.cache.get_or_load(station_id, self.fetch_air_quality)
+            if result is None:
+                result = self.fallback(station_id)
+            return result
+
+    def fallback(self, station_id):
+        """
+        Air quality data served when the upstream request failed or the circuit is open.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: The last known air quality data of the station or None if there is none.
+        """
+        result = self.last_known.get(station_id)
+        self.fallback_stats['last_known' if result is not None else 'unavailable'] += 1
+        return result
+
+    def parse_air_quality(self, air_data):
+        """
+        Converts an air quality index response of the API into air quality data.
+
+        Parameters:
+        - air_data (dict): Decoded JSON response.
+
+        Returns:
+        - dict: Air quality data or None if the station has no current index.
+        """
+        index = air_data[self.config.air_index_key]
+        # Stations without a current index answer with a null level or level id -1 ("Brak indeksu")
+        if index is None or index['id'] == -1:
+            return None
+        return {
+            'air_quality': index[self.config.index_level],
+            'air_quality_id': index['id'],
+            'extra_points': self.config.extra_points[index['id']]
+        }
+
+    def fetch_air_quality(self, station_id):
+        """
+        Downloads the air quality index of a station, bypassing the cache.
+
+        Concurrent calls for the same station share one upstream request.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: Air quality data or None if the request failed or the circuit is open.
+        """
+        return self.single_flight.do(station_id, lambda: self.request_air_quality(station_id))
+
+    def request_air_quality(self, station_id):
+        """
+        Sends one upstream request for the air quality index of a station, unless the circuit is open.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: Air quality data or None if the request failed or was not sent.
+        """
+        if not self.breaker.allow():
+            return None
+        http_config = self.config.http
+        result = None
+        upstream_failed = True
+        try:
+            with metrics.stage("air.upstream"):
+                response = self.session.get(f'{self.config.air_pollution_url}{station_id}',
+                                            timeout=(http_config.connect_timeout, http_config.read_timeout))
+            upstream_failed = self.upstream_failed(response.status_code)
+            if response.status_code == 200:
+                result = self.parse_air_quality(response.json())
+
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"Request error: {e!r}")
+        finally:
+            self.record_upstream(station_id, result, upstream_failed)
+        return result
+
+    @staticmethod
+    def upstream_failed(status_code):
+        """
+        Whether a response status means the API itself is failing.
+
+        Only server errors count against the circuit breaker, together with transport errors and timeouts.
+        Answers about a single station, such as 404 for an unknown station, say nothing about the API's health.
+
+        Parameters:
+        - status_code (int): HTTP status of the response.
+
+        Returns:
+        - bool: True for 5xx statuses.
+        """
+        return status_code >= 500
+
+    def record_upstream(self, station_id, result, upstream_failed):
+        """
+        Reports the outcome of an upstream request to the circuit breaker, remembers successful results and
+        queues them for the history store.
+
+        Parameters:
+        - station_id: Identifier of the station.
+        - result (dict): Air quality data or None if there was none.
+        - upstream_failed (bool): Whether the API failed (transport error, timeout or 5xx), rather than
+          answering without usable data for this station.
+        """
+        if upstream_failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if result is not None:
+            self.last_known[station_id] = result
+            if self.history is not None:
+                self.history.record(station_id, result)
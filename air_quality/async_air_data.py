@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+
+from air_quality.resilience import AsyncSingleFlight
+from utils.metrics import metrics
+
+
+class AsyncAirQuality:
+    """
+    Non-blocking air quality lookups for the ASGI app.
+
+    Shares the station index, cache, prefetcher, circuit breaker and last known values of an AirQuality
+    instance, but requests the upstream API with an httpx.AsyncClient, so a slow upstream response only
+    suspends the requests waiting for it.
+
+    Parameters:
+    - air_quality (AirQuality): Owner object, used for the station index, cache, config and response parsing.
+
+    Attributes:
+    - config (dict): Configuration parameters for air quality.
+    - client (httpx.AsyncClient): Pooled client, created on first use inside the running event loop.
+    - single_flight (AsyncSingleFlight): Coalesces concurrent upstream requests for the same station.
+
+    Methods:
+    - get_air_quality: Retrieves air quality data for specified coordinates.
+    - fetch_air_quality: Downloads the air quality index of a station.
+    - request_air_quality: Sends one upstream request guarded by the circuit breaker.
+    - close: Closes the HTTP client.
+    """
+
+    def __init__(self, air_quality):
+        self.air_quality = air_quality
+        self.config = air_quality.config
+        self.client = None
+        self.single_flight = AsyncSingleFlight()
+        metrics.register_collector("app_upstream_coalesced_total", "role", lambda: dict(self.single_flight.stats))
+
+    def create_client(self):
+        http_config = self.config.http
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(http_config.read_timeout, connect=http_config.connect_timeout),
+            limits=httpx.Limits(max_connections=http_config.pool_maxsize,
+                                max_keepalive_connections=http_config.pool_maxsize))
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get_air_quality(self, lat, lon):
+        """
+        Retrieves air quality data for specified coordinates.
+
+        Parameters:
+        - lat, lon: Geographic coordinates of a location.
+
+        Returns:
+        - dict: Air quality data.
+        """
+        air_quality = self.air_quality
+        if lat is None or lon is None:
+            station_id = self.config.default_sensor_id
+        else:
+            with metrics.stage("air.station_lookup"):
+                station_id = air_quality.find_nearest_station(lat, lon)
+
+        if station_id is not None:
+            if air_quality.prefetcher is not None:
+                prefetched = air_quality.prefetcher.get(station_id)
+                if prefetched is not None:
+                    return prefetched
+            if not self.config.cache.enabled:
+                result = await self.fetch_air_quality(station_id)
+            else:
+                result = await air_quality.cache.get_or_load_async(station_id, self.fetch_air_quality)
+            if result is None:
+                result = air_quality.fallback(station_id)
+            return result
+
+    async def fetch_air_quality(self, station_id):
+        """
+        Downloads the air quality index of a station, bypassing the cache.
+
+        Concurrent calls for the same station share one upstream request.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: Air quality data or None if the request failed or the circuit is open.
+        """
+        return await self.single_flight.do(station_id, lambda: self.request_air_quality(station_id))
+
+    async def request_air_quality(self, station_id):
+        """
+        Sends one upstream request for the air quality index of a station, unless the circuit is open.
+
+        The whole request, including connecting and reading the body, is limited to http.total_timeout.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: Air quality data or None if the request failed or was not sent.
+        """
+        if not self.air_quality.breaker.allow():
+            return None
+        if self.client is None:
+            self.client = self.create_client()
+        result = None
+        upstream_failed = True
+        try:
+            with metrics.stage("air.upstream"):
+                response = await asyncio.wait_for(self.client.get(f'{self.config.air_pollution_url}{station_id}'),
+                                                  self.config.http.total_timeout)
+            upstream_failed = self.air_quality.upstream_failed(response.status_code)
+            if response.status_code == 200:
+                result = self.air_quality.parse_air_quality(response.json())
+
+        except (httpx.HTTPError, asyncio.TimeoutError, ValueError, KeyError, TypeError) as e:
+            print(f"Request error: {e!r}")
+        finally:
+            self.air_quality.record_upstream(station_id, result, upstream_failed)
+        return result
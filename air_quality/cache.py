@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with time-to-live and stale-while-revalidate semantics.
+
+    Parameters:
+    - max_size (int): Maximum number of entries, the least recently used entry is evicted first.
+    - ttl (float): Number of seconds an entry is fresh.
+    - stale_while_revalidate (float): Number of seconds after ttl during which the stale entry is
+      still served while a background refresh is running.
+    - clock (callable): Monotonic time source, replaceable in tests.
+
+    Attributes:
+    - stats (dict): Number of 'hit', 'stale' and 'miss' lookups.
+
+    Methods:
+    - get: Returns the cached value or None.
+    - set: Stores a value.
+    - get_or_load: Returns the cached value, loading or revalidating it when needed.
+    - get_or_load_async: The same for a coroutine loader, to be awaited in an event loop.
+    """
+
+    def __init__(self, max_size, ttl, stale_while_revalidate=0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        # Strong references to background refresh tasks, the event loop keeps only weak ones
+        self.tasks = set()
+        self.lock = threading.Lock()
+        self.stats = {'hit': 0, 'stale': 0, 'miss': 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns a fresh cached value.
+
+        Parameters:
+        - key: Cache key.
+
+        Returns:
+        - The cached value or None if it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or self.clock() - entry[1] > self.ttl:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        """
+        Stores a value and evicts the least recently used entries above max_size.
+
+        Parameters:
+        - key: Cache key.
+        - value: Value to store.
+        """
+        with self.lock:
+            self.entries[key] = (value, self.clock())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def lookup(self, key):
+        """
+        Looks a key up for get_or_load, counting the result in stats.
+
+        Parameters:
+        - key: Cache key.
+
+        Returns:
+        - tuple: (found, value, refresh) where refresh tells the caller to revalidate a stale entry;
+          the key is then marked as refreshing until finish_refresh is called.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            age = None if entry is None else self.clock() - entry[1]
+            if age is not None and age <= self.ttl:
+                self.entries.move_to_end(key)
+                self.stats['hit'] += 1
+                return True, entry[0], False
+            if age is not None and age <= self.ttl + self.stale_while_revalidate:
+                self.entries.move_to_end(key)
+                self.stats['stale'] += 1
+                refresh = key not in self.refreshing
+                self.refreshing.add(key)
+                return True, entry[0], refresh
+            self.stats['miss'] += 1
+            return False, None, False
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for a key, calling loader(key) on a miss.
+
+        A stale entry inside the stale-while-revalidate window is returned immediately and refreshed
+        in a background thread. Results equal to None are never cached.
+
+        Parameters:
+        - key: Cache key.
+        - loader (callable): Function returning the value for a key or None on failure.
+
+        Returns:
+        - The cached or loaded value, None if loading failed.
+        """
+        found, value, refresh = self.lookup(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+        if found:
+            return value
+
+        value = loader(key)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """
+        Returns the cached value for a key, awaiting loader(key) on a miss.
+
+        Same as get_or_load, but the loader is a coroutine function and stale entries are refreshed
+        in a task of the running event loop.
+
+        Parameters:
+        - key: Cache key.
+        - loader (callable): Coroutine function returning the value for a key or None on failure.
+
+        Returns:
+        - The cached or loaded value, None if loading failed.
+        """
+        found, value, refresh = self.lookup(key)
+        if refresh:
+            task = asyncio.ensure_future(self._refresh_async(key, loader))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        if found:
+            return value
+
+        value = await loader(key)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def finish_refresh(self, key, value):
+        try:
+            if value is not None:
+                self.set(key, value)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def _refresh(self, key, loader):
+        value = None
+        try:
+            value = loader(key)
+        finally:
+            self.finish_refresh(key, value)
+
+    async def _refresh_async(self, key, loader):
+        value = None
+        try:
+            value = await loader(key)
+        finally:
+            self.finish_refresh(key, value)
@@ -0,0 +1,244 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS air_quality_history (
+    station_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    air_quality TEXT,
+    air_quality_id INTEGER,
+    extra_points INTEGER,
+    PRIMARY KEY (station_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS air_quality_history_ts ON air_quality_history (ts);
+"""
+SECONDS_PER_DAY = 86400
+
+
+class AirQualityHistory:
+    """
+    Local SQLite store of fetched air quality indices.
+
+    Request threads only put records on a bounded queue. A background thread writes them in batches of up to
+    batch_size records, one transaction per batch, and periodically deletes records older than retention_days.
+    The database runs in WAL mode, so queries are not blocked by writes, also from other worker processes.
+    Records are keyed by (station_id, ts), which serves per-station time range queries, and an index on ts serves
+    time range queries over all stations and the compaction.
+
+    Parameters:
+    - config (dict): History settings (air_pollution.history).
+
+    Attributes:
+    - config (dict): History settings.
+    - stats (dict): Number of records 'written', 'dropped' because the queue was full, 'failed' to be written and
+      'compacted' away.
+
+    Methods:
+    - record: Queues an air quality index for writing.
+    - query: Reads records of a station and/or a time range, newest first.
+    - compact: Deletes records older than the retention period.
+    - flush: Waits until all queued records are written.
+    - close: Writes queued records, stops the writer thread and closes the query connections.
+    - after_fork: Restarts the writer thread in a forked worker process.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.stats = {'written': 0, 'dropped': 0, 'failed': 0, 'compacted': 0}
+        with closing(self.connect()) as connection, connection:
+            # auto_vacuum only takes effect on a new database, it lets compaction give pages back to the file system
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        self.local = threading.local()
+        self.query_connections = []
+        self.query_lock = threading.Lock()
+        self.start()
+
+    def connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.config.path, timeout=self.config.busy_timeout,
+                                     check_same_thread=check_same_thread)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def start(self):
+        self.queue = queue.Queue(maxsize=self.config.queue_size)
+        self.thread = threading.Thread(target=self.run, name="air-quality-history", daemon=True)
+        self.thread.start()
+
+    def after_fork(self):
+        """
+        Threads and SQLite connections do not survive fork, records queued in the parent are not written and
+        query connections inherited from the parent are closed.
+        """
+        self.query_lock = threading.Lock()
+        self.close_query_connections()
+        self.start()
+
+    def record(self, station_id, result, ts=None):
+        """
+        Queues an air quality index for writing, without waiting for the database.
+
+        Parameters:
+        - station_id: Identifier of the station.
+        - result (dict): Air quality data.
+        - ts (float): Unix time the index was fetched, now if None.
+        """
+        row = (int(station_id), time.time() if ts is None else ts, result['air_quality'], result['air_quality_id'],
+               result['extra_points'])
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def run(self):
+        connection = self.connect()
+        next_compaction = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=1.0))
+            except queue.Empty:
+                pass
+            # Wait up to flush_interval for a full batch, so a trickle of records still costs few transactions
+            deadline = time.monotonic() + self.config.flush_interval
+            while batch and len(batch) < self.config.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+            rows = [row for row in batch if row is not None]
+            if rows:
+                self.write(connection, rows)
+            for _ in batch:
+                self.queue.task_done()
+            if time.monotonic() >= next_compaction:
+                self.compact(connection)
+                next_compaction = time.monotonic() + self.config.compaction_interval
+        connection.close()
+
+    def write(self, connection, rows):
+        try:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO air_quality_history VALUES (?, ?, ?, ?, ?)", rows)
+            self.stats['written'] += len(rows)
+        except sqlite3.Error as e:
+            self.stats['failed'] += len(rows)
+            print(f"History write error: {e!r}")
+
+    def compact(self, connection=None):
+        """
+        Deletes records older than retention_days and returns the freed pages to the file system.
+
+        Parameters:
+        - connection (sqlite3.Connection): Connection to use, a new one if None.
+
+        Returns:
+        - int: Number of deleted records.
+        """
+        owned = connection is None
+        if owned:
+            connection = self.connect()
+        try:
+            with connection:
+                deleted = connection.execute("DELETE FROM air_quality_history WHERE ts < ?",
+                                             (time.time() - self.config.retention_days * SECONDS_PER_DAY,)).rowcount
+            if deleted:
+                connection.execute("PRAGMA incremental_vacuum")
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.stats['compacted'] += deleted
+            return deleted
+        except sqlite3.Error as e:
+            print(f"History compaction error: {e!r}")
+            return 0
+        finally:
+            if owned:
+                connection.close()
+
+    def query(self, station_id=None, start=None, end=None, limit=None):
+        """
+        Reads records of a station and/or a time range, newest first.
+
+        Parameters:
+        - station_id: Identifier of the station, all stations if None.
+        - start, end (float): Unix time range, inclusive, open ended if None.
+        - limit (int): Maximum number of records, config query_limit if None.
+
+        Returns:
+        - list: Records as dicts with station_id, timestamp (ISO 8601, UTC), air_quality, air_quality_id and
+          extra_points.
+
+        Raises:
+        - ValueError: For a negative limit, which SQLite would treat as no limit.
+        """
+        conditions, values = [], []
+        if station_id is not None:
+            conditions.append("station_id = ?")
+            values.append(int(station_id))
+        if start is not None:
+            conditions.append("ts >= ?")
+            values.append(start)
+        if end is not None:
+            conditions.append("ts <= ?")
+            values.append(end)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit = self.config.query_limit if limit is None else min(int(limit), self.config.query_limit)
+        if limit < 0:
+            raise ValueError(f"limit must not be negative, got {limit}")
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # Not limited to this thread only so that close() can close the connections of all threads
+            connection = self.local.connection = self.connect(check_same_thread=False)
+            with self.query_lock:
+                self.query_connections.append(connection)
+        rows = connection.execute("SELECT station_id, ts, air_quality, air_quality_id, extra_points "
+                                  f"FROM air_quality_history{where} ORDER BY ts DESC LIMIT ?", values + [limit])
+        return [{'station_id': station_id, 'timestamp': datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                 'air_quality': air_quality, 'air_quality_id': air_quality_id, 'extra_points': extra_points}
+                for station_id, ts, air_quality, air_quality_id, extra_points in rows]
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.close_query_connections()
+
+    def close_query_connections(self):
+        with self.query_lock:
+            connections, self.query_connections = self.query_connections, []
+            self.local = threading.local()
+        for connection in connections:
+            connection.close()
+
+
+def parse_time(value):
+    """
+    Parses a query time given as Unix seconds or ISO 8601, naive times are UTC.
+
+    Parameters:
+    - value (str): Time or None.
+
+    Returns:
+    - float: Unix time or None.
+
+    Raises:
+    - ValueError: For an unparsable time.
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+
+
+class AirQualityPrefetcher:
+    """
+    Background refresher keeping the air quality index of every station warm.
+
+    An asyncio loop running in a daemon thread fetches station indices with bounded concurrency and
+    publishes them into an immutable snapshot. Readers only look the station up in the current
+    snapshot, so serving a prefetched station needs no I/O.
+
+    Parameters:
+    - air_quality (AirQuality): Owner object, used for the station list, config and response parsing.
+
+    Attributes:
+    - config (dict): Prefetch configuration (air_pollution.prefetch).
+    - station_ids (list): Stations refreshed by the prefetcher.
+    - snapshot (dict): Station id -> (air quality data, fetch time), replaced as a whole on publish.
+    - snapshot_updated_at (float): Wall clock time of the last publish, None before the first one.
+    - stats (dict): Number of 'hit' and 'miss' lookups.
+
+    Methods:
+    - start: Starts the background thread.
+    - stop: Stops the background thread.
+    - get: Returns prefetched data for a station.
+    - snapshot_age: Returns seconds since the last publish.
+    """
+
+    def __init__(self, air_quality):
+        self.air_quality = air_quality
+        self.config = air_quality.config.prefetch
+        if self.config.stations is None:
+            self.station_ids = [int(station_id) for station_id in air_quality.station_ids]
+        else:
+            self.station_ids = list(self.config.stations)
+        self.snapshot = {}
+        self.snapshot_updated_at = None
+        self.stats = {'hit': 0, 'miss': 0}
+        self.failures = {}
+        self.next_due = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """
+        Starts the background thread if it is not running yet.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="air-quality-prefetcher",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread.
+
+        Parameters:
+        - timeout: Seconds to wait for the thread to finish.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def get(self, station_id):
+        """
+        Returns prefetched air quality data for a station.
+
+        Parameters:
+        - station_id: Identifier of the station.
+
+        Returns:
+        - dict: Air quality data or None if the station is not prefetched or its entry is older than max_age.
+        """
+        entry = self.snapshot.get(station_id)
+        if entry is None or time.time() - entry[1] > self.config.max_age:
+            self.stats['miss'] += 1
+            return None
+        self.stats['hit'] += 1
+        return entry[0]
+
+    def snapshot_age(self):
+        """
+        Returns the number of seconds since the snapshot was last published, None before the first publish.
+        """
+        if self.snapshot_updated_at is None:
+            return None
+        return time.time() - self.snapshot_updated_at
+
+    def schedule(self, station_id, now, failed):
+        """
+        Computes the next refresh time of a station.
+
+        Successful fetches are rescheduled after the interval with random jitter, failures back off
+        exponentially up to backoff_max.
+        """
+        if failed:
+            self.failures[station_id] = self.failures.get(station_id, 0) + 1
+            delay = min(self.config.backoff_max, self.config.backoff_base * 2 ** (self.failures[station_id] - 1))
+        else:
+            self.failures.pop(station_id, None)
+            delay = self.config.interval
+        self.next_due[station_id] = now + delay * (1 + random.uniform(-self.config.jitter, self.config.jitter))
+
+    async def fetch(self, client, semaphore, station_id):
+        async with semaphore:
+            try:
+                response = await client.get(f'{self.air_quality.config.air_pollution_url}{station_id}')
+                if response.status_code == 200:
+                    return self.air_quality.parse_air_quality(response.json())
+            except Exception as e:
+                # Any error, e.g. a TypeError for a null index, fails only this station, which then backs off;
+                # escaping gather would end the refresh loop of every station
+                print(f"Prefetch error for station {station_id}: {e!r}")
+        return None
+
+    async def _run(self):
+        http_config = self.air_quality.config.http
+        timeout = httpx.Timeout(http_config.read_timeout, connect=http_config.connect_timeout)
+        limits = httpx.Limits(max_connections=self.config.concurrency,
+                              max_keepalive_connections=self.config.concurrency)
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        # Spread the first round over one jitter window instead of hitting the API with every station at once
+        start = time.monotonic()
+        for station_id in self.station_ids:
+            self.next_due[station_id] = start + random.uniform(0, self.config.jitter * self.config.interval)
+
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                due = [station_id for station_id in self.station_ids if self.next_due[station_id] <= now]
+                if due:
+                    results = await asyncio.gather(*(self.fetch(client, semaphore, station_id) for station_id in due))
+                    fetched_at = time.time()
+                    now = time.monotonic()
+                    snapshot = dict(self.snapshot)
+                    for station_id, result in zip(due, results):
+                        if result is not None:
+                            snapshot[station_id] = (result, fetched_at)
+                            if self.air_quality.history is not None:
+                                self.air_quality.history.record(station_id, result, fetched_at)
+                        self.schedule(station_id, now, failed=result is None)
+                    self.snapshot = snapshot
+                    self.snapshot_updated_at = fetched_at
+
+                wait = min(self.next_due.values(), default=now + 1) - time.monotonic()
+                await asyncio.sleep(min(max(wait, 0.05), 1.0))
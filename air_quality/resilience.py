@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one: the first caller runs the function, callers
+    arriving while it runs wait for it and get the same result.
+
+    Attributes:
+    - stats (dict): Number of 'leader' calls (that ran the function) and 'shared' calls (that waited).
+
+    Methods:
+    - do: Runs a function for a key, or waits for the call already running for it.
+    """
+
+    class Call:
+        __slots__ = ('event', 'result', 'error')
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {'leader': 0, 'shared': 0}
+
+    def do(self, key, func):
+        """
+        Parameters:
+        - key: Key of the call, e.g. a station id.
+        - func (callable): Function without arguments.
+
+        Returns:
+        - The result of func, shared by all callers that arrived while it was running.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self.Call()
+            self.stats['leader' if leader else 'shared'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutine functions within one event loop.
+
+    The call runs as a task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.stats = {'leader': 0, 'shared': 0}
+
+    async def do(self, key, func):
+        """
+        Parameters:
+        - key: Key of the call, e.g. a station id.
+        - func (callable): Coroutine function without arguments.
+
+        Returns:
+        - The result of func, shared by all callers that arrived while it was running.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            self.stats['leader'] += 1
+            task = self.calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        else:
+            self.stats['shared'] += 1
+        return await asyncio.shield(task)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an unreliable upstream service.
+
+    After failure_threshold consecutive failures the circuit opens and calls are rejected without contacting
+    the upstream. After reset_timeout seconds a single trial call is allowed (half open): its success closes
+    the circuit, its failure opens it again.
+
+    Parameters:
+    - failure_threshold (int): Consecutive failures opening the circuit.
+    - reset_timeout (float): Seconds the circuit stays open before a trial call.
+    - clock (callable): Monotonic time source, replaceable in tests.
+
+    Attributes:
+    - state (str): 'closed', 'open' or 'half_open'.
+    - stats (dict): Number of 'success', 'failure' and 'rejected' calls and of times the circuit 'opened'.
+
+    Methods:
+    - allow: Whether a call may be made now.
+    - record_success: Reports a successful call.
+    - record_failure: Reports a failed call.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.stats = {'success': 0, 'failure': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self):
+        """
+        Returns:
+        - bool: True if the call may be made, False if it is rejected. Every allowed call must be followed by
+          record_success or record_failure.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.stats['success'] += 1
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.stats['failure'] += 1
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.stats['opened'] += 1
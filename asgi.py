@@ -0,0 +1,163 @@
+"""
+ASGI entry point with a non-blocking air quality route:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+/get_air_quality is served natively in the event loop and awaits the upstream API with an async HTTP client,
+so slow upstream responses do not hold any thread. Every other route is passed to the Flask app, which runs
+synchronously in a pool of serving.threads threads, so CPU-only routes like /get_traffic are not stuck behind
+upstream requests.
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import main
+from air_quality.async_air_data import AsyncAirQuality
+from utils.metrics import metrics
+
+AIR_QUALITY_ROUTE = "/get_air_quality"
+
+
+class WsgiAdapter:
+    """
+    Serves a WSGI application to ASGI http requests, calling it in a thread pool.
+
+    Request and response bodies are buffered, which is fine for the small JSON bodies of this app.
+    """
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        environ = self.build_environ(scope, b"".join(body))
+        status, headers, payload = await asyncio.get_running_loop().run_in_executor(self.executor, self.run,
+                                                                                    environ)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+        await send({"type": "http.response.body", "body": payload})
+
+    @staticmethod
+    def build_environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1")
+            if name == "content-type":
+                key = "CONTENT_TYPE"
+            elif name == "content-length":
+                key = "CONTENT_LENGTH"
+            else:
+                key = "HTTP_" + name.upper().replace("-", "_")
+            value = value.decode("latin-1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def run(self, environ):
+        response = []
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [int(status.split(" ", 1)[0]), headers]
+            return chunks.append
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = response
+        return status, headers, b"".join(chunks)
+
+
+class App:
+    """
+    ASGI application routing /get_air_quality to AsyncAirQuality and everything else to the Flask app.
+    """
+
+    def __init__(self):
+        self.wsgi = WsgiAdapter(main.app, main.config.serving.threads)
+        self.air_quality = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http" and scope["path"] == AIR_QUALITY_ROUTE and scope["method"] == "GET":
+            await self.get_air_quality(scope, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                main.load_datasets()
+                self.air_quality = AsyncAirQuality(main.air_quality.get())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.air_quality is not None:
+                    await self.air_quality.close()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def get_air_quality(self, scope, send):
+        """
+        Endpoint for retrieving air quality data based on provided latitude and longitude, see main.get_air_quality.
+        """
+        start = time.perf_counter()
+        if self.air_quality is None:
+            self.air_quality = AsyncAirQuality(main.air_quality.get())
+        params = main.config.air_pollution.params
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        lat = query.get(params.lat, [None])[0]
+        lon = query.get(params.lon, [None])[0]
+
+        result = await self.air_quality.get_air_quality(lat, lon)
+
+        if result is not None:
+            status, body = 200, result
+        else:
+            status, body = 503, {"error": main.AIR_QUALITY_UNAVAILABLE}
+        payload = (main.app.json.dumps(body, separators=(",", ":")) + "\n").encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+        metrics.observe("app_request_duration_seconds", time.perf_counter() - start, route=AIR_QUALITY_ROUTE)
+        metrics.inc("app_requests_total", route=AIR_QUALITY_ROUTE, method="GET", status=str(status))
+        if status >= 400:
+            metrics.inc("app_request_errors_total", route=AIR_QUALITY_ROUTE, status=str(status))
+        metrics.flush(force=False)
+
+
+app = App()
@@ -0,0 +1,308 @@
+"""
+End-to-end load test of the app served by gunicorn (wsgi.py) or uvicorn (asgi.py) with a mix of routes.
+
+Requests are sent open loop: arrival times are drawn from a Poisson process at the target rate and every request
+is measured from its scheduled time, so time spent queueing in the client because the server is behind counts
+as latency too. A weighted mix of routes is drawn with a fixed seed, air quality is served by a local GIOŚ stub
+with configurable latency and error rate. The target rate is raised step by step; the saturation point is the
+highest rate the server still sustains, i.e. achieved throughput within 95 % of the target, p99 latency within
+the SLO and errors below 1 %. The client runs on the same machine as the server, so leave cores for it.
+
+Usage:
+    python -m benchmarks.load_test --rates 25 50 100 200 --duration 10 --save benchmarks/results/load.json
+    python -m benchmarks.load_test --server async --stub-latency 0.2 --stub-error-rate 0.05
+    python -m benchmarks.load_test --mix traffic=5 air_quality=1
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.scaling import free_port, wait_ready
+from benchmarks.stub_server import GiosStub
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Default share of every route in the mix
+DEFAULT_MIX = {
+    "traffic": 25,
+    "current_traffic": 10,
+    "saving": 15,
+    "saving_parking": 15,
+    "annual_saving": 10,
+    "annual_simulation": 5,
+    "air_quality": 20,
+}
+SATURATION_THROUGHPUT = 0.95
+SATURATION_ERRORS = 0.01
+PARKING_POINTS = 64
+
+
+def parking_points(count, seed=0):
+    """
+    Random lon/lat points inside the paid parking zones of Rzeszów.
+
+    :param count: Number of points.
+    :param seed: Random seed.
+    :return: List of (lon, lat) tuples.
+    """
+    import main as app_module
+    ppz = app_module.ppz.get()
+    points = []
+    while len(points) < count:
+        lons, lats = synthetic.zone_query_points(ppz, ppz.zone_geometries, count * 4, seed + len(points))
+        inside = ppz.check_prices(lons, lats) > 0
+        points += list(zip(lons[inside], lats[inside]))
+    return points[:count]
+
+
+def route_paths(rng, parking):
+    """
+    Request path generators of the routes in the mix.
+
+    :param rng: numpy random Generator.
+    :param parking: (lon, lat) points inside paid parking zones.
+    :return: Dictionary of route name to a function returning a path.
+    """
+    def traffic():
+        return f"/get_traffic?hour={rng.integers(24)}&day_of_week={DAYS[rng.integers(7)]}"
+
+    def saving():
+        return f"/get_saving_for_travel?transport_type={rng.integers(4)}&distance={rng.uniform(1, 30):.1f}"
+
+    def saving_parking():
+        lon, lat = parking[rng.integers(len(parking))]
+        return (f"/get_saving_for_travel?transport_type={rng.integers(4)}&distance={rng.uniform(1, 30):.1f}"
+                f"&lon={lon:.6f}&lat={lat:.6f}")
+
+    def annual_saving():
+        return f"/get_annual_saving?daily_distance={rng.uniform(5, 60):.1f}&fuel_type={rng.integers(2)}"
+
+    def annual_simulation():
+        lon, lat = parking[rng.integers(len(parking))]
+        return (f"/get_annual_saving?mode=simulation&daily_distance={rng.uniform(5, 60):.1f}"
+                f"&transport_type={rng.integers(4)}&lon={lon:.6f}&lat={lat:.6f}")
+
+    def air_quality():
+        # Anywhere in Poland, so requests spread over many stations
+        return f"/get_air_quality?lat={rng.uniform(49.2, 54.5):.3f}&lon={rng.uniform(14.5, 23.8):.3f}"
+
+    return {"traffic": traffic, "current_traffic": lambda: "/get_current_traffic", "saving": saving,
+            "saving_parking": saving_parking, "annual_saving": annual_saving,
+            "annual_simulation": annual_simulation, "air_quality": air_quality}
+
+
+def schedule(rate, duration, mix, paths, rng):
+    """
+    Draw the requests of one step: Poisson arrival times and routes from the weighted mix.
+
+    :return: List of (offset in seconds, route, path) ordered by offset.
+    """
+    offsets = np.cumsum(rng.exponential(1 / rate, int(rate * duration * 1.5) + 10))
+    offsets = offsets[offsets < duration]
+    names = list(mix)
+    weights = np.array([mix[name] for name in names], dtype=float)
+    routes = rng.choice(len(names), size=len(offsets), p=weights / weights.sum())
+    return [(offset, names[route], paths[names[route]]()) for offset, route in zip(offsets.tolist(), routes)]
+
+
+def start_server(mode, port, stub_url, workers, threads, overrides):
+    env = dict(os.environ, APP_CONFIG_OVERRIDES=" ".join([f"air_pollution.air_pollution_url={stub_url}"] + overrides))
+    if mode == "sync":
+        command = ["-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "--workers",
+                   str(workers), "--threads", str(threads), "--log-level", "warning", "wsgi:app"]
+    else:
+        command = ["-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port), "--workers",
+                   str(workers), "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen([sys.executable] + command, env=env)
+
+
+def run_step(port, requests, connections):
+    """
+    Send scheduled requests over keep-alive connections.
+
+    :param port: Server port.
+    :param requests: Schedule from schedule().
+    :param connections: Concurrent connections (threads) sending requests.
+    :return: (list of (route, latency seconds, ok), seconds from the start until the last response).
+    """
+    pending = queue.Queue()
+    for request in requests:
+        pending.put(request)
+    results = []
+    start = time.monotonic() + 0.1
+
+    def run():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while True:
+            try:
+                offset, route, path = pending.get_nowait()
+            except queue.Empty:
+                break
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # The server closes keep-alive connections idle for a while, a request failing on a reused connection
+            # is sent once more on a new one, like browsers do
+            for attempt in range(2):
+                reused = connection.sock is not None
+                try:
+                    connection.request("GET", path)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                    break
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                    connection.close()
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                    if not reused:
+                        break
+            # list.append is atomic, no lock needed
+            results.append((route, time.monotonic() - start - offset, ok))
+        connection.close()
+
+    threads = [threading.Thread(target=run) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - start
+
+
+def summarize(latencies, errors):
+    """
+    :return: Dictionary with the number of requests, errors and latency percentiles in milliseconds.
+    """
+    summary = {"requests": len(latencies), "errors": errors}
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        summary.update({"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+                        "p99_ms": round(float(p99), 2), "mean_ms": round(float(np.mean(latencies)) * 1000, 2)})
+    return summary
+
+
+def step_report(rate, duration, results, elapsed, slo):
+    """
+    Throughput and latency of one step, overall and per route.
+
+    The achieved throughput is compared with the offered one, the number of scheduled requests per second of the
+    step, which differs a little from the target rate because arrivals are random.
+    """
+    routes = {}
+    for route in sorted({route for route, _, _ in results}):
+        selected = [(latency, ok) for name, latency, ok in results if name == route]
+        routes[route] = summarize([latency for latency, _ in selected], sum(not ok for _, ok in selected))
+    overall = summarize([latency for _, latency, _ in results], sum(not ok for _, _, ok in results))
+    offered = len(results) / duration
+    achieved = len(results) / max(elapsed, duration)
+    reasons = []
+    if achieved < offered * SATURATION_THROUGHPUT:
+        reasons.append(f"throughput {achieved:.1f} < {SATURATION_THROUGHPUT:.0%} of offered {offered:.1f}")
+    if overall.get("p99_ms", 0) > slo * 1000:
+        reasons.append(f"p99 {overall['p99_ms']:.0f} ms > SLO {slo * 1000:.0f} ms")
+    if overall["requests"] and overall["errors"] / overall["requests"] > SATURATION_ERRORS:
+        reasons.append(f"errors {overall['errors'] / overall['requests']:.1%} > {SATURATION_ERRORS:.0%}")
+    return {"target_rate": rate, "offered_rate": round(offered, 2), "achieved_rate": round(achieved, 2),
+            "overall": overall, "routes": routes, "sustained": not reasons, "reasons": reasons}
+
+
+def parse_mix(items):
+    mix = dict(DEFAULT_MIX) if not items else {}
+    for item in items or []:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown route '{name}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app with a weighted mix of routes.")
+    parser.add_argument("--rates", type=float, nargs="+", default=[25, 50, 100, 200],
+                        help="Target request rates (req/s), one step each, ascending")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of every step")
+    parser.add_argument("--mix", nargs="+", help=f"Route weights as name=weight, default "
+                                                 f"{' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument("--server", choices=["sync", "async"], default="sync",
+                        help="gunicorn wsgi:app (sync) or uvicorn asgi:app (async)")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per sync worker")
+    parser.add_argument("--connections", type=int, default=64, help="Client connections")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Seconds the GIOŚ stub delays responses")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Fraction of failing GIOŚ responses")
+    parser.add_argument("--slo", type=float, default=0.5, help="p99 latency (seconds) a sustained step must meet")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of arrivals and request parameters")
+    parser.add_argument("--override", action="append", default=[],
+                        help="Config override of the server, e.g. air_pollution.cache.enabled=false")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rng = np.random.default_rng(args.seed)
+    paths = route_paths(rng, parking_points(PARKING_POINTS, args.seed))
+    steps = []
+    saturation = None
+    with GiosStub(latency=args.stub_latency, error_rate=args.stub_error_rate, seed=args.seed) as stub:
+        port = free_port()
+        server = start_server(args.server, port, stub.url, args.workers, args.threads, args.override)
+        try:
+            wait_ready(port)
+            print(f"{'target':>8}{'achieved':>10}{'requests':>10}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}"
+                  f"{'p99 ms':>9}  status")
+            for rate in sorted(args.rates):
+                results, elapsed = run_step(port, schedule(rate, args.duration, mix, paths, rng), args.connections)
+                step = step_report(rate, args.duration, results, elapsed, args.slo)
+                steps.append(step)
+                overall = step["overall"]
+                print(f"{rate:>8g}{step['achieved_rate']:>10.1f}{overall['requests']:>10}{overall['errors']:>8}"
+                      f"{overall.get('p50_ms', float('nan')):>9.1f}{overall.get('p95_ms', float('nan')):>9.1f}"
+                      f"{overall.get('p99_ms', float('nan')):>9.1f}  "
+                      f"{'ok' if step['sustained'] else '; '.join(step['reasons'])}", flush=True)
+                # Rates after the first unsustained step do not count, the server is already overloaded
+                if step["sustained"] and all(previous["sustained"] for previous in steps):
+                    saturation = rate
+        finally:
+            server.terminate()
+            server.wait()
+
+    last = steps[-1]
+    print(f"\n{'route':<20}{'requests':>10}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"  at {last['target_rate']:g} req/s")
+    for route, summary in last["routes"].items():
+        print(f"{route:<20}{summary['requests']:>10}{summary['errors']:>8}"
+              f"{summary.get('p50_ms', float('nan')):>9.1f}{summary.get('p95_ms', float('nan')):>9.1f}"
+              f"{summary.get('p99_ms', float('nan')):>9.1f}")
+    if saturation is None:
+        print(f"\nSaturation point: not even {min(args.rates):g} req/s sustained")
+    else:
+        print(f"\nSaturation point: {saturation:g} req/s sustained")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"meta": {"created": datetime.now().isoformat(timespec="seconds"),
+                                "python": sys.version.split()[0],
+                                "platform": platform.platform(),
+                                "machine": platform.machine(),
+                                "cpus": os.cpu_count()},
+                       "settings": {"server": args.server, "workers": args.workers, "threads": args.threads,
+                                    "connections": args.connections, "duration": args.duration, "mix": mix,
+                                    "stub_latency": args.stub_latency, "stub_error_rate": args.stub_error_rate,
+                                    "slo": args.slo, "seed": args.seed, "overrides": args.override},
+                       "saturation_rate": saturation,
+                       "steps": steps}, file, indent=2)
+        print(f"\nResults written to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite of the hot paths and of every route of the app.
+
+Zone and station lookups are measured on the real datasets and on synthetic ones 10x, 100x and 1000x larger.
+Routes are called through the Flask test client with air quality served by a local GIOŚ stub, so no network
+access is needed. Results (seconds per call) are written as JSON and can be compared with a saved baseline,
+the exit code is 1 when any benchmark got slower than the threshold.
+
+Usage:
+    python -m benchmarks.run --save benchmarks/results/baseline.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --threshold 0.2
+    python -m benchmarks.run --filter ppz --scales 1 10
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.stub_server import GiosStub
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+LOOKUP_POINTS = 256
+
+
+def measure(func, repeat=5, min_time=0.05):
+    """
+    Time a function, calling it in loops long enough to be measured reliably.
+
+    :param func: Function without arguments.
+    :param repeat: Number of timed loops.
+    :param min_time: Minimum duration of a loop in seconds.
+    :return: Median seconds per call.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def cycle(items):
+    """
+    Function returning the next item of a sequence on every call, used to vary benchmark inputs.
+    """
+    items = list(items)
+    position = [0]
+
+    def next_item():
+        item = items[position[0] % len(items)]
+        position[0] += 1
+        return item
+    return next_item
+
+
+def zone_cases(app_module, scales):
+    from paid_parking_zones.calculator import PaidParkingZones
+    base = app_module.ppz.get()
+    for scale in scales:
+        ppz = base if scale == 1 else PaidParkingZones(app_module.config, zones=synthetic.zone_layer(base, scale))
+        lons, lats = synthetic.zone_query_points(base, ppz.zone_geometries, LOOKUP_POINTS, seed=scale)
+        point = cycle(zip(lons, lats))
+        yield f"ppz.check_price[x{scale}]", lambda ppz=ppz, point=point: ppz.check_price(*point())
+        if scale == 1:
+            yield "ppz.convert_coordinates", lambda: base.convert_coordinates(*point())
+        yield f"ppz.check_prices[x{scale}, {LOOKUP_POINTS} points]", lambda ppz=ppz, lons=lons, lats=lats: \
+            ppz.check_prices(lons, lats)
+
+
+def station_cases(app_module, scales):
+    from air_quality.air_data import AirQuality
+    base = app_module.air_quality.get()
+    rng = np.random.default_rng(0)
+    points = cycle(zip(rng.uniform(49, 55, LOOKUP_POINTS), rng.uniform(14, 24, LOOKUP_POINTS)))
+    for scale in scales:
+        air = base if scale == 1 else AirQuality(app_module.config, stations=synthetic.station_list(base, scale))
+        yield f"air.find_nearest_station[x{scale}]", lambda air=air: air.find_nearest_station(*points())
+    yield "air.calculate_distance", lambda: base.calculate_distance(*points(), 50.04, 21.99)
+
+
+def traffic_cases(app_module):
+    from traffic_intensity.traffic import DAYS_OF_WEEK
+    traffic = app_module.traffic.get()
+    counters = app_module.counter_traffic.get()
+    slot = cycle((hour, day) for day in DAYS_OF_WEEK for hour in range(24))
+    counter_id = counters.ids[0]
+    yield "traffic.lookup", lambda: traffic.lookup(*slot())
+    yield "traffic.day_curve", lambda: traffic.day_curve(slot()[1])
+    yield "counters.counter_traffic", lambda: counters.counter_traffic(counter_id, *slot())
+
+
+def transport_cases(app_module):
+    from means_of_transport import MeansOfTransportRegistry, Car, initialize_means_of_transport
+    pricing = app_module.pricing
+    ppz = app_module.ppz.get()
+    for transport_type, transport_class in MeansOfTransportRegistry.all_transports().items():
+        transport = initialize_means_of_transport(transport_type, pricing)
+        yield f"transport.{transport_class.__name__}.cost_summary", lambda transport=transport: \
+            transport.cost_summary(12.5)
+    car = Car(None, "0", pricing)
+    yield "transport.Car.cost_summary", lambda: car.cost_summary(12.5, None, 22.0, 50.04, ppz)
+
+
+def route_cases(app_module, stub):
+    client = app_module.app.test_client()
+    config = app_module.config
+    config.air_pollution.air_pollution_url = stub.url
+    counter_id = app_module.counter_traffic.get().ids[0]
+    rng = np.random.default_rng(0)
+    trips = 100
+    batch = {
+        "transport_type": rng.integers(0, 3, trips).tolist(),
+        "distance": rng.uniform(1, 30, trips).round(2).tolist(),
+        "lon": rng.uniform(21.95, 22.05, trips).round(5).tolist(),
+        "lat": rng.uniform(50.0, 50.07, trips).round(5).tolist(),
+    }
+    requests = {
+        "GET /get_traffic": "/get_traffic?hour=8&day_of_week=Monday",
+        "GET /get_current_traffic": "/get_current_traffic",
+        "GET /get_traffic_range": "/get_traffic_range",
+        "GET /get_counter_traffic": f"/get_counter_traffic?hour=8&day_of_week=Monday&counter_id={counter_id}",
+        "GET /get_saving_for_travel": "/get_saving_for_travel?transport_type=1&distance=12&lon=22.0&lat=50.04",
+        "GET /get_travel_comparison": "/get_travel_comparison?distance=12&lon=22.0&lat=50.04",
+        "GET /get_annual_saving": "/get_annual_saving?daily_distance=30",
+        "GET /get_air_quality": "/get_air_quality?lat=50.04&lon=21.99",
+    }
+    for name, url in requests.items():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{name} returned {response.status_code}: {response.get_data(as_text=True)}")
+        yield name, lambda url=url: client.get(url)
+    yield f"POST /get_saving_for_travel_batch[{trips} trips]", lambda: \
+        client.post("/get_saving_for_travel_batch", json=batch)
+    # Uncached upstream request, the route above is served from the station cache after the first call
+    air = app_module.air_quality.get()
+    yield "air.fetch_air_quality[stub]", lambda: air.fetch_air_quality(config.air_pollution.default_sensor_id)
+
+
+def run(scales, name_filter=None):
+    """
+    Run every benchmark.
+
+    :param scales: Multipliers of the dataset sizes for zone and station lookups.
+    :param name_filter: Only run benchmarks with this substring in the name.
+    :return: Dictionary of benchmark name to seconds per call.
+    """
+    import main as app_module
+    results = {}
+    with GiosStub() as stub:
+        suites = [zone_cases(app_module, scales), station_cases(app_module, scales), traffic_cases(app_module),
+                  transport_cases(app_module), route_cases(app_module, stub)]
+        for suite in suites:
+            for name, func in suite:
+                if name_filter and name_filter not in name:
+                    continue
+                results[name] = measure(func)
+                print(f"{name:<60}{results[name] * 1e6:>14.2f} us", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every benchmark against a baseline.
+
+    :param results: Current results.
+    :param baseline: Baseline results.
+    :param threshold: Allowed relative slowdown, e.g. 0.2 for 20 %.
+    :return: List of names of benchmarks slower than the threshold.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<60}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<60}{'-':>14}{seconds * 1e6:>14.2f}{'new':>10}")
+            continue
+        change = seconds / baseline[name] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<60}{baseline[name] * 1e6:>14.2f}{seconds * 1e6:>14.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot paths and routes of the app.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Dataset size multipliers for zone and station lookups")
+    parser.add_argument("--filter", help="Only run benchmarks with this substring in the name")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare results with this baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown against baseline")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.filter)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"meta": {"created": datetime.now().isoformat(timespec="seconds"),
+                                "python": sys.version.split()[0],
+                                "platform": platform.platform(),
+                                "machine": platform.machine()},
+                       "results": results}, file, indent=2)
+        print(f"\nResults written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Throughput of the production server (gunicorn -c gunicorn.conf.py wsgi:app) for growing worker counts.
+
+For every worker count a server is started on a free local port, and after /ready passes it is loaded by
+client processes with keep-alive connections for a fixed time. Requests cycle through routes that need no
+network access. Throughput should grow with the worker count up to the number of CPU cores; the client
+processes run on the same machine, so leave cores for them when reading the results.
+
+Usage:
+    python -m benchmarks.scaling --workers 1 2 4 8 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+PATHS = [
+    "/get_traffic?hour=8&day_of_week=Monday",
+    "/get_saving_for_travel?transport_type=1&distance=12&lon=22.0&lat=50.04",
+    "/get_travel_comparison?distance=12&lon=22.0&lat=50.04",
+    "/get_traffic_range?day_of_week=Friday",
+    "/get_annual_saving?daily_distance=30",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, timeout=120):
+    """
+    Wait until /ready of the server passes.
+
+    :param port: Server port.
+    :param timeout: Seconds to wait.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/ready")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} not ready after {timeout} s")
+
+
+def client(port, connections, duration):
+    """
+    Send requests over keep-alive connections for a fixed time.
+
+    :param port: Server port.
+    :param connections: Number of concurrent connections (threads).
+    :param duration: Seconds to send requests.
+    :return: (successful responses, failed requests).
+    """
+    counts = [[0, 0] for _ in range(connections)]
+    deadline = time.monotonic() + duration
+
+    def run(count, offset):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i = offset
+        while time.monotonic() < deadline:
+            try:
+                connection.request("GET", PATHS[i % len(PATHS)])
+                response = connection.getresponse()
+                response.read()
+                count[0 if response.status == 200 else 1] += 1
+            except (OSError, http.client.HTTPException):
+                count[1] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            i += 1
+        connection.close()
+
+    threads = [threading.Thread(target=run, args=(count, i)) for i, count in enumerate(counts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(count[0] for count in counts), sum(count[1] for count in counts)
+
+
+def measure(workers, threads, client_processes, connections, duration):
+    """
+    Start a server with a number of workers and measure its throughput.
+
+    :return: Dictionary with requests per second and failed requests.
+    """
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                               "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads),
+                               "--log-level", "warning", "wsgi:app"])
+    try:
+        wait_ready(port)
+        with multiprocessing.Pool(client_processes) as pool:
+            start = time.monotonic()
+            results = pool.starmap(client, [(port, connections, duration)] * client_processes)
+            elapsed = time.monotonic() - start
+    finally:
+        server.terminate()
+        server.wait()
+    succeeded = sum(ok for ok, _ in results)
+    return {"workers": workers, "requests_per_second": succeeded / elapsed,
+            "failed": sum(failed for _, failed in results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure server throughput for growing worker counts.")
+    cores = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[n for n in (1, 2, 4, 8, 16, 32) if n < cores] + [cores],
+                        help="Worker counts to measure, by default powers of two up to the number of cores")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--clients", type=int, default=max(1, cores // 2), help="Client processes")
+    parser.add_argument("--connections", type=int, default=8, help="Connections per client process")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per worker count")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workers':>8}{'req/s':>12}{'speedup':>10}{'failed':>8}")
+    for workers in args.workers:
+        result = measure(workers, args.threads, args.clients, args.connections, args.duration)
+        result["speedup"] = result["requests_per_second"] / results[0]["requests_per_second"] if results else 1.0
+        results.append(result)
+        print(f"{workers:>8}{result['requests_per_second']:>12.1f}{result['speedup']:>10.2f}{result['failed']:>8}",
+              flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"cpu_count": cores, "clients": args.clients, "connections": args.connections,
+                       "threads": args.threads, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
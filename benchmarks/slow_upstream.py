@@ -0,0 +1,111 @@
+"""
+Concurrency of the sync (gunicorn, wsgi.py) and async (uvicorn, asgi.py) servers when the GIOŚ API is slow.
+
+A local stub answers air quality requests after a fixed delay, the station cache is disabled so every request
+goes upstream. Many clients request /get_air_quality concurrently while one client measures the latency of
+/get_traffic, which needs no upstream at all. Both servers run a single worker process. The async server
+keeps at most air_pollution.http.pool_maxsize upstream requests in flight, which bounds its air quality
+throughput to about pool_maxsize / latency.
+
+Usage:
+    python -m benchmarks.slow_upstream --latency 1 --clients 50 --duration 10
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.scaling import free_port, wait_ready
+from benchmarks.stub_server import GiosStub
+
+
+def start_server(mode, port, stub_url, threads):
+    env = dict(os.environ, APP_CONFIG_OVERRIDES=f"air_pollution.cache.enabled=false "
+                                                f"air_pollution.air_pollution_url={stub_url}")
+    if mode == "sync":
+        command = ["-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "--workers", "1",
+                   "--threads", str(threads), "--log-level", "warning", "wsgi:app"]
+    else:
+        command = ["-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port), "--workers", "1",
+                   "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen([sys.executable] + command, env=env)
+
+
+def request_loop(port, path, deadline, latencies, failures):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                latencies.append(time.monotonic() - start)
+            else:
+                failures.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            failures.append(repr(e))
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    connection.close()
+
+
+def measure(mode, stub, clients, duration, threads):
+    """
+    Load a server with concurrent air quality requests and probe the latency of /get_traffic meanwhile.
+
+    :return: Dictionary with air quality throughput and traffic latency percentiles.
+    """
+    port = free_port()
+    server = start_server(mode, port, stub.url, threads)
+    try:
+        wait_ready(port)
+        deadline = time.monotonic() + duration
+        air_latencies, air_failures, traffic_latencies, traffic_failures = [], [], [], []
+        workers = [threading.Thread(target=request_loop, args=(port, f"/get_air_quality?lat={49 + i % 50 * 0.1:.1f}"
+                                                                     f"&lon={22 + i % 7 * 0.3:.1f}",
+                                                               deadline, air_latencies, air_failures))
+                   for i in range(clients)]
+        workers.append(threading.Thread(target=request_loop, args=(port, "/get_traffic?hour=8&day_of_week=Monday",
+                                                                   deadline, traffic_latencies, traffic_failures)))
+        start = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - start
+    finally:
+        server.terminate()
+        server.wait()
+    if len(traffic_latencies) > 1:
+        quantiles = statistics.quantiles(traffic_latencies, n=100)
+    else:
+        quantiles = (traffic_latencies or [float("nan")]) * 99
+    return {"mode": mode, "air_quality_rps": len(air_latencies) / elapsed, "air_quality_failed": len(air_failures),
+            "traffic_requests": len(traffic_latencies), "traffic_p50": quantiles[49], "traffic_p99": quantiles[98]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async servers against a slow upstream.")
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds the stub delays every response")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent air quality clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per server")
+    parser.add_argument("--threads", type=int, default=4, help="Threads of the sync worker")
+    args = parser.parse_args()
+
+    print(f"{'server':<8}{'air req/s':>12}{'air failed':>12}{'traffic reqs':>14}{'traffic p50 ms':>16}"
+          f"{'traffic p99 ms':>16}")
+    with GiosStub(latency=args.latency) as stub:
+        for mode in ("sync", "async"):
+            result = measure(mode, stub, args.clients, args.duration, args.threads)
+            print(f"{mode:<8}{result['air_quality_rps']:>12.1f}{result['air_quality_failed']:>12}"
+                  f"{result['traffic_requests']:>14}{result['traffic_p50'] * 1000:>16.1f}"
+                  f"{result['traffic_p99'] * 1000:>16.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
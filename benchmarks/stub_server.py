@@ -0,0 +1,128 @@
+"""
+Local stand-in for the GIOŚ air quality index API.
+
+Serves /<anything>/<station_id> with a response in the getIndex format, with configurable latency and error
+rate, and counts upstream hits per station. Used by benchmarks and load tests so they run offline.
+
+Usage:
+    python -m benchmarks.stub_server --port 8081 --latency 0.2 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+INDEX_LEVELS = ["Bardzo dobry", "Dobry", "Umiarkowany", "Dostateczny", "Zły", "Bardzo zły"]
+
+
+class GiosStub:
+    """
+    Threaded HTTP server imitating the air quality index endpoint.
+
+    Attributes:
+        latency (float): Seconds every response is delayed.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        hits (collections.Counter): Number of requests per station id.
+        responses (dict): Fixed (status, payload) answers per station id, e.g. (404, None) for an unknown
+            station or (200, {"stIndexLevel": {"id": -1, ...}}) for a station without an index.
+
+    Methods:
+        start: Start serving in a background thread.
+        stop: Stop the server.
+        url: Base URL to use as air_pollution_url.
+        total_hits: Number of requests served.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.hits = Counter()
+        self.responses = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, with Nagle keep-alive clients would wait for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                station_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+                with stub.lock:
+                    stub.hits[station_id] += 1
+                    failed = stub.random.random() < stub.error_rate
+                    fixed = stub.responses.get(station_id)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if fixed is not None:
+                    status, payload = fixed
+                    body = json.dumps(payload).encode()
+                elif failed:
+                    body, status = b'{"error": "stub failure"}', 500
+                else:
+                    level = sum(map(ord, station_id)) % 4
+                    body = json.dumps({"id": station_id,
+                                       "stIndexLevel": {"id": level, "indexLevelName": INDEX_LEVELS[level]}}).encode()
+                    status = 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        Base URL, the station id is appended to it like to air_pollution_url.
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/pjp-api/rest/aqindex/getIndex/"
+
+    def total_hits(self):
+        with self.lock:
+            return sum(self.hits.values())
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="gios-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local GIOŚ air quality index API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every response is delayed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+    stub = GiosStub(args.host, args.port, args.latency, args.error_rate)
+    print(f"Serving {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Served {stub.total_hits()} requests")
+
+
+if __name__ == "__main__":
+    main()
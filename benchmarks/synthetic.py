@@ -0,0 +1,63 @@
+"""
+Synthetic datasets for scaling benchmarks.
+
+Zone layers are built by tiling the real Rzeszów zones over a grid of "cities", station lists by adding
+random stations around Europe to the real list. Both are returned in the preloaded form accepted by
+PaidParkingZones(config, zones=...) and AirQuality(config, stations=...).
+"""
+import math
+
+import numpy as np
+import pyproj
+import shapely
+
+
+def zone_layer(ppz, scale):
+    """
+    Tile the zones of a PaidParkingZones instance to get `scale` times as many zones.
+
+    :param ppz: PaidParkingZones with the real zones.
+    :param scale: Multiplier of the number of zones.
+    :return: (geometries, subzone names, crs) tuple.
+    """
+    geometries = ppz.zone_geometries
+    xmin, ymin, xmax, ymax = shapely.total_bounds(geometries)
+    width, height = (xmax - xmin) * 1.5, (ymax - ymin) * 1.5
+    columns = math.ceil(math.sqrt(scale))
+    tiles = [shapely.transform(geometries, lambda coords, dx=(i % columns) * width, dy=(i // columns) * height:
+                               coords + [dx, dy])
+             for i in range(scale)]
+    return np.concatenate(tiles), np.tile(ppz.zone_names, scale), ppz.crs
+
+
+def zone_query_points(ppz, geometries, count, seed=0):
+    """
+    Random lon/lat points over the extent of a (synthetic) zone layer.
+
+    :param ppz: PaidParkingZones, used for the coordinate systems.
+    :param geometries: Zone geometries in the zones coordinate system.
+    :param count: Number of points.
+    :param seed: Random seed.
+    :return: (longitudes, latitudes) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = shapely.total_bounds(geometries)
+    to_lonlat = pyproj.Transformer.from_crs(ppz.config.output_coordinates_format,
+                                            ppz.config.input_coordinates_format, always_xy=True)
+    return to_lonlat.transform(rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count))
+
+
+def station_list(air_quality, scale, seed=0):
+    """
+    Extend the stations of an AirQuality instance with random stations to get `scale` times as many.
+
+    :param air_quality: AirQuality with the real stations.
+    :param scale: Multiplier of the number of stations.
+    :param seed: Random seed.
+    :return: (station_ids, station_coords) tuple.
+    """
+    rng = np.random.default_rng(seed)
+    extra = len(air_quality.station_ids) * (scale - 1)
+    coords = np.column_stack([rng.uniform(35, 70, extra), rng.uniform(-10, 40, extra)])
+    ids = np.arange(extra) + int(air_quality.station_ids.max()) + 1
+    return np.concatenate([air_quality.station_ids, ids]), np.concatenate([air_quality.station_coords, coords])
@@ -0,0 +1,167 @@
+"""
+Checks of request coalescing and the circuit breaker against a local GIOŚ stub injecting latency and failures.
+
+Every scenario prints PASS or FAIL with the numbers it is based on, the exit code is 1 when any scenario failed.
+
+Usage:
+    python -m benchmarks.upstream_faults
+"""
+import asyncio
+import sys
+import threading
+import time
+
+from omegaconf import OmegaConf
+
+from benchmarks.stub_server import GiosStub
+
+CONCURRENCY = 50
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 1.0
+
+
+def create_air_quality(app_config, stub):
+    from air_quality.air_data import AirQuality
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    config.air_pollution.air_pollution_url = stub.url
+    config.air_pollution.cache.enabled = False
+    config.air_pollution.prefetch.enabled = False
+    config.air_pollution.circuit_breaker.failure_threshold = FAILURE_THRESHOLD
+    config.air_pollution.circuit_breaker.reset_timeout = RESET_TIMEOUT
+    return AirQuality(config)
+
+
+def concurrently(count, func):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        results[i] = func()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def check(name, passed, details):
+    print(f"{'PASS' if passed else 'FAIL'}  {name}: {details}")
+    return passed
+
+
+def coalescing(app_config):
+    with GiosStub(latency=0.3) as stub:
+        air_quality = create_air_quality(app_config, stub)
+        results = concurrently(CONCURRENCY, lambda: air_quality.get_air_quality(None, None))
+    return check("concurrent requests for one station share one upstream request",
+                 stub.total_hits() == 1 and all(result == results[0] is not None for result in results),
+                 f"{CONCURRENCY} callers, {stub.total_hits()} upstream requests, stats {air_quality.single_flight.stats}")
+
+
+def async_coalescing(app_config):
+    from air_quality.async_air_data import AsyncAirQuality
+
+    async def run(air_quality):
+        try:
+            return await asyncio.gather(*(air_quality.get_air_quality(None, None) for _ in range(CONCURRENCY)))
+        finally:
+            await air_quality.close()
+
+    with GiosStub(latency=0.3) as stub:
+        async_air_quality = AsyncAirQuality(create_air_quality(app_config, stub))
+        results = asyncio.run(run(async_air_quality))
+    return check("concurrent async requests for one station share one upstream request",
+                 stub.total_hits() == 1 and all(result == results[0] is not None for result in results),
+                 f"{CONCURRENCY} callers, {stub.total_hits()} upstream requests, "
+                 f"stats {async_air_quality.single_flight.stats}")
+
+
+def circuit_breaker(app_config):
+    passed = True
+    with GiosStub(latency=0.05) as stub:
+        air_quality = create_air_quality(app_config, stub)
+        known = air_quality.get_air_quality(None, None)
+
+        stub.error_rate = 1.0
+        hits_before = stub.total_hits()
+        start = time.perf_counter()
+        results = [air_quality.get_air_quality(None, None) for _ in range(20)]
+        elapsed = time.perf_counter() - start
+        upstream = stub.total_hits() - hits_before
+        passed &= check("failing upstream opens the circuit and serves the last known value",
+                        upstream == FAILURE_THRESHOLD and air_quality.breaker.state == "open"
+                        and all(result == known for result in results),
+                        f"20 requests, {upstream} upstream requests, state {air_quality.breaker.state}, "
+                        f"{elapsed * 1000:.0f} ms total")
+
+        unknown = air_quality.get_air_quality(50.0, 19.9)
+        passed &= check("open circuit without a last known value gives no data",
+                        unknown is None, f"result {unknown}, fallbacks {air_quality.fallback_stats}")
+
+        time.sleep(RESET_TIMEOUT)
+        hits_before = stub.total_hits()
+        air_quality.get_air_quality(None, None)
+        passed &= check("after reset_timeout a failed trial request opens the circuit again",
+                        stub.total_hits() - hits_before == 1 and air_quality.breaker.state == "open",
+                        f"{stub.total_hits() - hits_before} upstream requests, state {air_quality.breaker.state}")
+
+        stub.error_rate = 0.0
+        time.sleep(RESET_TIMEOUT)
+        result = air_quality.get_air_quality(None, None)
+        passed &= check("a successful trial request closes the circuit",
+                        result is not None and air_quality.breaker.state == "closed",
+                        f"state {air_quality.breaker.state}, events {air_quality.breaker.stats}")
+    return passed
+
+
+def station_errors(app_config):
+    passed = True
+    answers = {
+        "404": (404, {"error": "unknown station"}),
+        "911": (200, {"id": 911, "stIndexLevel": {"id": -1, "indexLevelName": "Brak indeksu"}}),
+        "912": (200, {"id": 912, "stIndexLevel": None}),
+        "913": (200, {"id": 913}),
+    }
+    with GiosStub() as stub:
+        stub.responses.update(answers)
+        air_quality = create_air_quality(app_config, stub)
+        for _ in range(FAILURE_THRESHOLD):
+            for station_id in answers:
+                passed &= check(f"station {station_id} {answers[station_id]} gives no data",
+                                air_quality.fetch_air_quality(station_id) is None, "")
+        passed &= check("answers without data for a station do not open the circuit",
+                        air_quality.breaker.state == "closed",
+                        f"state {air_quality.breaker.state}, events {air_quality.breaker.stats}")
+
+        stub.error_rate = 1.0
+        for _ in range(FAILURE_THRESHOLD):
+            air_quality.fetch_air_quality("1")
+        passed &= check("server errors open the circuit", air_quality.breaker.state == "open",
+                        f"state {air_quality.breaker.state}, events {air_quality.breaker.stats}")
+    return passed
+
+
+def flaky_upstream(app_config):
+    with GiosStub(latency=0.02, error_rate=0.3, seed=1) as stub:
+        air_quality = create_air_quality(app_config, stub)
+        while air_quality.get_air_quality(None, None) is None:
+            time.sleep(0.05)
+        results = concurrently(CONCURRENCY, lambda: air_quality.get_air_quality(None, None))
+        answered = sum(result is not None for result in results)
+    return check("with 30 % upstream errors every request gets data once one succeeded",
+                 answered == CONCURRENCY,
+                 f"{answered}/{CONCURRENCY} answered, {stub.total_hits()} upstream requests, "
+                 f"events {air_quality.breaker.stats}")
+
+
+def main():
+    import main as app_module
+    scenarios = [coalescing, async_coalescing, circuit_breaker, station_errors, flaky_upstream]
+    results = [scenario(app_module.config) for scenario in scenarios]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
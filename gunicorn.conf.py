@@ -0,0 +1,66 @@
+"""
+Gunicorn settings for production serving, values come from the serving section of conf/config.yaml.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app and its datasets are loaded once in the master process (preload_app) and shared copy-on-write by the
+workers. When the data files change the master loads the datasets again and gracefully replaces the workers
+(the same as `kill -HUP <master pid>`), so no request is dropped.
+"""
+import multiprocessing
+import os
+import signal
+
+from omegaconf import OmegaConf
+
+_config = OmegaConf.load("conf/config.yaml")
+_serving = _config.serving
+
+bind = _serving.bind
+workers = _serving.workers or multiprocessing.cpu_count()
+threads = _serving.threads
+worker_class = "gthread"
+timeout = _serving.timeout
+graceful_timeout = _serving.graceful_timeout
+preload_app = True
+
+
+def _multiprocess_metrics():
+    return _config.metrics.enabled and _config.metrics.multiprocess_dir
+
+
+def on_starting(server):
+    # Metrics of workers from a previous run would be merged into the new ones
+    if _multiprocess_metrics():
+        from utils.metrics import remove_states
+        remove_states(_config.metrics.multiprocess_dir)
+
+
+def when_ready(server):
+    if not _serving.reload_on_data_change:
+        return
+    import main
+    from utils.reloader import DataWatcher
+
+    def reload():
+        server.log.info("Data files changed, reloading datasets")
+        try:
+            main.reload_datasets()
+        except Exception:
+            server.log.exception("Reloading datasets failed, workers keep the previous data")
+            return
+        os.kill(server.pid, signal.SIGHUP)
+
+    DataWatcher(main.data_files(), _serving.reload_poll_interval, reload).start()
+
+
+def post_fork(server, worker):
+    import main
+    main.after_fork()
+
+
+def child_exit(server, worker):
+    # Keep the counts of the exited worker without its gauges, a new worker may get the same pid
+    if _multiprocess_metrics():
+        from utils.metrics import mark_process_dead
+        mark_process_dead(_config.metrics.multiprocess_dir, worker.pid)
@@ -1,19 +1,131 @@
 from flask import Flask, request, jsonify
-from means_of_transport import initialize_means_of_transport, MeansOfTransport, Car
+from means_of_transport import initialize_means_of_transport, MeansOfTransport, MeansOfTransportRegistry, Car, \
+    transport_summary_batch
 from utils.utils import *
-import pandas as pd
-from paid_parking_zones.calculator import PaidParkingZones
-from hydra import initialize, compose
+from utils.lazy import Lazy
+from utils.snapshot import RuntimeSnapshot, CONFIG_FILE, source_files
+from utils.metrics import metrics, instrument_app
+from utils.profiling import enable_profiling
+from pricing import PricingModel
+from annual_simulation import schedule_matrix, simulate_annual
+import numpy as np
+import os
 from datetime import datetime
-from air_quality.air_data import AirQuality
+from traffic_intensity.traffic import DAYS_OF_WEEK
 
 app = Flask(__name__)
-initialize(version_base=None, config_path="conf", job_name="test")
-config = compose(config_name='config')
+# The prebuilt snapshot (python -m utils.snapshot) skips hydra and parsing of the data files
+snapshot = RuntimeSnapshot.load()
+if snapshot is not None:
+    config = snapshot.config
+else:
+    from hydra import initialize, compose
+    initialize(version_base=None, config_path="conf", job_name="test")
+    config = compose(config_name='config')
+# Ad hoc overrides of config values, e.g. APP_CONFIG_OVERRIDES="air_pollution.cache.enabled=false"
+if os.environ.get('APP_CONFIG_OVERRIDES'):
+    from omegaconf import OmegaConf
+    config = OmegaConf.merge(config, OmegaConf.from_dotlist(os.environ['APP_CONFIG_OVERRIDES'].split()))
+pricing = PricingModel.from_config(config)
+metrics.configure(config.metrics)
+instrument_app(app)
+enable_profiling(app, config.profiling)
+
+
+def load_traffic():
+    from traffic_intensity.traffic import TrafficIntensity
+    return TrafficIntensity(config, matrix=snapshot.traffic_matrix if snapshot is not None else None)
+
+
+def load_counter_traffic():
+    from traffic_intensity.counters import CounterTraffic
+    return CounterTraffic(config)
+
+
+def load_paid_parking_zones():
+    from paid_parking_zones.calculator import PaidParkingZones
+    return PaidParkingZones(config, zones=snapshot.zones if snapshot is not None else None)
+
+
+def load_air_quality():
+    from air_quality.air_data import AirQuality
+    return AirQuality(config, stations=snapshot.stations if snapshot is not None else None)
+
+
+# Heavy subsystems are created on first use
+traffic = Lazy('traffic', load_traffic)
+counter_traffic = Lazy('counter_traffic', load_counter_traffic)
+ppz = Lazy('paid_parking_zones', load_paid_parking_zones)
+air_quality = Lazy('air_quality', load_air_quality)
+datasets = [traffic, counter_traffic, ppz, air_quality]
+
+
+def load_datasets():
+    """
+    Load every dataset now instead of on first use, e.g. in the master process before forking workers.
+    """
+    for dataset in datasets:
+        dataset.get()
+
+
+def reload_datasets():
+    """
+    Load every dataset again from the data files, replacing the loaded ones once they are ready.
+    """
+    global snapshot
+    # The snapshot was built from the previous data files
+    snapshot = None
+    previous_air_quality = air_quality.instance
+    for dataset in datasets:
+        dataset.reload()
+    if previous_air_quality is not None:
+        previous_air_quality.close()
+
+
+def after_fork():
+    """
+    Prepare datasets loaded in the master process for use in a forked worker process.
+    """
+    if air_quality.loaded():
+        air_quality.after_fork()
+
+
+def data_files():
+    """
+    The counter store is listed instead of the normalize_traffic csv files, the app never reads those: the traffic
+    pipeline (or python -m traffic_intensity.counters) rebuilds the store from them, which triggers the reload.
+
+    :return: List of the data files the datasets are loaded from.
+    """
+    cfg_counters = config.traffic.counters
+    return [path for path in source_files(config) if path != CONFIG_FILE] + [cfg_counters.store_file,
+                                                                             cfg_counters.index_file]
+
+
+AIR_QUALITY_UNAVAILABLE = "Air quality data is not available, the air quality API is failing."
+
+
+def round_traffic(values):
+    """
+    Round traffic values for a JSON response, missing values become None.
+
+    :param values: Array of traffic values.
+    :return: List of rounded values.
+    """
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness check, passes only after every dataset is loaded.
+
+    :return: JSON response with the load state of every dataset, status 503 until all of them are loaded.
+    """
+    loaded = {dataset.name: dataset.loaded() for dataset in datasets}
+    is_ready = all(loaded.values())
+    return jsonify({'ready': is_ready, 'datasets': loaded}), 200 if is_ready else 503
 
-df = pd.read_csv(config.traffic.average_traffic_file)
-ppz = PaidParkingZones(config)
-air_quality = AirQuality(config)
 
 @app.route('/get_traffic', methods=['GET'])
 def get_traffic():
@@ -23,14 +135,17 @@ def get_traffic():
     :return: JSON response with traffic data.
     """
     cfg = config.traffic
-    hour = int(request.args.get(cfg.params.hour))
+    try:
+        hour = int(request.args.get(cfg.params.hour))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parameter 'hour' must be an integer."}), 400
     day_of_week = request.args.get(cfg.params.day_of_week)
-    result = df[(df[cfg.hour] == hour) & (df[cfg.day_of_week] == day_of_week)]
+    result = traffic.lookup(hour, day_of_week)
 
-    if result.empty:
+    if result is None:
         return jsonify({"error": "No data found for the provided parameters."}), 404
     traffic_result = {
-        config.traffic.traffic_result: round(result.values[0][0],2)
+        config.traffic.traffic_result: round(result, 2)
     }
     return jsonify(traffic_result)
 
@@ -43,44 +158,118 @@ def get_current_traffic():
     :return: JSON response with current traffic data.
     """
     current_time = datetime.now()
-    current_hour = current_time.hour
-    current_day_of_week = current_time.strftime('%A')
-    result = df[(df[config.traffic.hour] == current_hour) & (df[config.traffic.day_of_week] == current_day_of_week)]
+    result = traffic.lookup(current_time.hour, DAYS_OF_WEEK[current_time.weekday()])
 
-    if result.empty:
+    if result is None:
         return jsonify({"error": "No data found for the current time."}), 404
     traffic_result = {
-        config.traffic.traffic_result: round(result.values[0][0],2)
+        config.traffic.traffic_result: round(result, 2)
     }
     return jsonify(traffic_result)
 
 
-@app.route('/get_saving_for_travel', methods=['GET'])
-def get_saving_for_travel():
+@app.route('/get_traffic_range', methods=['GET'])
+def get_traffic_range():
     """
-    Get cost and CO2 emission savings for a given means of transport.
+    Get traffic data for every hour of a day, or for the whole week if no day is provided.
 
-    :return: JSON response with cost and CO2 emission savings compare to car.
+    :return: JSON response with a list of 24 hourly values or a mapping of day of the week to such lists.
+    """
+    day_of_week = request.args.get(config.traffic.params.day_of_week)
+    if day_of_week is None:
+        week = traffic.week_matrix()
+        return jsonify({config.traffic.traffic_result: {day: round_traffic(week[i]) for i, day in enumerate(DAYS_OF_WEEK)}})
+
+    curve = traffic.day_curve(day_of_week)
+    if curve is None:
+        return jsonify({"error": "No data found for the provided parameters."}), 404
+    return jsonify({config.traffic.traffic_result: round_traffic(curve)})
+
+
+@app.route('/get_counter_traffic', methods=['GET'])
+def get_counter_traffic():
+    """
+    Get traffic data of a single counter given by id.
+
+    :return: JSON response with traffic data and the counter used.
+    """
+    cfg = config.traffic
+    cfg_params = cfg.counters.params
+    try:
+        hour = int(request.args.get(cfg.params.hour))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parameter 'hour' must be an integer."}), 400
+    day_of_week = request.args.get(cfg.params.day_of_week)
+    counter_id = request.args.get(cfg_params.counter_id)
+    if counter_id is None:
+        return jsonify({"error": "Provide 'counter_id'."}), 400
+
+    result = counter_traffic.counter_traffic(counter_id, hour, day_of_week)
+    counters = [{"id": counter_id}]
+    if result is None:
+        return jsonify({"error": "No data found for the provided parameters."}), 404
+    return jsonify({cfg.traffic_result: round(result, 2), "counters": counters})
+
+
+def integer_param(name, value):
+    """
+    Convert a request parameter to an integer, rejecting non-integral numbers instead of truncating them.
+
+    :param name: Parameter name used in the error message.
+    :param value: Value from the query string or a JSON body.
+    :return: The integer value.
+    :raises ValueError: If the value is not an integral number.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or not number.is_integer():
+        raise ValueError(f"'{name}' must be an integer, got {value}")
+    return int(number)
+
+
+def car_summary_from_request(distance):
     """
-    cfg_params = config.means_of_transport.params
-    transport_type = int(request.args.get(cfg_params.transport_type.value, cfg_params.transport_type.default))
-    distance = float(request.args.get(cfg_params.distance.value, cfg_params.distance.default))
+    Calculate the car cost and CO2 emission summary for the car parameters of the current request.
+
+    :param distance: The distance of the trip.
+    :return: A dictionary with 'cost' and 'co2' keys.
+    """
+    cfg_params = pricing.params
     car_avg_consumption = request.args.get(cfg_params.avg_consumption.value, cfg_params.avg_consumption.default)
     fuel_type = request.args.get(cfg_params.fuel_type.value, cfg_params.fuel_type.default)
     fuel_price = request.args.get(cfg_params.fuel_price.value, cfg_params.fuel_price.default)
     lon = request.args.get(cfg_params.lon.value,cfg_params.lon.default)
     lat = request.args.get(cfg_params.lat.value,cfg_params.lat.default)
+    car_transport = Car(car_avg_consumption, fuel_type, pricing)
+    return car_transport.cost_summary(distance, fuel_price,lon,lat,ppz)
+
+
+@app.route('/get_saving_for_travel', methods=['GET'])
+def get_saving_for_travel():
+    """
+    Get cost and CO2 emission savings for a given means of transport.
+
+    :return: JSON response with cost and CO2 emission savings compare to car.
+    """
+    cfg_params = pricing.params
+    try:
+        transport_type = integer_param(cfg_params.transport_type.value,
+                                       request.args.get(cfg_params.transport_type.value,
+                                                        cfg_params.transport_type.default))
+        distance = float(request.args.get(cfg_params.distance.value, cfg_params.distance.default))
+        car_summary_cost = car_summary_from_request(distance)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid data: {e}'}), 400
     # Calculate CO2 and cost for the selected transport type
-    transport: MeansOfTransport | None = initialize_means_of_transport(transport_type, config)
+    transport: MeansOfTransport | None = initialize_means_of_transport(transport_type, pricing)
 
     if transport is None:
         return jsonify({'error': 'Invalid transport type'}), 404
 
     transport_summary_cost = transport.cost_summary(distance)
 
-    car_transport = Car(car_avg_consumption, fuel_type, config)
-    car_summary_cost = car_transport.cost_summary(distance, fuel_price,lon,lat,ppz)
-
     savings = calculate_cost_co2_difference(car_summary_cost, transport_summary_cost)
 
     if savings is not None:
@@ -89,19 +278,155 @@ def get_saving_for_travel():
         return jsonify({'error': 'Invalid data or missing keys'}), 404
 
 
+@app.route('/get_travel_comparison', methods=['GET'])
+def get_travel_comparison():
+    """
+    Compare every registered means of transport with a car for one trip.
+
+    The car baseline, including the paid parking lookup, is calculated once and every means of transport
+    is ranked by its savings ('rank_by' = 'cost' or 'co2', default 'cost'), best first.
+
+    :return: JSON response with the car baseline and the ranked list of means of transport.
+    """
+    cfg_params = pricing.params
+    rank_by = request.args.get('rank_by', 'cost')
+    if rank_by not in ('cost', 'co2'):
+        return jsonify({'error': "Parameter 'rank_by' must be 'cost' or 'co2'"}), 400
+    try:
+        distance = float(request.args.get(cfg_params.distance.value, cfg_params.distance.default))
+        car_summary_cost = car_summary_from_request(distance)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid data: {e}'}), 400
+    comparison = []
+    for transport_type, transport_class in MeansOfTransportRegistry.all_transports().items():
+        transport_summary_cost = initialize_means_of_transport(transport_type, pricing).cost_summary(distance)
+        savings = calculate_cost_co2_difference(car_summary_cost, transport_summary_cost)
+        comparison.append({
+            'transport_type': transport_type,
+            'name': pricing.types.get(transport_type, transport_class.__name__.lower()),
+            **transport_summary_cost,
+            **savings
+        })
+    comparison.sort(key=lambda item: item[f'{rank_by}_difference'], reverse=True)
+    return jsonify({'car': car_summary_cost, 'comparison': comparison})
+
+
+def batch_param(trips, param, size, dtype=float):
+    """
+    Read a trip parameter array from a batch request body, filling missing entries with the default.
+
+    :param trips: Decoded JSON body of the request.
+    :param param: Config node of the parameter (with 'value' and 'default').
+    :param size: Number of trips.
+    :param dtype: Type of the resulting array.
+    :return: NumPy array of the parameter values, NaN where a float value is missing.
+    :raises ValueError: For a wrong number of elements or a value that is not of the type, the same as the
+                        single-trip endpoint.
+    """
+    values = trips.get(param.value)
+    if values is None:
+        values = [param.default] * size
+    if len(values) != size:
+        raise ValueError(f"'{param.value}' must have {size} elements")
+    values = [param.default if value is None else value for value in values]
+    if dtype is float:
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    if dtype is int:
+        return np.array([integer_param(param.value, value) for value in values], dtype=np.int64)
+    return np.array([str(value) for value in values], dtype=dtype)
+
+
+@app.route('/get_saving_for_travel_batch', methods=['POST'])
+def get_saving_for_travel_batch():
+    """
+    Get cost and CO2 emission savings for many trips in one request.
+
+    The JSON body holds arrays of the /get_saving_for_travel parameters (transport_type, distance,
+    avg_consumption, fuel_type, fuel_price, lon, lat), one element per trip. Missing arrays or null
+    elements use the same defaults as the single-trip endpoint.
+
+    :return: JSON response with 'cost_difference' and 'co2_difference' arrays, null for trips with an
+             invalid transport type.
+    """
+    cfg_params = pricing.params
+    trips = request.get_json(silent=True)
+    if not isinstance(trips, dict):
+        return jsonify({'error': 'Request body must be a JSON object of arrays'}), 400
+    size = max((len(values) for values in trips.values() if isinstance(values, list)), default=0)
+    try:
+        transport_types = batch_param(trips, cfg_params.transport_type, size, dtype=int)
+        distances = batch_param(trips, cfg_params.distance, size)
+        avg_consumptions = batch_param(trips, cfg_params.avg_consumption, size)
+        fuel_types = batch_param(trips, cfg_params.fuel_type, size, dtype=str)
+        fuel_prices = batch_param(trips, cfg_params.fuel_price, size)
+        lons = batch_param(trips, cfg_params.lon, size)
+        lats = batch_param(trips, cfg_params.lat, size)
+        transport_summary_cost = transport_summary_batch(transport_types, distances, pricing)
+        car_summary_cost = Car.cost_summary_batch(distances, avg_consumptions, fuel_types, fuel_prices,
+                                                  lons, lats, ppz, pricing)
+    except (TypeError, ValueError, KeyError) as e:
+        return jsonify({'error': f'Invalid data: {e}'}), 400
+
+    savings = calculate_cost_co2_difference(car_summary_cost, transport_summary_cost)
+    return jsonify({key: [None if np.isnan(value) else value for value in values.tolist()]
+                    for key, values in savings.items()})
+
+
+def annual_simulation_from_request(car, daily_distance, fuel_price):
+    """
+    Simulate a year of commuting by car for the schedule, year, location and transport type of the current request.
+
+    :param car: Car instance.
+    :param daily_distance: The daily distance traveled.
+    :param fuel_price: Fuel price per liter (if None, use average fuel price).
+    :return: JSON response with the annual summary and its breakdowns.
+    """
+    cfg_params = pricing.params
+    schedule = request.args.get(cfg_params.schedule.value, cfg_params.schedule.default)
+    year = request.args.get(cfg_params.year.value, cfg_params.year.default)
+    lon = request.args.get(cfg_params.lon.value, cfg_params.lon.default)
+    lat = request.args.get(cfg_params.lat.value, cfg_params.lat.default)
+    transport_type = request.args.get(cfg_params.transport_type.value)
+    try:
+        departures = schedule_matrix(config.annual_simulation.default_schedule if schedule is None else schedule)
+        year = datetime.now().year if year is None else int(year)
+        transport = None
+        if transport_type is not None:
+            transport = initialize_means_of_transport(int(transport_type), pricing)
+            if transport is None:
+                return jsonify({'error': 'Invalid transport type'}), 404
+        parking_price = ppz.check_price(longitude=lon, latitude=lat) if lon is not None and lat is not None else 0
+        summary = simulate_annual(car, float(daily_distance), departures, traffic.matrix,
+                                  config.annual_simulation.congestion_penalty, year, fuel_price=fuel_price,
+                                  parking_price=parking_price, transport=transport)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid data: {e}'}), 400
+    return jsonify(summary)
+
+
 @app.route('/get_annual_saving', methods=['GET'])
 def get_annual_saving_summary():
     """
     Get annual cost and CO2 emission for a car.
 
+    With mode=simulation every hour of the year is simulated for a commute schedule, with fuel consumption raised
+    by traffic congestion and paid parking at lon/lat on every trip. The response then also holds 'monthly' and
+    'weekday' breakdowns and, for a given transport_type, the savings of making the same trips with it.
+
     :return: JSON response with annual cost and CO2 emission savings.
     """
-    cfg_params = config.means_of_transport.params
+    cfg_params = pricing.params
     avg_consumption = request.args.get(cfg_params.avg_consumption.value, cfg_params.avg_consumption.default)
     fuel_type = request.args.get(cfg_params.fuel_type.value, cfg_params.fuel_type.default)
+    fuel_price = request.args.get(cfg_params.fuel_price.value, cfg_params.fuel_price.default)
     daily_distance = request.args.get(cfg_params.daily_distance.value, cfg_params.daily_distance.default)
-    car = Car(avg_consumption, fuel_type, config)
-    annual_summary = car.annual_summary(daily_distance)
+    mode = request.args.get(cfg_params.mode.value, cfg_params.mode.default)
+    car = Car(avg_consumption, fuel_type, pricing)
+    if mode == 'simulation':
+        return annual_simulation_from_request(car, daily_distance, fuel_price)
+    if mode != 'flat':
+        return jsonify({'error': "Parameter 'mode' must be 'flat' or 'simulation'"}), 400
+    annual_summary = car.annual_summary(daily_distance, fuel_price)
 
     if annual_summary is not None:
         return jsonify(annual_summary)
@@ -139,5 +464,42 @@ def get_air_quality():
     # Check if the result is not None
     if result is not None:
         return jsonify(result)
+    return jsonify({'error': AIR_QUALITY_UNAVAILABLE}), 503
+
+
+@app.route('/get_air_quality_history', methods=['GET'])
+def get_air_quality_history():
+    """
+    Endpoint for retrieving stored air quality indices, newest first.
+
+    Query Parameters:
+    - station_id (int, optional): Station identifier.
+    - lat, lon (float, optional): Location, the nearest station is used when station_id is missing.
+      Without both all stations are returned.
+    - start, end (optional): Time range as Unix seconds or ISO 8601 (UTC unless an offset is given).
+    - limit (int, optional): Maximum number of records, at most air_pollution.history.query_limit.
+
+    Returns:
+    - JSON: {"records": [{"station_id", "timestamp", "air_quality", "air_quality_id", "extra_points"}, ...]}
+    """
+    from air_quality.history import parse_time
+    cfg_params = config.air_pollution.params
+    if air_quality.history is None:
+        return jsonify({'error': 'Air quality history is disabled'}), 404
+    station_id = request.args.get(cfg_params.station_id, None)
+    lat = request.args.get(cfg_params.lat, None)
+    lon = request.args.get(cfg_params.lon, None)
+    try:
+        if station_id is None and lat is not None and lon is not None:
+            station_id = air_quality.find_nearest_station(lat, lon)
+        records = air_quality.history.query(station_id=station_id,
+                                            start=parse_time(request.args.get(cfg_params.start, None)),
+                                            end=parse_time(request.args.get(cfg_params.end, None)),
+                                            limit=request.args.get(cfg_params.limit, None))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid data: {e}'}), 400
+    return jsonify({'records': records})
+
+
 if __name__ == '__main__':
     app.run(debug=True)
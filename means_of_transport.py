@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
-from  paid_parking_zones.calculator import PaidParkingZones
+from typing import TYPE_CHECKING
+import numpy as np
+from pricing import PricingModel, as_pricing
+if TYPE_CHECKING:
+    from paid_parking_zones.calculator import PaidParkingZones
 class MeansOfTransportRegistry:
     _registry = {}
 
@@ -27,13 +31,41 @@ class MeansOfTransportRegistry:
         """
         return cls._registry.get(transport_type, None)
 
+    @classmethod
+    def all_transports(cls):
+        """
+        Get all registered means of transport classes.
+
+        :return: A dictionary of identifier to means of transport class, sorted by identifier.
+        """
+        return dict(sorted(cls._registry.items()))
+
+    @classmethod
+    def get_instance(cls, transport_type, pricing: PricingModel):
+        """
+        Get a shared, stateless instance of a means of transport for a pricing model.
+
+        :param transport_type: Identifier for the means of transport.
+        :param pricing: Pricing model the instance is created with, the instance is cached on it.
+        :return: The means of transport instance or None if not found.
+        """
+        transport_class = cls.get_transport(transport_type)
+        if transport_class is None:
+            return None
+        return pricing.cached((cls, transport_type), lambda: transport_class(pricing))
+
 def initialize_means_of_transport(transport_type: int,config):
     """
     Initialize a means of transport instance based on the provided transport type.
 
+    Instances for a PricingModel are stateless and shared between calls.
+
     :param transport_type: Identifier for the means of transport.
+    :param config: PricingModel or configuration object.
     :return: An instance of the means of transport or None if not found.
     """
+    if isinstance(config, PricingModel):
+        return MeansOfTransportRegistry.get_instance(transport_type, config)
     transport_class = MeansOfTransportRegistry.get_transport(transport_type)
     if transport_class:
         return transport_class(config)
@@ -46,7 +78,10 @@ class MeansOfTransport(ABC):
     """
 
     def __init__(self,config):
-        self.config = config.means_of_transport
+        """
+        :param config: PricingModel or configuration object (resolved into a PricingModel).
+        """
+        self.config = as_pricing(config)
     @abstractmethod
     def calculate_travel_cost(self, distance: float) -> float:
         """
@@ -79,6 +114,23 @@ class MeansOfTransport(ABC):
             'co2': self.calculate_carbon_footprint(distance=distance)
         }
 
+    def cost_summary_batch(self, distances):
+        """
+        Calculate the cost and CO2 emission summary for many trips at once.
+
+        The scalar formulas are evaluated on NumPy arrays, so every element equals the result of cost_summary.
+
+        :param distances: Array of trip distances.
+        :return: A dictionary with 'cost' and 'co2' arrays.
+        """
+        distances = np.asarray(distances, dtype=float)
+        return {
+            'cost': np.broadcast_to(np.asarray(self.calculate_travel_cost(distance=distances), dtype=float),
+                                    distances.shape),
+            'co2': np.broadcast_to(np.asarray(self.calculate_carbon_footprint(distance=distances), dtype=float),
+                                   distances.shape)
+        }
+
 class Car(MeansOfTransport):
     """
     Class representing a car as a means of transport.
@@ -95,9 +147,12 @@ class Car(MeansOfTransport):
         """
         super().__init__(config)
         self.config = self.config.car
-        self.fuel_type = fuel_type if fuel_type is not None else 0
+        # Config keys are strings, the fuel type may come as int (config default) or str (query parameter)
+        self.fuel_type = str(fuel_type) if fuel_type is not None else "0"
         self.avg_consumption = float(avg_consumption) if avg_consumption is not None else self.config.default_avg_consumption
-        self.emission = self.config.co2_emission[fuel_type]
+        if self.fuel_type not in self.config.co2_emission:
+            raise ValueError(f"Unknown fuel type {self.fuel_type}")
+        self.emission = self.config.co2_emission[self.fuel_type]
 
     def calculate_carbon_footprint(self, distance: float) -> float:
         """
@@ -110,7 +165,7 @@ class Car(MeansOfTransport):
         return emission
 
     def calculate_travel_cost(self, distance: float, fuel_price_per_liter: float | None,
-                              lon: float | None, lat: float | None, ppd: PaidParkingZones) -> float:
+                              lon: float | None, lat: float | None, ppd: 'PaidParkingZones') -> float:
         """
         Calculate the travel cost for a car trip.
 
@@ -123,25 +178,35 @@ class Car(MeansOfTransport):
         :return: The travel cost for the trip.
         """
         fuel_consumption_for_trip = (distance / 100) * self.avg_consumption
-        fpl = self.config.default_avg_fuel_price[self.fuel_type] if fuel_price_per_liter is None else float(
-            fuel_price_per_liter)
-        travel_cost = fuel_consumption_for_trip * fpl
+        travel_cost = fuel_consumption_for_trip * self.fuel_price(fuel_price_per_liter)
         if lat is not None and lon is not None:
             # Include the cost of paid parking if coordinates are provided
             travel_cost += ppd.check_price(latitude=lat, longitude=lon)
 
         return travel_cost
 
-    def calculate_annual_travel_cost(self, daily_distance: float) -> float:
+    def fuel_price(self, fuel_price_per_liter: float | None = None) -> float:
+        """
+        Get the fuel price per liter.
+
+        :param fuel_price_per_liter: Fuel price per liter (if None, use average fuel price).
+        :return: The fuel price per liter.
+        """
+        if fuel_price_per_liter is None:
+            return self.config.default_avg_fuel_price[self.fuel_type]
+        return float(fuel_price_per_liter)
+
+    def calculate_annual_travel_cost(self, daily_distance: float, fuel_price_per_liter: float | None = None) -> float:
         """
         Calculate the annual travel cost for a car.
 
         :param daily_distance: The daily distance traveled.
+        :param fuel_price_per_liter: Fuel price per liter (if None, use average fuel price).
         :return: The annual travel cost.
         """
         daily_fuel_consumption = (daily_distance / 100) * self.avg_consumption
         annual_fuel_consumption = daily_fuel_consumption * 365
-        annual_travel_cost = annual_fuel_consumption * self.avg_consumption
+        annual_travel_cost = annual_fuel_consumption * self.fuel_price(fuel_price_per_liter)
         return annual_travel_cost
 
     def calculate_annual_co2_emission(self, daily_distance: float) -> float:
@@ -149,22 +214,22 @@ class Car(MeansOfTransport):
         Calculate the annual CO2 emission for a car.
 
         :param daily_distance: The daily distance traveled.
-        :return: The annual CO2 emission.
+        :return: The annual CO2 emission in grams.
         """
-        daily_fuel_consumption = (daily_distance / 100) * self.avg_consumption
-        annual_fuel_consumption = daily_fuel_consumption * 365
-        annual_co2_emission = annual_fuel_consumption * self.config.co2_emission[self.fuel_type]
+        # Emission factors are per km, the same as for a single trip
+        annual_co2_emission = self.calculate_carbon_footprint(daily_distance * 365)
         return annual_co2_emission
 
-    def annual_summary(self, daily_distance):
+    def annual_summary(self, daily_distance, fuel_price=None):
         """
         Calculate the annual cost and CO2 emission summary for a car.
 
         :param daily_distance: The daily distance traveled.
-        :return: A dictionary with 'cost' and 'co2' keys.
+        :param fuel_price: Fuel price per liter (if None, use average fuel price).
+        :return: A dictionary with 'cost' and 'co2' (kg) keys.
         """
         return {
-            'cost': self.calculate_annual_travel_cost(float(daily_distance)),
+            'cost': self.calculate_annual_travel_cost(float(daily_distance), fuel_price),
             'co2': self.calculate_annual_co2_emission(float(daily_distance))/1000
         }
 
@@ -182,6 +247,73 @@ class Car(MeansOfTransport):
             'co2': self.calculate_carbon_footprint(distance=distance)
         }
 
+    @classmethod
+    def cost_summary_batch(cls, distances, avg_consumptions, fuel_types, fuel_prices, lons, lats, ppd, config):
+        """
+        Calculate the cost and CO2 emission summary for many car trips at once.
+
+        Missing values (NaN) of consumption and fuel price fall back to the defaults, parking is priced with one
+        bulk zone lookup for trips that have both coordinates.
+
+        :param distances: Array of trip distances.
+        :param avg_consumptions: Array of average fuel consumptions in liters per 100 km.
+        :param fuel_types: Array of fuel type keys ("0" for gasoline, "1" for diesel).
+        :param fuel_prices: Array of fuel prices per liter.
+        :param lons: Array of destination longitudes.
+        :param lats: Array of destination latitudes.
+        :param ppd: Instance of PaidParkingZones for checking paid parking zones.
+        :param config: PricingModel or configuration object.
+        :return: A dictionary with 'cost' and 'co2' arrays.
+        :raises ValueError: For an unknown fuel type, the same as the constructor.
+        """
+        car_config = as_pricing(config).car
+        distances = np.asarray(distances, dtype=float)
+        fuel_types = np.asarray(fuel_types, dtype=str)
+        unknown = [fuel_type for fuel_type in fuel_types.tolist() if fuel_type not in car_config.co2_emission]
+        if unknown:
+            raise ValueError(f"Unknown fuel type {unknown[0]}")
+        avg_consumptions = np.asarray(avg_consumptions, dtype=float)
+        avg_consumptions = np.where(np.isnan(avg_consumptions), float(car_config.default_avg_consumption),
+                                    avg_consumptions)
+        default_prices = np.array([car_config.default_avg_fuel_price[fuel_type] for fuel_type in fuel_types],
+                                  dtype=float)
+        fuel_prices = np.asarray(fuel_prices, dtype=float)
+        fuel_prices = np.where(np.isnan(fuel_prices), default_prices, fuel_prices)
+        emissions = np.array([car_config.co2_emission[fuel_type] for fuel_type in fuel_types], dtype=float)
+
+        fuel_consumption_for_trip = (distances / 100) * avg_consumptions
+        travel_cost = fuel_consumption_for_trip * fuel_prices
+        travel_cost = travel_cost + ppd.check_prices(lons, lats)
+        return {
+            'cost': travel_cost,
+            'co2': distances * emissions
+        }
+
+def transport_summary_batch(transport_types, distances, config):
+    """
+    Calculate the cost and CO2 emission summary for trips with different means of transport.
+
+    Every registered class is instantiated once and evaluated on all of its trips together.
+
+    :param transport_types: Array of transport type identifiers.
+    :param distances: Array of trip distances.
+    :param config: PricingModel or configuration object.
+    :return: A dictionary with 'cost' and 'co2' arrays, NaN for trips with an unknown transport type.
+    """
+    pricing = as_pricing(config)
+    transport_types = np.asarray(transport_types)
+    distances = np.asarray(distances, dtype=float)
+    summary = {'cost': np.full(distances.shape, np.nan), 'co2': np.full(distances.shape, np.nan)}
+    for transport_type in np.unique(transport_types):
+        transport = initialize_means_of_transport(transport_type.item(), pricing)
+        if transport is None:
+            continue
+        selected = transport_types == transport_type
+        transport_summary = transport.cost_summary_batch(distances[selected])
+        summary['cost'][selected] = transport_summary['cost']
+        summary['co2'][selected] = transport_summary['co2']
+    return summary
+
 @MeansOfTransportRegistry.register(0)
 class Walking(MeansOfTransport):
     """
@@ -1,6 +1,9 @@
 from shapely.geometry import Point
+import numpy as np
+import shapely
 import pyproj
-import geopandas as gpd
+from paid_parking_zones.raster import ZoneRaster
+from utils.metrics import metrics
 class PaidParkingZones:
     """
     Class for handling paid parking zones and prices.
@@ -8,21 +11,78 @@ class PaidParkingZones:
     Attributes:
         config (Config): Configuration object containing paid parking settings.
         gdf_zones (geopandas.GeoDataFrame): GeoDataFrame containing paid parking zones.
+        zones_tree (shapely.STRtree): Spatial index over the zone geometries.
+        raster (ZoneRaster | None): Optional precomputed grid answering most lookups without a geometric test.
 
     Methods:
         convert_coordinates: Convert coordinates from the input format to the output format.
         check_price: Check the parking price for a given set of coordinates.
+        check_prices: Check parking prices for arrays of coordinates.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, zones=None):
         """
         Initializes the PaidParkingZones class.
 
         Args:
             config (Config): Configuration object containing paid parking settings.
+            zones (tuple | None): Preloaded (geometries, subzone names, crs), e.g. from the runtime snapshot.
+                If None the zones are read from the files in the config.
         """
         self.config = config.paid_parking
-        self.gdf_zones = gpd.read_file(self.config.data)
+        self._gdf_zones = None
+        if zones is None:
+            self._gdf_zones = self.load_zones(self.config.data)
+            zones = (self._gdf_zones.geometry.values.to_numpy(), self._gdf_zones["Podstrefa"].to_numpy(),
+                     self._gdf_zones.crs)
+        self.zone_geometries, self.zone_names, self.crs = zones
+        self.transformer = pyproj.Transformer.from_crs(
+            self.config.input_coordinates_format,
+            self.config.output_coordinates_format,
+            always_xy=True
+        )
+        self.build_index()
+        self.raster = None
+        if self.config.raster.enabled:
+            self.raster = ZoneRaster.load_or_build(self.zone_geometries, self.transformer, self.config.raster)
+
+    @property
+    def gdf_zones(self):
+        """
+        GeoDataFrame with the zones, created on first access when the zones were preloaded.
+        """
+        if self._gdf_zones is None:
+            import geopandas as gpd
+            self._gdf_zones = gpd.GeoDataFrame({"Podstrefa": self.zone_names}, geometry=self.zone_geometries,
+                                               crs=self.crs)
+        return self._gdf_zones
+
+    @staticmethod
+    def load_zones(data):
+        """
+        Load paid parking zones from one or more shapefile sources.
+
+        Args:
+            data (str | list[str]): Path to a zone layer or a list of paths, e.g. SPP layers of several cities.
+
+        Returns:
+            geopandas.GeoDataFrame: All zones in the order they appear in the sources.
+        """
+        import pandas as pd
+        import geopandas as gpd
+        if isinstance(data, str):
+            return gpd.read_file(data)
+        layers = [gpd.read_file(path) for path in data]
+        return gpd.GeoDataFrame(pd.concat(layers, ignore_index=True), crs=layers[0].crs)
+
+    def build_index(self):
+        """
+        Build the STRtree index and prepare zone geometries for fast point-in-polygon tests.
+        """
+        shapely.prepare(self.zone_geometries)
+        self.zones_tree = shapely.STRtree(self.zone_geometries)
+        # Price of every zone in file order, the extra last slot is used for points outside all zones
+        self.zone_prices = np.array([self.config.parking_price[name] for name in self.zone_names] + [0])
 
     def convert_coordinates(self, longitude, latitude):
         """
@@ -35,15 +95,27 @@ class PaidParkingZones:
         Returns:
             shapely.geometry.Point: Converted Point object.
         """
-        point = f"{longitude} {latitude}"
-        x, y = map(float, point.split())
-        transformer = pyproj.Transformer.from_crs(
-            self.config.input_coordinates_format,
-            self.config.output_coordinates_format,
-            always_xy=True
-        )
-        lon, lat = transformer.transform(x, y)
-        return Point(lon, lat)
+        x, y = self.transformer.transform(float(longitude), float(latitude))
+        return Point(x, y)
+
+    def find_zone(self, point):
+        """
+        Find the subzone containing a point.
+
+        Only candidates returned by the spatial index are tested. When zones overlap the first one
+        in file order wins, the same as a sequential scan over the layer.
+
+        Args:
+            point (shapely.geometry.Point): Point in the zones coordinate system.
+
+        Returns:
+            str | None: Subzone name ("Podstrefa") or None if the point is outside every zone.
+        """
+        candidates = self.zones_tree.query(point)
+        hits = candidates[shapely.contains(self.zone_geometries[candidates], point)]
+        if len(hits) == 0:
+            return None
+        return self.zone_names[hits.min()]
 
     def check_price(self, longitude, latitude):
         """
@@ -56,13 +128,81 @@ class PaidParkingZones:
         Returns:
             float: Parking price in PLN.
         """
-        point = self.convert_coordinates(longitude, latitude)
-        found_zone = None
-        for index, row in self.gdf_zones.iterrows():
-            if row["geometry"].contains(point):
-                found_zone = row["Podstrefa"]
-                break
+        if self.raster is not None:
+            with metrics.stage("ppz.raster_lookup"):
+                found = self.raster.lookup_one(float(longitude), float(latitude))
+            if found != ZoneRaster.BOUNDARY:
+                return self.config.parking_price[self.zone_names[found]] if found < len(self.zone_names) else 0
+        with metrics.stage("ppz.transform"):
+            point = self.convert_coordinates(longitude, latitude)
+        with metrics.stage("ppz.zone_lookup"):
+            found_zone = self.find_zone(point)
         if found_zone is not None:
             return self.config.parking_price[found_zone]
         else:
-            return 0
\ No newline at end of file
+            return 0
+
+    def find_zones(self, points):
+        """
+        Find the index of the first zone containing each point.
+
+        Args:
+            points (numpy.ndarray): Array of shapely Points in the zones coordinate system.
+
+        Returns:
+            numpy.ndarray: Zone index for every point, len(zone_geometries) for points outside all zones.
+        """
+        point_idx, zone_idx = self.zones_tree.query(points)
+        inside = shapely.contains(self.zone_geometries[zone_idx], points[point_idx])
+        found = np.full(len(points), len(self.zone_geometries))
+        np.minimum.at(found, point_idx[inside], zone_idx[inside])
+        return found
+
+    def zone_indices(self, longitudes, latitudes):
+        """
+        Find the index of the first zone containing each pair of input coordinates.
+
+        With a raster only points in its boundary cells are projected and tested against the zones.
+
+        Args:
+            longitudes (numpy.ndarray): Longitude coordinates.
+            latitudes (numpy.ndarray): Latitude coordinates.
+
+        Returns:
+            numpy.ndarray: Zone index for every point, len(zone_geometries) for points outside all zones.
+        """
+        if self.raster is None:
+            with metrics.stage("ppz.transform_batch"):
+                x, y = self.transformer.transform(longitudes, latitudes)
+            with metrics.stage("ppz.zone_lookup_batch"):
+                return self.find_zones(shapely.points(x, y))
+        with metrics.stage("ppz.raster_lookup_batch"):
+            found = self.raster.lookup(longitudes, latitudes)
+        boundary = np.flatnonzero(found == ZoneRaster.BOUNDARY)
+        if len(boundary):
+            with metrics.stage("ppz.transform_batch"):
+                x, y = self.transformer.transform(longitudes[boundary], latitudes[boundary])
+            with metrics.stage("ppz.zone_lookup_batch"):
+                found[boundary] = self.find_zones(shapely.points(x, y))
+        return found
+
+    def check_prices(self, longitudes, latitudes):
+        """
+        Check parking prices for arrays of coordinates.
+
+        All coordinates are projected in a single transform call and joined with the zones in one
+        index query, or looked up in the raster if enabled. Pairs with a missing (NaN) coordinate are priced at 0.
+
+        Args:
+            longitudes (array-like): Longitude coordinates.
+            latitudes (array-like): Latitude coordinates.
+
+        Returns:
+            numpy.ndarray: Parking price in PLN for every pair of coordinates.
+        """
+        longitudes = np.asarray(longitudes, dtype=float)
+        latitudes = np.asarray(latitudes, dtype=float)
+        prices = np.zeros(longitudes.shape)
+        valid = ~(np.isnan(longitudes) | np.isnan(latitudes))
+        prices[valid] = self.zone_prices[self.zone_indices(longitudes[valid], latitudes[valid])]
+        return prices
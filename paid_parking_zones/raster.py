@@ -0,0 +1,324 @@
+"""
+Precomputed raster of the paid parking zones for lookups by array indexing.
+
+The raster covers the bounding box of the zones with square cells, either in the input coordinates (lon/lat),
+so most points need no projection at all, or in the zones coordinate system. Every cell stores the index of the
+zone that wins for all of its points (the first zone in file order containing the whole cell), the "outside"
+index when no zone touches it, or BOUNDARY when a zone edge crosses it. Only points in boundary cells are
+resolved with the exact point-in-polygon test, so the results are identical to the exact path.
+
+Usage:
+    python -m paid_parking_zones.raster --points 2000000
+"""
+import hashlib
+import math
+import time
+
+import numpy as np
+import pyproj
+import shapely
+
+LONLAT = "lonlat"
+PROJECTED = "projected"
+# Cells are grown by this many zone CRS units (metres) before being classified, so a point that rounding puts
+# into a neighbouring cell, or the small bend of a lon/lat cell edge in the projected plane, cannot be misclassified
+MARGIN = 0.01
+# Cells classified at once while building
+BUILD_CHUNK = 100_000
+# Bumped whenever the classification changes, invalidates cached rasters
+VERSION = 1
+
+
+class ZoneRaster:
+    """
+    Grid of zone indices over the bounding box of the zones.
+
+    Args:
+        codes (numpy.ndarray): Zone index per cell, shape (rows, columns), row 0 at the minimum y.
+        origin (tuple[float, float]): Coordinates of the lower left corner of the grid.
+        cell_size (float): Cell edge in grid coordinates.
+        coordinates (str): "lonlat" if the grid is in the input coordinates, "projected" if in the zones CRS.
+        outside (int): Index used for points outside all zones, len(zone_geometries).
+        transformer (pyproj.Transformer | None): Input to zones CRS transformer, used by projected grids.
+
+    Methods:
+        build: Classify the cells of a new raster.
+        load_or_build: Load the raster from a cache file or build and cache it.
+        lookup: Zone indices for arrays of input coordinates.
+        lookup_one: Zone index for a single pair of input coordinates.
+    """
+    BOUNDARY = -1
+
+    def __init__(self, codes, origin, cell_size, coordinates, outside, transformer=None):
+        self.codes = codes
+        self.x0, self.y0 = origin
+        self.cell_size = cell_size
+        self.coordinates = coordinates
+        self.outside = outside
+        self.transformer = transformer if coordinates == PROJECTED else None
+        self.rows, self.columns = codes.shape
+
+    @property
+    def bounds(self):
+        """
+        tuple: (xmin, ymin, xmax, ymax) of the grid in grid coordinates.
+        """
+        return (self.x0, self.y0, self.x0 + self.columns * self.cell_size, self.y0 + self.rows * self.cell_size)
+
+    @property
+    def boundary_fraction(self):
+        """
+        float: Share of cells that need the exact test.
+        """
+        return float(np.mean(self.codes == self.BOUNDARY))
+
+    @classmethod
+    def build(cls, geometries, transformer, coordinates, cell_size, max_memory_mb):
+        """
+        Classify the cells of a new raster.
+
+        Args:
+            geometries (numpy.ndarray): Zone geometries in the zones CRS, in file order.
+            transformer (pyproj.Transformer): Input to zones CRS transformer (always_xy).
+            coordinates (str): "lonlat" or "projected".
+            cell_size (float): Requested cell edge, in degrees for lonlat, in zones CRS units for projected grids.
+            max_memory_mb (float): Memory budget of the grid, cells are enlarged when the grid would need more.
+
+        Returns:
+            ZoneRaster: The classified raster.
+        """
+        if coordinates not in (LONLAT, PROJECTED):
+            raise ValueError(f"Unknown raster coordinates {coordinates!r}, expected {LONLAT!r} or {PROJECTED!r}")
+        outside = len(geometries)
+        dtype = np.int16 if outside < np.iinfo(np.int16).max else np.int32
+        if coordinates == LONLAT:
+            inverse = pyproj.Transformer.from_crs(transformer.target_crs, transformer.source_crs, always_xy=True)
+            xmin, ymin, xmax, ymax = shapely.total_bounds(
+                transform(shapely.segmentize(geometries, 1.0), inverse))
+        else:
+            xmin, ymin, xmax, ymax = shapely.total_bounds(geometries)
+
+        max_cells = int(max_memory_mb * 2 ** 20) // np.dtype(dtype).itemsize
+        while True:
+            # One spare cell on every side, so cells at the edge of the grid never touch a zone
+            columns = math.ceil((xmax - xmin) / cell_size) + 2
+            rows = math.ceil((ymax - ymin) / cell_size) + 2
+            if rows * columns <= max_cells:
+                break
+            enlarged = cell_size * math.sqrt(rows * columns / max_cells) * 1.01
+            print(f"Zone raster of {rows}x{columns} cells exceeds {max_memory_mb} MB, "
+                  f"cell size {cell_size:g} enlarged to {enlarged:g}")
+            cell_size = enlarged
+        x0, y0 = xmin - cell_size, ymin - cell_size
+
+        tree = shapely.STRtree(geometries)
+        shapely.prepare(geometries)
+        codes = np.empty(rows * columns, dtype=dtype)
+        for start in range(0, len(codes), BUILD_CHUNK):
+            cell = np.arange(start, min(start + BUILD_CHUNK, len(codes)))
+            left = x0 + (cell % columns) * cell_size
+            bottom = y0 + (cell // columns) * cell_size
+            cells = shapely.box(left, bottom, left + cell_size, bottom + cell_size)
+            if coordinates == LONLAT:
+                cells = transform(shapely.segmentize(cells, cell_size / 4), transformer)
+            cells = shapely.buffer(cells, MARGIN, quad_segs=1, join_style="mitre")
+            codes[cell] = classify(cells, geometries, tree)
+        return cls(codes.reshape(rows, columns), (x0, y0), cell_size, coordinates, outside, transformer)
+
+    @classmethod
+    def load_or_build(cls, geometries, transformer, config):
+        """
+        Load the raster from config.cache_file if it was built for the same zones and settings, otherwise
+        build it and write the cache file.
+
+        Args:
+            geometries (numpy.ndarray): Zone geometries in the zones CRS, in file order.
+            transformer (pyproj.Transformer): Input to zones CRS transformer (always_xy).
+            config (Config): paid_parking.raster settings.
+
+        Returns:
+            ZoneRaster: The raster.
+        """
+        signature = raster_signature(geometries, transformer, config)
+        if config.cache_file:
+            try:
+                with np.load(config.cache_file) as cached:
+                    if str(cached["signature"]) == signature:
+                        return cls(cached["codes"], tuple(cached["origin"]), float(cached["cell_size"]),
+                                   config.coordinates, len(geometries), transformer)
+            except (OSError, KeyError, ValueError):
+                pass
+
+        raster = cls.build(geometries, transformer, config.coordinates, config.cell_size, config.max_memory_mb)
+        if config.cache_file:
+            try:
+                np.savez(config.cache_file, codes=raster.codes, origin=np.array([raster.x0, raster.y0]),
+                         cell_size=raster.cell_size, signature=signature)
+            except OSError as e:
+                print(f"Zone raster not cached: {e!r}")
+        return raster
+
+    def lookup(self, longitudes, latitudes):
+        """
+        Zone indices for arrays of input coordinates.
+
+        Args:
+            longitudes (numpy.ndarray): Longitude coordinates.
+            latitudes (numpy.ndarray): Latitude coordinates.
+
+        Returns:
+            numpy.ndarray: Zone index for every point, outside for points outside all zones and BOUNDARY for
+                points that need the exact test.
+        """
+        if self.transformer is not None:
+            longitudes, latitudes = self.transformer.transform(longitudes, latitudes)
+        column = (np.asarray(longitudes, dtype=float) - self.x0) / self.cell_size
+        row = (np.asarray(latitudes, dtype=float) - self.y0) / self.cell_size
+        # NaN coordinates fail every comparison and end up outside, as in the exact test
+        inside = (column >= 0) & (column < self.columns) & (row >= 0) & (row < self.rows)
+        found = np.full(column.shape, self.outside, dtype=np.intp)
+        found[inside] = self.codes[row[inside].astype(np.intp), column[inside].astype(np.intp)]
+        return found
+
+    def lookup_one(self, longitude, latitude):
+        """
+        Zone index for a single pair of input coordinates, see lookup.
+
+        Args:
+            longitude (float): Longitude coordinate.
+            latitude (float): Latitude coordinate.
+
+        Returns:
+            int: Zone index, outside or BOUNDARY.
+        """
+        if self.transformer is not None:
+            longitude, latitude = self.transformer.transform(longitude, latitude)
+        column = (longitude - self.x0) / self.cell_size
+        row = (latitude - self.y0) / self.cell_size
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return int(self.codes[int(row), int(column)])
+        return self.outside
+
+
+def transform(geometries, transformer):
+    """
+    Apply a pyproj transformer (always_xy) to the coordinates of shapely geometries.
+    """
+    return shapely.transform(geometries, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+
+
+def classify(cells, geometries, tree):
+    """
+    Zone index of every cell: the first zone touching the cell if it contains the whole cell, len(geometries)
+    if no zone touches it, BOUNDARY otherwise. Later zones may overlap a resolved cell, they lose to the first
+    one anyway.
+    """
+    outside = len(geometries)
+    cell_idx, zone_idx = tree.query(cells, predicate="intersects")
+    first = np.full(len(cells), outside)
+    np.minimum.at(first, cell_idx, zone_idx)
+    codes = np.full(len(cells), outside)
+    touched = np.flatnonzero(first < outside)
+    contained = shapely.contains_properly(geometries[first[touched]], cells[touched])
+    codes[touched] = np.where(contained, first[touched], ZoneRaster.BOUNDARY)
+    return codes
+
+
+def raster_signature(geometries, transformer, config):
+    """
+    Hash of the zones and raster settings, a cached raster is only used with the same signature.
+    """
+    digest = hashlib.sha1(f"{VERSION} {config.coordinates} {config.cell_size} {config.max_memory_mb} "
+                          f"{transformer.source_crs.srs} {transformer.target_crs.srs}".encode())
+    for wkb in shapely.to_wkb(geometries):
+        digest.update(wkb)
+    return digest.hexdigest()
+
+
+def validate(ppz, count, chunk=500_000, seed=0):
+    """
+    Compare the raster lookup with the exact point-in-polygon test on random points.
+
+    Points are uniform over the raster extended by a tenth on every side, in input coordinates.
+
+    Args:
+        ppz (PaidParkingZones): Zones with a raster.
+        count (int): Number of random points.
+        chunk (int): Points checked at once.
+        seed (int): Seed of the random points.
+
+    Returns:
+        dict: Numbers of points, mismatches and boundary points and the time of both lookups.
+    """
+    raster = ppz.raster
+    xmin, ymin, xmax, ymax = raster.bounds
+    if raster.coordinates == PROJECTED:
+        inverse = pyproj.Transformer.from_crs(ppz.transformer.target_crs, ppz.transformer.source_crs,
+                                              always_xy=True)
+        xmin, ymin, xmax, ymax = shapely.total_bounds(transform(shapely.box(xmin, ymin, xmax, ymax), inverse))
+    pad_x, pad_y = (xmax - xmin) / 10, (ymax - ymin) / 10
+    rng = np.random.default_rng(seed)
+    result = {"points": 0, "mismatches": 0, "boundary": 0, "raster_seconds": 0.0, "exact_seconds": 0.0}
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        longitudes = rng.uniform(xmin - pad_x, xmax + pad_x, size)
+        latitudes = rng.uniform(ymin - pad_y, ymax + pad_y, size)
+
+        begin = time.perf_counter()
+        found = ppz.zone_indices(longitudes, latitudes)
+        result["raster_seconds"] += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        x, y = ppz.transformer.transform(longitudes, latitudes)
+        exact = ppz.find_zones(shapely.points(x, y))
+        result["exact_seconds"] += time.perf_counter() - begin
+
+        result["points"] += size
+        result["mismatches"] += int(np.count_nonzero(found != exact))
+        result["boundary"] += int(np.count_nonzero(raster.lookup(longitudes, latitudes) == ZoneRaster.BOUNDARY))
+    return result
+
+
+def main():
+    import argparse
+    from hydra import initialize, compose
+    from omegaconf import open_dict
+
+    from paid_parking_zones.calculator import PaidParkingZones
+
+    parser = argparse.ArgumentParser(description="Check that the zone raster agrees with the exact lookup.")
+    parser.add_argument("--points", type=int, default=2_000_000, help="Random points to check")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random points")
+    parser.add_argument("--coordinates", choices=[LONLAT, PROJECTED], help="Override paid_parking.raster.coordinates")
+    parser.add_argument("--cell-size", type=float, help="Override paid_parking.raster.cell_size")
+    args = parser.parse_args()
+
+    with initialize(version_base=None, config_path="../conf", job_name="zone_raster"):
+        config = compose(config_name="config")
+    with open_dict(config):
+        config.paid_parking.raster.enabled = True
+        if args.coordinates is not None or args.cell_size is not None:
+            # A raster with other settings is not written over the cached one
+            config.paid_parking.raster.cache_file = None
+        if args.coordinates is not None:
+            config.paid_parking.raster.coordinates = args.coordinates
+        if args.cell_size is not None:
+            config.paid_parking.raster.cell_size = args.cell_size
+
+    begin = time.perf_counter()
+    ppz = PaidParkingZones(config)
+    raster = ppz.raster
+    print(f"Raster {raster.rows}x{raster.columns} {raster.coordinates} cells of {raster.cell_size:g}, "
+          f"{raster.codes.nbytes / 2 ** 20:.1f} MB, {raster.boundary_fraction:.1%} boundary cells, "
+          f"ready in {time.perf_counter() - begin:.2f} s")
+
+    result = validate(ppz, args.points, seed=args.seed)
+    print(f"{result['points']} points, {result['mismatches']} mismatches, "
+          f"{result['boundary'] / result['points']:.2%} resolved by the exact test")
+    print(f"raster {result['points'] / result['raster_seconds']:,.0f} points/s, "
+          f"exact {result['points'] / result['exact_seconds']:,.0f} points/s")
+    raise SystemExit(1 if result["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from types import MappingProxyType
+
+
+class Frozen:
+    """
+    Base class for immutable, __slots__ based value objects.
+    """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if not name.startswith("_"))
+        return f"{type(self).__name__}({values})"
+
+
+class CarPricing(Frozen):
+    """
+    Car prices and emissions, dictionaries are keyed by fuel type ("0" for gasoline, "1" for diesel).
+    """
+    __slots__ = ('co2_emission', 'default_avg_consumption', 'default_avg_fuel_price')
+
+
+class ScooterPricing(Frozen):
+    __slots__ = ('start_price', 'cost_for_minute', 'avg_speed', 'avg_consumption', 'avg_co2_emission')
+
+
+class BikePricing(Frozen):
+    __slots__ = ('price_per_hour', 'avg_speed')
+
+
+class RequestParam(Frozen):
+    """
+    Name of a query parameter and its default value.
+    """
+    __slots__ = ('value', 'default')
+
+
+class RequestParams(Frozen):
+    __slots__ = ('transport_type', 'distance', 'avg_consumption', 'fuel_type', 'fuel_price', 'daily_distance',
+                 'lon', 'lat', 'mode', 'schedule', 'year')
+
+
+class PricingModel(Frozen):
+    """
+    Pricing model resolved once from the means_of_transport section of the config.
+
+    Reading plain attributes of this model is much cheaper than traversing OmegaConf nodes on every request.
+    Attribute names mirror the config, so the model can be used wherever config.means_of_transport was.
+    Objects derived from the model, such as means of transport instances, are cached on it and are freed with it.
+    """
+    __slots__ = ('types', 'car', 'scooter', 'bike', 'params', '_cache')
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        object.__setattr__(self, '_cache', {})
+
+    def cached(self, key, create):
+        """
+        Get an object derived from this model, creating it on first use.
+
+        :param key: Key of the object.
+        :param create: Function without arguments creating the object.
+        :return: The cached object.
+        """
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache.setdefault(key, create())
+        return value
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Resolve the pricing model from the config.
+
+        :param config: Configuration object.
+        :return: PricingModel instance.
+        """
+        cfg = config.means_of_transport
+        return cls(
+            types=MappingProxyType({int(key): str(value) for key, value in cfg.types.items()}),
+            car=CarPricing(
+                co2_emission=MappingProxyType({str(key): float(value) for key, value in cfg.car.co2_emission.items()}),
+                default_avg_consumption=float(cfg.car.default_avg_consumption),
+                default_avg_fuel_price=MappingProxyType({str(key): float(value)
+                                                         for key, value in cfg.car.default_avg_fuel_price.items()}),
+            ),
+            scooter=ScooterPricing(**{name: float(cfg.scooter[name]) for name in ScooterPricing.__slots__}),
+            bike=BikePricing(**{name: float(cfg.bike[name]) for name in BikePricing.__slots__}),
+            params=RequestParams(**{name: RequestParam(value=cfg.params[name].value, default=cfg.params[name].default)
+                                    for name in RequestParams.__slots__}),
+        )
+
+
+def as_pricing(config):
+    """
+    Get the pricing model for a config, resolving it if a raw config was passed.
+
+    :param config: PricingModel or configuration object.
+    :return: PricingModel instance.
+    """
+    return config if isinstance(config, PricingModel) else PricingModel.from_config(config)
@@ -0,0 +1,8 @@
+import pytest
+from hydra import initialize, compose
+
+
+@pytest.fixture(scope="session")
+def app_config():
+    with initialize(version_base=None, config_path="../conf", job_name="tests"):
+        return compose(config_name="config")
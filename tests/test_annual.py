@@ -0,0 +1,47 @@
+"""
+Regression values of /get_annual_saving, flat and simulated.
+"""
+import numpy as np
+import pytest
+
+import main
+from annual_simulation import schedule_matrix, simulate_annual
+from means_of_transport import Car
+from traffic_intensity.traffic import DAYS_OF_WEEK, HOURS_PER_DAY
+
+# 2025 has 261 weekdays, the default schedule drives 25 km on each of them in two trips
+WORKDAYS_2025 = 261
+
+
+@pytest.fixture(scope="module")
+def client():
+    return main.app.test_client()
+
+
+def test_flat_annual_values(client):
+    # 25 km a day at 10 l/100km: 912.5 l of gasoline at 6.52 and 100 g CO2 per km
+    assert client.get('/get_annual_saving').json == pytest.approx({'cost': 5949.5, 'co2': 912.5})
+    diesel = client.get('/get_annual_saving', query_string={'fuel_type': 1, 'avg_consumption': 6,
+                                                             'daily_distance': 40, 'fuel_price': 7}).json
+    assert diesel == pytest.approx({'cost': 40 / 100 * 6 * 365 * 7, 'co2': 40 * 365 * 120 / 1000})
+
+
+def test_simulation_annual_values(client):
+    summary = client.get('/get_annual_saving', query_string={'mode': 'simulation', 'year': 2025}).json
+    assert summary['trips'] == 2 * WORKDAYS_2025
+    assert summary['distance'] == pytest.approx(25 * WORKDAYS_2025)
+    assert summary['co2'] == pytest.approx(782.4653025178009)
+    assert summary['cost'] == pytest.approx(5101.673772416062)
+    assert sum(month['co2'] for month in summary['monthly']) == pytest.approx(summary['co2'])
+    assert sum(day['cost'] for day in summary['weekday']) == pytest.approx(summary['cost'])
+
+
+def test_simulation_without_congestion_matches_flat_formula(app_config):
+    pricing = main.pricing
+    car = Car(None, "0", pricing)
+    departures = schedule_matrix(dict(app_config.annual_simulation.default_schedule))
+    traffic = np.ones((len(DAYS_OF_WEEK), HOURS_PER_DAY))
+    summary = simulate_annual(car, 25, departures, traffic, 0.0, 2025)
+    distance = 25 * WORKDAYS_2025
+    assert summary['co2'] == pytest.approx(car.calculate_annual_co2_emission(distance / 365) / 1000)
+    assert summary['cost'] == pytest.approx(car.calculate_annual_travel_cost(distance / 365))
@@ -0,0 +1,94 @@
+"""
+WsgiAdapter passing requests and responses between ASGI and the WSGI app unchanged.
+"""
+import asyncio
+import json
+
+import pytest
+
+import main
+from asgi import WsgiAdapter
+
+
+def scope(path, query_string=b"", method="GET", headers=()):
+    return {"type": "http", "method": method, "path": path, "query_string": query_string, "http_version": "1.1",
+            "headers": list(headers), "server": ("testserver", 8000), "client": ("127.0.0.1", 5000)}
+
+
+def call(adapter, scope, chunks=(b"",)):
+    """
+    Run one ASGI request and return the messages sent by the adapter.
+    """
+    received = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(scope, receive, send))
+    return sent
+
+
+@pytest.fixture
+def adapter():
+    adapter = WsgiAdapter(main.app, threads=2)
+    yield adapter
+    adapter.executor.shutdown()
+
+
+def test_status_headers_and_body_pass_through():
+    seen = {}
+
+    class Result(list):
+        closed = False
+
+        def close(self):
+            Result.closed = True
+
+    def wsgi_app(environ, start_response):
+        seen.update(environ, body=environ["wsgi.input"].read())
+        start_response("418 I'm a teapot", [("Content-Type", "text/plain"), ("Set-Cookie", "a=1"),
+                                            ("Set-Cookie", "b=2")])
+        return Result([b"short ", b"and stout"])
+
+    adapter = WsgiAdapter(wsgi_app, threads=1)
+    start, body = call(adapter, scope("/tea", b"size=2&milk=yes", "POST",
+                                      [(b"content-type", b"application/json"), (b"x-trace", b"1"),
+                                       (b"x-trace", b"2")]), [b'{"a":', b' 1}'])
+    adapter.executor.shutdown()
+
+    assert start == {"type": "http.response.start", "status": 418,
+                     "headers": [(b"content-type", b"text/plain"), (b"set-cookie", b"a=1"), (b"set-cookie", b"b=2")]}
+    assert body == {"type": "http.response.body", "body": b"short and stout"}
+    assert Result.closed
+    assert seen["REQUEST_METHOD"] == "POST" and seen["PATH_INFO"] == "/tea"
+    assert seen["QUERY_STRING"] == "size=2&milk=yes"
+    assert seen["CONTENT_TYPE"] == "application/json" and seen["HTTP_X_TRACE"] == "1,2"
+    assert seen["SERVER_NAME"] == "testserver" and seen["SERVER_PORT"] == "8000"
+    assert seen["body"] == b'{"a": 1}'
+
+
+@pytest.mark.parametrize("query_string, status", [(b"hour=8&day_of_week=Tuesday", 200), (b"hour=eight", 400),
+                                                  (b"hour=8&day_of_week=Funday", 404)])
+def test_flask_responses_pass_through(adapter, query_string, status):
+    expected = main.app.test_client().get(f"/get_traffic?{query_string.decode()}")
+    start, body = call(adapter, scope("/get_traffic", query_string))
+    assert start["status"] == expected.status_code == status
+    assert dict(start["headers"])[b"content-type"] == expected.headers["Content-Type"].encode()
+    assert json.loads(body["body"]) == expected.json
+
+
+def test_post_body_passes_through(adapter):
+    trips = {"transport_type": [1, 2], "distance": [10, 20]}
+    expected = main.app.test_client().post("/get_saving_for_travel_batch", json=trips)
+    payload = json.dumps(trips).encode()
+    start, body = call(adapter, scope("/get_saving_for_travel_batch", method="POST",
+                                      headers=[(b"content-type", b"application/json"),
+                                               (b"content-length", str(len(payload)).encode())]),
+                       [payload[:10], payload[10:]])
+    assert start["status"] == expected.status_code == 200
+    assert json.loads(body["body"]) == expected.json
@@ -0,0 +1,50 @@
+"""
+Synthetic benchmark datasets and the baseline comparison of the benchmark suite.
+"""
+import numpy as np
+import shapely
+
+import main
+from benchmarks import synthetic
+from benchmarks.run import compare, cycle, run
+from paid_parking_zones.calculator import PaidParkingZones
+
+
+def test_zone_layer_tiles_the_real_zones(app_config):
+    ppz = main.ppz.get()
+    geometries, names, crs = synthetic.zone_layer(ppz, 4)
+    assert len(geometries) == 4 * len(ppz.zone_geometries) and list(names) == list(ppz.zone_names) * 4
+    # Tiles do not overlap, so every tile prices a shifted point like the real zones
+    tiled = PaidParkingZones(app_config, zones=(geometries, names, crs))
+    x, y = shapely.get_coordinates(shapely.point_on_surface(ppz.zone_geometries)).T
+    for tile in range(4):
+        shifted = shapely.get_coordinates(shapely.point_on_surface(geometries[tile * len(x):(tile + 1) * len(x)]))
+        np.testing.assert_allclose(shifted - shifted[0], np.column_stack([x, y]) - [x[0], y[0]])
+        assert tiled.find_zones(shapely.points(shifted)).tolist() == \
+            (ppz.find_zones(shapely.points(x, y)) + tile * len(x)).tolist()
+
+
+def test_station_list_keeps_the_real_stations():
+    air_quality = main.air_quality.get()
+    ids, coords = synthetic.station_list(air_quality, 3)
+    count = len(air_quality.station_ids)
+    assert len(ids) == len(coords) == 3 * count and len(set(ids.tolist())) == len(ids)
+    np.testing.assert_array_equal(ids[:count], air_quality.station_ids)
+    np.testing.assert_array_equal(coords[:count], air_quality.station_coords)
+
+
+def test_compare_flags_regressions_over_the_threshold():
+    results = {"fast": 1.0, "slow": 1.5, "new": 2.0}
+    assert compare(results, {"fast": 1.1, "slow": 1.0}, threshold=0.2) == ["slow"]
+    assert compare(results, {"fast": 1.1, "slow": 1.0}, threshold=0.6) == []
+
+
+def test_cycle_repeats_inputs():
+    next_item = cycle("ab")
+    assert [next_item() for _ in range(5)] == list("ababa")
+
+
+def test_run_measures_the_filtered_benchmarks():
+    results = run([1], name_filter="traffic")
+    assert results and all(seconds > 0 for seconds in results.values())
+    assert all("traffic" in name for name in results)
@@ -0,0 +1,138 @@
+"""
+Air quality cache against the local GIOŚ stub counting upstream hits.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from omegaconf import OmegaConf
+
+from air_quality.air_data import AirQuality
+from air_quality.async_air_data import AsyncAirQuality
+from air_quality.cache import TTLCache
+from benchmarks.stub_server import GiosStub
+
+TTL = 900
+STALE_WHILE_REVALIDATE = 2700
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub():
+    with GiosStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def air_quality(app_config, stub, clock):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    config.air_pollution.air_pollution_url = stub.url
+    config.air_pollution.prefetch.enabled = False
+    config.air_pollution.cache.enabled = True
+    config.air_pollution.cache.ttl = TTL
+    config.air_pollution.cache.stale_while_revalidate = STALE_WHILE_REVALIDATE
+    air_quality = AirQuality(config)
+    air_quality.cache.clock = clock
+    return air_quality
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_ttl_expiry_causes_one_upstream_hit(air_quality, stub, clock):
+    first = air_quality.get_air_quality(None, None)
+    assert first is not None and stub.total_hits() == 1
+    clock.now += TTL
+    assert air_quality.get_air_quality(None, None) == first
+    assert stub.total_hits() == 1
+
+    clock.now += STALE_WHILE_REVALIDATE + 1
+    assert air_quality.get_air_quality(None, None) == first
+    assert air_quality.get_air_quality(None, None) == first
+    assert stub.total_hits() == 2
+    assert air_quality.cache.stats == {'hit': 2, 'stale': 0, 'miss': 2}
+
+
+def test_stale_value_served_during_one_background_refresh(air_quality, stub, clock):
+    first = air_quality.get_air_quality(None, None)
+    clock.now += TTL + 1
+    stub.latency = 0.3
+    results = [None] * 20
+    barrier = threading.Barrier(len(results))
+
+    def run(i):
+        barrier.wait()
+        results[i] = air_quality.get_air_quality(None, None)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start < stub.latency
+    assert results == [first] * len(results)
+    assert air_quality.cache.stats['stale'] == len(results)
+
+    assert wait_for(lambda: not air_quality.cache.refreshing)
+    assert stub.total_hits() == 2
+    # The refreshed entry is fresh again
+    assert air_quality.get_air_quality(None, None) == first
+    assert stub.total_hits() == 2 and air_quality.cache.stats['hit'] == 1
+
+
+def test_lru_eviction_at_max_size(clock):
+    cache = TTLCache(max_size=2, ttl=TTL, clock=clock)
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return key.upper()
+
+    cache.get_or_load("a", loader)
+    cache.get_or_load("b", loader)
+    cache.get_or_load("a", loader)
+    cache.get_or_load("c", loader)
+    assert len(cache) == 2 and list(cache.entries) == ["a", "c"]
+    assert cache.get("b") is None
+    assert cache.get_or_load("b", loader) == "B"
+    assert loads == ["a", "b", "c", "b"]
+    assert list(cache.entries) == ["c", "b"]
+
+
+def test_get_or_load_async_coalesces_concurrent_misses(air_quality, stub, clock):
+    stub.latency = 0.2
+    async_air_quality = AsyncAirQuality(air_quality)
+
+    async def run():
+        try:
+            results = await asyncio.gather(*(async_air_quality.get_air_quality(None, None) for _ in range(50)))
+            clock.now += TTL + 1
+            stale = await async_air_quality.get_air_quality(None, None)
+            await asyncio.gather(*air_quality.cache.tasks)
+            return results, stale
+        finally:
+            await async_air_quality.close()
+
+    results, stale = asyncio.run(run())
+    assert results[0] is not None and results == [results[0]] * 50
+    assert stale == results[0]
+    assert stub.total_hits() == 2
+    assert async_air_quality.single_flight.stats == {'leader': 2, 'shared': 49}
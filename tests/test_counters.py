@@ -0,0 +1,66 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from omegaconf import OmegaConf
+
+from traffic_intensity.counters import CounterTraffic, build_store, source_digest
+
+
+@pytest.fixture
+def counter_config(app_config, tmp_path):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    normalized_dir = tmp_path / "normalize_traffic"
+    normalized_dir.mkdir()
+    for name in ["MQ_K10_1.csv", "MQ_K2_1.csv"]:
+        shutil.copy(os.path.join(app_config.traffic.pipeline.normalized_dir, name), normalized_dir)
+    config.traffic.pipeline.normalized_dir = str(normalized_dir)
+    config.traffic.counters.store_file = str(tmp_path / "counters_traffic.npy")
+    config.traffic.counters.index_file = str(tmp_path / "counters_index.json")
+    return config
+
+
+def build(config):
+    cfg = config.traffic.counters
+    return build_store(config.traffic.pipeline.normalized_dir, cfg.store_file, cfg.index_file)
+
+
+def test_counter_traffic_matches_csv(counter_config):
+    assert build(counter_config) == 2
+    counters = CounterTraffic(counter_config)
+    assert counters.ids == ["MQ_K2_1", "MQ_K10_1"]
+    profile = pd.read_csv(os.path.join(counter_config.traffic.pipeline.normalized_dir, "MQ_K10_1.csv"))
+    row = profile.dropna().iloc[0]
+    assert counters.counter_traffic("MQ_K10_1", int(row["Godzina"]), row["Dzien tygodnia"]) == \
+        pytest.approx(row["Natężenie"], rel=1e-6)
+    assert counters.counter_traffic("MQ_K99_1", 8, "Monday") is None
+    assert counters.counter_traffic("MQ_K10_1", 24, "Monday") is None
+    assert counters.counter_traffic("MQ_K10_1", 8, "Someday") is None
+
+
+def test_startup_only_loads_the_store(counter_config):
+    with pytest.raises(FileNotFoundError, match="python -m traffic_intensity.counters"):
+        CounterTraffic(counter_config)
+    build(counter_config)
+    store_file = counter_config.traffic.counters.store_file
+    profiles = np.load(store_file)
+    # Newer csv files, e.g. after a fresh checkout, do not make the app rebuild the store
+    for name in os.listdir(counter_config.traffic.pipeline.normalized_dir):
+        os.utime(os.path.join(counter_config.traffic.pipeline.normalized_dir, name))
+    os.chmod(store_file, 0o444)
+    assert np.array_equal(np.asarray(CounterTraffic(counter_config).profiles), profiles, equal_nan=True)
+
+
+def test_source_digest_depends_on_content_only(counter_config):
+    normalized_dir = counter_config.traffic.pipeline.normalized_dir
+    build(counter_config)
+    digest = source_digest(normalized_dir)
+    assert CounterTraffic(counter_config).sources == digest
+    path = os.path.join(normalized_dir, "MQ_K2_1.csv")
+    os.utime(path, (0, 0))
+    assert source_digest(normalized_dir) == digest
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("MQ_K2_1,Monday,0,0.5\n")
+    assert source_digest(normalized_dir) != digest
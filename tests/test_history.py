@@ -0,0 +1,112 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+from omegaconf import OmegaConf
+
+from air_quality.history import SECONDS_PER_DAY, AirQualityHistory, parse_time
+
+# Recent enough not to be compacted away by the writer thread
+NOW = float(int(time.time()))
+EPOCH = 1_700_000_000.0
+
+
+@pytest.fixture
+def history_config(app_config, tmp_path):
+    config = OmegaConf.create(OmegaConf.to_container(app_config.air_pollution.history))
+    config.path = str(tmp_path / "history.sqlite3")
+    config.query_limit = 3
+    config.flush_interval = 0.01
+    return config
+
+
+@pytest.fixture
+def history(history_config):
+    history = AirQualityHistory(history_config)
+    yield history
+    history.close()
+
+
+def index(level):
+    return {'air_quality': f'level {level}', 'air_quality_id': level, 'extra_points': level * 2}
+
+
+def record(history, station_id, ts, level=1):
+    history.record(station_id, index(level), ts=ts)
+
+
+def test_query_limit(history):
+    for i in range(5):
+        record(history, 1, NOW - i)
+    history.flush()
+    assert len(history.query(1)) == 3
+    assert len(history.query(1, limit=2)) == 2
+    assert len(history.query(1, limit=10)) == 3
+    assert history.query(1, limit=0) == []
+    with pytest.raises(ValueError):
+        history.query(1, limit=-1)
+
+
+def test_query_filters_newest_first(history):
+    record(history, 1, NOW - 20, level=1)
+    record(history, 1, NOW - 10, level=2)
+    record(history, 2, NOW - 15, level=3)
+    record(history, 1, NOW, level=4)
+    history.flush()
+
+    assert [row['air_quality_id'] for row in history.query(1)] == [4, 2, 1]
+    assert [row['air_quality_id'] for row in history.query(start=NOW - 15, end=NOW - 10)] == [2, 3]
+    assert [row['air_quality_id'] for row in history.query(1, start=NOW - 15)] == [4, 2]
+    assert history.query(2, end=NOW - 20) == []
+    assert history.query(2)[0] == {'station_id': 2, 'timestamp': datetime.fromtimestamp(NOW - 15, timezone.utc)
+                                   .isoformat(), **index(3)}
+
+
+def test_compact_removes_rows_older_than_retention(history, history_config):
+    now = time.time()
+    retention = history_config.retention_days * SECONDS_PER_DAY
+    record(history, 1, now - retention - 60, level=1)
+    record(history, 1, now - retention + 60, level=2)
+    history.flush()
+    # The writer thread compacts once when it starts, the old record may already be gone
+    history.compact()
+    assert [row['air_quality_id'] for row in history.query(1)] == [2]
+    assert history.stats['compacted'] == 1
+
+
+def test_full_queue_drops_records(history_config):
+    history_config.queue_size = 2
+    history = AirQualityHistory(history_config)
+    history.close()
+    # Without the writer thread nothing empties the queue
+    for i in range(5):
+        record(history, 1, NOW + i)
+    assert history.stats['dropped'] == 3
+
+
+def test_close_closes_query_connections(history):
+    history.query(1)
+    connections = list(history.query_connections)
+    assert len(connections) == 1
+    history.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute("SELECT 1")
+    assert history.query_connections == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("1700000000", EPOCH),
+    ("1700000000.5", EPOCH + 0.5),
+    ("2023-11-14T22:13:20", EPOCH),
+    ("2023-11-14T22:13:20Z", EPOCH),
+    ("2023-11-15T00:13:20+02:00", EPOCH),
+])
+def test_parse_time(value, expected):
+    assert parse_time(value) == expected
+
+
+def test_parse_time_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_time("yesterday")
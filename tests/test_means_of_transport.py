@@ -0,0 +1,22 @@
+import gc
+import weakref
+
+from means_of_transport import initialize_means_of_transport
+from pricing import PricingModel
+
+
+def test_instances_shared_per_pricing_model(app_config):
+    pricing = PricingModel.from_config(app_config)
+    transport_type = next(iter(pricing.types))
+    instance = initialize_means_of_transport(transport_type, pricing)
+    assert initialize_means_of_transport(transport_type, pricing) is instance
+    assert initialize_means_of_transport(transport_type, PricingModel.from_config(app_config)) is not instance
+    assert initialize_means_of_transport(-1, pricing) is None
+
+
+def test_instances_freed_with_pricing_model(app_config):
+    pricing = PricingModel.from_config(app_config)
+    instance = weakref.ref(initialize_means_of_transport(next(iter(pricing.types)), pricing))
+    del pricing
+    gc.collect()
+    assert instance() is None
@@ -0,0 +1,45 @@
+import json
+import os
+
+from omegaconf import OmegaConf
+
+from utils.metrics import Metrics, mark_process_dead, remove_states
+
+
+def worker_state(requests, latency, age):
+    return {"counters": [["app_requests_total", [["route", "/x"]], requests]],
+            "histograms": [["app_request_duration_seconds", [["route", "/x"]], [0.1, 1], [requests, 0], latency,
+                            requests]],
+            "gauges": [["app_air_quality_prefetch_snapshot_age_seconds", [], age]]}
+
+
+def write_state(directory, pid, state):
+    with open(os.path.join(directory, f"metrics_{pid}.json"), "w", encoding="utf-8") as file:
+        json.dump(state, file)
+
+
+def test_dead_workers_are_archived(tmp_path):
+    directory = str(tmp_path)
+    registry = Metrics()
+    registry.configure(OmegaConf.create({"enabled": True, "multiprocess_dir": directory, "flush_interval": 5}))
+    write_state(directory, 101, worker_state(3, 0.3, 50))
+    write_state(directory, 102, worker_state(4, 0.4, 7))
+    before = registry.render()
+    assert 'app_requests_total{route="/x"} 7' in before
+    assert "app_air_quality_prefetch_snapshot_age_seconds 50" in before
+
+    mark_process_dead(directory, 101)
+    mark_process_dead(directory, 101)
+    after = registry.render()
+    assert not os.path.exists(os.path.join(directory, "metrics_101.json"))
+    assert 'app_requests_total{route="/x"} 7' in after
+    assert 'app_request_duration_seconds_count{route="/x"} 7' in after
+    assert "app_air_quality_prefetch_snapshot_age_seconds 7" in after
+
+    # A new worker with the pid of the dead one adds to the archived counts
+    write_state(directory, 101, worker_state(1, 0.1, 1))
+    mark_process_dead(directory, 102)
+    assert 'app_requests_total{route="/x"} 8' in registry.render()
+
+    remove_states(directory)
+    assert not [name for name in os.listdir(directory) if name.endswith(".json")]
@@ -0,0 +1,61 @@
+"""
+KD-tree station search against a brute-force haversine scan over all stations.
+"""
+import numpy as np
+import pytest
+
+from air_quality.air_data import AirQuality
+from utils.utils import haversine_distances
+
+
+@pytest.fixture(scope="module")
+def air_quality(app_config):
+    air_quality = AirQuality(app_config)
+    yield air_quality
+    air_quality.close()
+
+
+def brute_force_nearest(air_quality, lat, lon):
+    """
+    The original lookup: first station in file order with the smallest distance.
+    """
+    nearest_station_id, min_distance = None, float('inf')
+    for station in air_quality.stations_json:
+        distance = air_quality.calculate_distance(lat, lon, float(station["gegrLat"]), float(station["gegrLon"]))
+        if distance < min_distance:
+            nearest_station_id, min_distance = station["id"], distance
+    return nearest_station_id
+
+
+def random_locations(count, seed=0):
+    """
+    Locations over Poland and its surroundings, plus a few far away ones.
+    """
+    rng = np.random.default_rng(seed)
+    lats = np.concatenate([rng.uniform(48.5, 55.5, count), rng.uniform(-80, 80, 20)])
+    lons = np.concatenate([rng.uniform(13.5, 24.5, count), rng.uniform(-180, 180, 20)])
+    return zip(lats, lons)
+
+
+def test_nearest_station_matches_brute_force(air_quality):
+    for lat, lon in random_locations(500):
+        assert air_quality.find_nearest_station(lat, lon) == brute_force_nearest(air_quality, lat, lon)
+
+
+def test_nearest_station_at_a_station(air_quality):
+    for station in air_quality.stations_json[::25]:
+        assert air_quality.find_nearest_station(station["gegrLat"], station["gegrLon"]) == \
+            brute_force_nearest(air_quality, float(station["gegrLat"]), float(station["gegrLon"]))
+
+
+@pytest.mark.parametrize("k, radius", [(5, None), (3, 50.0), (None, 25.0)])
+def test_nearest_stations_match_brute_force(air_quality, k, radius):
+    for lat, lon in random_locations(50, seed=1):
+        distances = haversine_distances(lat, lon, air_quality.station_coords[:, 0], air_quality.station_coords[:, 1])
+        order = np.argsort(distances, kind="stable")
+        if radius is not None:
+            order = order[distances[order] <= radius]
+        expected = [air_quality.station_ids[i].item() for i in order[:k]]
+        found = air_quality.find_nearest_stations(lat, lon, k=k, radius=radius)
+        assert [station_id for station_id, _ in found] == expected
+        assert [distance for _, distance in found] == pytest.approx(distances[order[:k]].tolist())
@@ -0,0 +1,70 @@
+"""
+Indexed zone search against the sequential scan it replaced.
+"""
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Point
+
+from paid_parking_zones.calculator import PaidParkingZones
+
+
+@pytest.fixture(scope="module")
+def ppz(app_config):
+    return PaidParkingZones(app_config)
+
+
+def scan(gdf_zones, point):
+    """
+    The original lookup: first row in file order whose geometry contains the point.
+    """
+    for index, row in gdf_zones.iterrows():
+        if row["geometry"].contains(point):
+            return row["Podstrefa"]
+    return None
+
+
+def random_points(ppz, count, seed=0):
+    """
+    Projected points uniform over the zones extended by a tenth on every side, plus points close to zone vertices.
+    """
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = shapely.total_bounds(ppz.zone_geometries)
+    pad_x, pad_y = (xmax - xmin) / 10, (ymax - ymin) / 10
+    x = rng.uniform(xmin - pad_x, xmax + pad_x, count)
+    y = rng.uniform(ymin - pad_y, ymax + pad_y, count)
+    vertices = shapely.get_coordinates(ppz.zone_geometries)
+    vertices = vertices[rng.integers(0, len(vertices), count)] + rng.normal(0, 5, (count, 2))
+    return [Point(px, py) for px, py in zip(np.concatenate([x, vertices[:, 0]]), np.concatenate([y, vertices[:, 1]]))]
+
+
+def test_find_zone_matches_sequential_scan(ppz):
+    points = random_points(ppz, 500)
+    found = [ppz.find_zone(point) for point in points]
+    assert found == [scan(ppz.gdf_zones, point) for point in points]
+    assert any(name is not None for name in found) and any(name is None for name in found)
+
+
+def test_first_zone_in_file_order_wins(app_config, ppz):
+    outer = shapely.box(0, 0, 100, 100)
+    inner = shapely.box(25, 25, 75, 75)
+    for geometries, names, expected in [([inner, outer], ["I", "II"], "I"), ([outer, inner], ["II", "I"], "II")]:
+        zones = PaidParkingZones(app_config, zones=(np.array(geometries, dtype=object), np.array(names), ppz.crs))
+        assert zones.find_zone(Point(50, 50)) == expected
+        assert zones.find_zone(Point(10, 10)) == "II"
+        assert zones.find_zone(Point(150, 50)) is None
+
+
+def test_bulk_prices_match_scalar_prices(ppz):
+    x, y = np.array([(point.x, point.y) for point in random_points(ppz, 300, seed=1)]).T
+    longitudes, latitudes = ppz.transformer.transform(x, y, direction="INVERSE")
+    prices = ppz.check_prices(longitudes, latitudes)
+    np.testing.assert_array_equal(prices, [ppz.check_price(lon, lat) for lon, lat in zip(longitudes, latitudes)])
+    assert prices.max() > 0
+
+
+def test_bulk_prices_of_missing_coordinates_are_zero(ppz):
+    longitude, latitude = ppz.transformer.transform(*shapely.get_coordinates(
+        shapely.point_on_surface(ppz.zone_geometries[0]))[0], direction="INVERSE")
+    prices = ppz.check_prices([longitude, np.nan, longitude], [latitude, latitude, np.nan])
+    np.testing.assert_array_equal(prices, [ppz.config.parking_price[ppz.zone_names[0]], 0, 0])
@@ -0,0 +1,87 @@
+"""
+The zone raster against the exact point-in-polygon search, on random points.
+"""
+import numpy as np
+import pytest
+import shapely
+from omegaconf import OmegaConf
+
+from paid_parking_zones.calculator import PaidParkingZones
+from paid_parking_zones.raster import ZoneRaster, LONLAT, PROJECTED, transform
+
+CELL_SIZES = {LONLAT: 0.0005, PROJECTED: 40.0}
+
+
+@pytest.fixture(scope="module")
+def exact(app_config):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    config.paid_parking.raster.enabled = False
+    return PaidParkingZones(config)
+
+
+@pytest.fixture(scope="module", params=[LONLAT, PROJECTED])
+def rastered(request, app_config, exact):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    config.paid_parking.raster.enabled = True
+    config.paid_parking.raster.coordinates = request.param
+    config.paid_parking.raster.cell_size = CELL_SIZES[request.param]
+    config.paid_parking.raster.cache_file = None
+    return PaidParkingZones(config, zones=(exact.zone_geometries, exact.zone_names, exact.crs))
+
+
+def random_points(exact, count, seed=0):
+    """
+    Uniform points over the zones extended by a tenth on every side, plus points jittered around zone vertices
+    so that many of them fall into boundary cells.
+    """
+    import pyproj
+    rng = np.random.default_rng(seed)
+    inverse = pyproj.Transformer.from_crs(exact.transformer.target_crs, exact.transformer.source_crs,
+                                          always_xy=True)
+    xmin, ymin, xmax, ymax = shapely.total_bounds(transform(exact.zone_geometries, inverse))
+    pad_x, pad_y = (xmax - xmin) / 10, (ymax - ymin) / 10
+    longitudes = rng.uniform(xmin - pad_x, xmax + pad_x, count)
+    latitudes = rng.uniform(ymin - pad_y, ymax + pad_y, count)
+
+    vertices = shapely.get_coordinates(exact.zone_geometries)
+    vertices = vertices[rng.integers(0, len(vertices), count)]
+    vertex_lon, vertex_lat = inverse.transform(vertices[:, 0], vertices[:, 1])
+    vertex_lon = vertex_lon + rng.normal(0, 0.0002, count)
+    vertex_lat = vertex_lat + rng.normal(0, 0.0002, count)
+    return np.concatenate([longitudes, vertex_lon]), np.concatenate([latitudes, vertex_lat])
+
+
+def find_zone_names(exact, longitudes, latitudes):
+    return np.array([exact.find_zone(exact.convert_coordinates(lon, lat))
+                     for lon, lat in zip(longitudes, latitudes)], dtype=object)
+
+
+def zone_names(exact, indices):
+    return np.append(exact.zone_names, None).astype(object)[indices]
+
+
+def test_raster_cells_agree_with_find_zone(exact, rastered):
+    longitudes, latitudes = random_points(exact, 2000)
+    expected = find_zone_names(exact, longitudes, latitudes)
+    found = rastered.raster.lookup(longitudes, latitudes)
+    resolved = found != ZoneRaster.BOUNDARY
+    assert resolved.any() and not resolved.all()
+    assert (found[resolved] < len(exact.zone_names)).any()
+    assert list(zone_names(exact, found[resolved])) == list(expected[resolved])
+
+
+def test_boundary_cells_fall_back_to_the_exact_search(exact, rastered):
+    longitudes, latitudes = random_points(exact, 2000, seed=1)
+    boundary = rastered.raster.lookup(longitudes, latitudes) == ZoneRaster.BOUNDARY
+    assert boundary.sum() > 100
+    found = rastered.zone_indices(longitudes, latitudes)
+    assert list(zone_names(exact, found)) == list(find_zone_names(exact, longitudes, latitudes))
+    assert (found[boundary] < len(exact.zone_names)).any()
+    assert (found[boundary] == len(exact.zone_names)).any()
+
+
+def test_single_point_lookups_match(exact, rastered):
+    longitudes, latitudes = random_points(exact, 200, seed=2)
+    np.testing.assert_array_equal(
+        [rastered.check_price(lon, lat) for lon, lat in zip(longitudes, latitudes)],
+        [exact.check_price(lon, lat) for lon, lat in zip(longitudes, latitudes)])
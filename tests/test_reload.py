@@ -0,0 +1,45 @@
+import gc
+import time
+import weakref
+
+from omegaconf import OmegaConf
+
+import air_quality.air_data
+from air_quality.air_data import AirQuality
+from benchmarks.stub_server import GiosStub
+from utils.metrics import Metrics
+
+
+def prefetching_air_quality(app_config, stub):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    config.air_pollution.air_pollution_url = stub.url
+    config.air_pollution.prefetch.enabled = True
+    config.air_pollution.prefetch.stations = [config.air_pollution.default_sensor_id]
+    config.air_pollution.prefetch.jitter = 0.0
+    instance = AirQuality(config)
+    deadline = time.monotonic() + 10
+    while instance.prefetcher.snapshot_age() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return instance
+
+
+def test_replaced_instance_is_unregistered(app_config, monkeypatch):
+    registry = Metrics()
+    registry.configure(OmegaConf.create({"enabled": True, "multiprocess_dir": None, "flush_interval": 5}))
+    monkeypatch.setattr(air_quality.air_data, "metrics", registry)
+    with GiosStub() as stub:
+        previous = prefetching_air_quality(app_config, stub)
+        previous.fallback_stats['unavailable'] += 5
+        current = prefetching_air_quality(app_config, stub)
+        previous.close()
+
+        rendered = registry.render().splitlines()
+        assert sum(line.startswith("app_air_quality_prefetch_snapshot_age_seconds ") for line in rendered) == 1
+        assert 'app_air_quality_fallback_total{result="unavailable"} 0' in rendered
+        assert len(registry.collectors) == len(current.metric_registrations) - 1
+        current.close()
+
+    assert registry.collectors == [] and registry.gauges == []
+    previous = weakref.ref(previous)
+    gc.collect()
+    assert previous() is None
@@ -0,0 +1,58 @@
+"""
+/get_saving_for_travel_batch against /get_saving_for_travel, trip by trip.
+"""
+import pytest
+
+import main
+
+TRIPS = [
+    {'transport_type': 1, 'distance': 12.5},
+    {'transport_type': 2, 'distance': 3, 'avg_consumption': 9.1, 'fuel_type': 1, 'fuel_price': 6.2},
+    {'transport_type': 3, 'distance': 40, 'fuel_type': 0, 'lon': 19.9387, 'lat': 50.0614},
+    {'transport_type': 0, 'distance': 1.2, 'lon': 20.5, 'lat': 49.0},
+    {'transport_type': 1.0, 'distance': 8},
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    return main.app.test_client()
+
+
+def batch(client, trips):
+    keys = sorted({key for trip in trips for key in trip})
+    return client.post('/get_saving_for_travel_batch',
+                       json={key: [trip.get(key) for trip in trips] for key in keys})
+
+
+def test_batch_matches_scalar_for_valid_trips(client):
+    response = batch(client, TRIPS)
+    assert response.status_code == 200
+    for i, trip in enumerate(TRIPS):
+        scalar = client.get('/get_saving_for_travel', query_string=trip)
+        assert scalar.status_code == 200
+        assert response.json['cost_difference'][i] == pytest.approx(scalar.json['cost_difference'], rel=1e-12)
+        assert response.json['co2_difference'][i] == pytest.approx(scalar.json['co2_difference'], rel=1e-12)
+
+
+def test_unknown_transport_type_is_null_in_batch(client):
+    assert client.get('/get_saving_for_travel', query_string={'transport_type': 9}).status_code == 404
+    response = batch(client, TRIPS[:1] + [{'transport_type': 9, 'distance': 5}])
+    assert response.status_code == 200
+    assert response.json['cost_difference'][0] is not None
+    assert response.json['cost_difference'][1] is None and response.json['co2_difference'][1] is None
+
+
+@pytest.mark.parametrize("invalid", [
+    {'transport_type': 1.5},
+    {'transport_type': 'bike'},
+    {'fuel_type': 7},
+    {'distance': 'far'},
+])
+def test_invalid_trip_gives_the_same_400(client, invalid):
+    trip = {**TRIPS[0], **invalid}
+    scalar = client.get('/get_saving_for_travel', query_string=trip)
+    response = batch(client, TRIPS[:1] + [trip])
+    assert scalar.status_code == response.status_code == 400
+    assert response.json == scalar.json
+    assert "np." not in response.json['error']
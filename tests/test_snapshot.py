@@ -0,0 +1,89 @@
+"""
+Runtime snapshot round trip and the Lazy proxies of the app datasets.
+"""
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+import shapely
+from omegaconf import OmegaConf
+
+from air_quality.air_data import AirQuality
+from paid_parking_zones.calculator import PaidParkingZones
+from traffic_intensity.traffic import TrafficIntensity
+from utils.lazy import Lazy
+from utils.snapshot import RuntimeSnapshot, build_snapshot
+
+
+@pytest.fixture
+def config(app_config, tmp_path):
+    config = OmegaConf.create(OmegaConf.to_container(app_config))
+    # A copy of one source file, so the test can change it without touching the repository
+    traffic_file = tmp_path / "average_traffic.csv"
+    shutil.copy(app_config.traffic.average_traffic_file, traffic_file)
+    config.traffic.average_traffic_file = str(traffic_file)
+    return config
+
+
+def test_snapshot_round_trip(config, tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    build_snapshot(config, path)
+    snapshot = RuntimeSnapshot.load(path)
+    assert snapshot is not None
+    assert snapshot.config == config
+
+    ppz = PaidParkingZones(config)
+    geometries, names, crs = snapshot.zones
+    assert shapely.equals_exact(geometries, ppz.zone_geometries).all()
+    assert list(names) == list(ppz.zone_names)
+    lons, lats = np.random.default_rng(0).uniform([21.9, 49.98], [22.05, 50.07], (1000, 2)).T
+    prices = ppz.check_prices(lons, lats)
+    np.testing.assert_array_equal(PaidParkingZones(config, zones=snapshot.zones).check_prices(lons, lats), prices)
+    assert prices.max() > 0
+
+    air_quality = AirQuality(config)
+    np.testing.assert_array_equal(snapshot.stations[0], air_quality.station_ids)
+    np.testing.assert_array_equal(snapshot.stations[1], air_quality.station_coords)
+    air_quality.close()
+    np.testing.assert_array_equal(snapshot.traffic_matrix, TrafficIntensity(config).matrix)
+
+
+def test_snapshot_is_ignored_when_a_source_changes(config, tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    build_snapshot(config, path)
+    stat = os.stat(config.traffic.average_traffic_file)
+    os.utime(config.traffic.average_traffic_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert RuntimeSnapshot.load(path) is None
+    os.remove(config.traffic.average_traffic_file)
+    assert RuntimeSnapshot.load(path) is None
+    assert RuntimeSnapshot.load(str(tmp_path / "missing.npz")) is None
+
+
+class Dataset:
+    def __init__(self, generation):
+        self.generation = generation
+
+
+def test_lazy_creates_the_object_once():
+    calls = []
+    lazy = Lazy("dataset", lambda: calls.append(1) or Dataset(len(calls)))
+    assert not lazy.loaded() and calls == []
+    threads = [threading.Thread(target=lazy.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lazy.loaded() and len(calls) == 1
+    assert lazy.generation == 1 and lazy.load_time is not None
+    lazy.generation = 5
+    assert lazy.get().generation == 5
+
+
+def test_lazy_reload_replaces_the_object():
+    calls = []
+    lazy = Lazy("dataset", lambda: calls.append(1) or Dataset(len(calls)))
+    previous = lazy.get()
+    assert lazy.reload() is lazy.get()
+    assert lazy.generation == 2 and previous.generation == 1
@@ -0,0 +1,86 @@
+"""
+Precomputed traffic matrix against the average traffic table, and the traffic endpoints.
+"""
+import math
+
+import pandas as pd
+import pytest
+
+import main
+from traffic_intensity.traffic import TrafficIntensity, DAYS_OF_WEEK, HOURS_PER_DAY
+
+
+@pytest.fixture(scope="module")
+def traffic(app_config):
+    return TrafficIntensity(app_config)
+
+
+@pytest.fixture(scope="module")
+def client():
+    return main.app.test_client()
+
+
+def table_lookup(app_config, hour, day_of_week):
+    """
+    Filter the average traffic table for a day and hour, as the endpoint did before the matrix.
+    """
+    cfg = app_config.traffic
+    df = pd.read_csv(cfg.average_traffic_file)
+    rows = df[(df[cfg.hour] == hour) & (df[cfg.day_of_week] == day_of_week)]
+    return None if rows.empty else float(rows[cfg.value].iloc[0])
+
+
+def test_matrix_matches_table(app_config, traffic):
+    found = 0
+    for day in DAYS_OF_WEEK:
+        for hour in range(HOURS_PER_DAY):
+            expected = table_lookup(app_config, hour, day)
+            assert traffic.lookup(hour, day) == (None if expected is None or math.isnan(expected) else expected)
+            found += expected is not None
+    assert found > 0
+
+
+@pytest.mark.parametrize("hour, day", [(-1, "Monday"), (24, "Monday"), (8, "monday"), (8, "Funday"), (8, None)])
+def test_lookup_outside_the_matrix(traffic, hour, day):
+    assert traffic.lookup(hour, day) is None
+
+
+def test_day_curve_and_week_are_read_only_rows(traffic):
+    week = traffic.week_matrix()
+    assert week.shape == (len(DAYS_OF_WEEK), HOURS_PER_DAY)
+    assert list(traffic.day_curve("Friday")) == pytest.approx(list(week[4]), nan_ok=True)
+    assert traffic.day_curve("Funday") is None
+    with pytest.raises(ValueError):
+        week[0, 0] = 1
+
+
+def test_get_traffic(app_config, client):
+    response = client.get('/get_traffic', query_string={'hour': 8, 'day_of_week': 'Tuesday'})
+    assert response.status_code == 200
+    assert response.json == {'traffic': round(table_lookup(app_config, 8, 'Tuesday'), 2)}
+
+
+@pytest.mark.parametrize("query, status", [
+    ({'day_of_week': 'Tuesday'}, 400),
+    ({'hour': 'eight', 'day_of_week': 'Tuesday'}, 400),
+    ({'hour': 24, 'day_of_week': 'Tuesday'}, 404),
+    ({'hour': 8, 'day_of_week': 'Funday'}, 404),
+    ({'hour': 8}, 404),
+])
+def test_get_traffic_errors(client, query, status):
+    response = client.get('/get_traffic', query_string=query)
+    assert response.status_code == status
+    assert 'error' in response.json
+
+
+def test_get_current_traffic(client):
+    response = client.get('/get_current_traffic')
+    assert response.status_code in (200, 404)
+    assert ('traffic' if response.status_code == 200 else 'error') in response.json
+
+
+def test_get_traffic_range(client):
+    week = client.get('/get_traffic_range').json['traffic']
+    assert set(week) == set(DAYS_OF_WEEK) and all(len(hours) == HOURS_PER_DAY for hours in week.values())
+    assert client.get('/get_traffic_range', query_string={'day_of_week': 'Sunday'}).json['traffic'] == week['Sunday']
+    assert client.get('/get_traffic_range', query_string={'day_of_week': 'Funday'}).status_code == 404
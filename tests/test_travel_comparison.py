@@ -0,0 +1,45 @@
+"""
+/get_travel_comparison against /get_saving_for_travel, mode by mode.
+"""
+import pytest
+
+import main
+from means_of_transport import MeansOfTransportRegistry
+
+TRIPS = [
+    {'distance': 12},
+    {'distance': 40, 'fuel_type': 0, 'avg_consumption': 9.1, 'lon': 19.9387, 'lat': 50.0614},
+    {'distance': 3.5, 'fuel_type': 1, 'fuel_price': 6.2},
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize("trip", TRIPS)
+def test_comparison_matches_saving_for_travel(client, trip):
+    response = client.get('/get_travel_comparison', query_string=trip)
+    assert response.status_code == 200
+    comparison = response.json['comparison']
+    assert sorted(item['transport_type'] for item in comparison) == sorted(MeansOfTransportRegistry.all_transports())
+    for item in comparison:
+        saving = client.get('/get_saving_for_travel', query_string={**trip, 'transport_type': item['transport_type']})
+        assert item['cost_difference'] == pytest.approx(saving.json['cost_difference'], rel=1e-12)
+        assert item['co2_difference'] == pytest.approx(saving.json['co2_difference'], rel=1e-12)
+        assert item['cost'] == pytest.approx(response.json['car']['cost'] - item['cost_difference'])
+
+
+@pytest.mark.parametrize("rank_by", ['cost', 'co2'])
+def test_comparison_is_ranked_best_first(client, rank_by):
+    comparison = client.get('/get_travel_comparison', query_string={**TRIPS[1], 'rank_by': rank_by}).json['comparison']
+    differences = [item[f'{rank_by}_difference'] for item in comparison]
+    assert differences == sorted(differences, reverse=True)
+
+
+@pytest.mark.parametrize("query", [{'rank_by': 'time'}, {'distance': 'far'}, {'fuel_type': 7}])
+def test_comparison_rejects_invalid_parameters(client, query):
+    response = client.get('/get_travel_comparison', query_string=query)
+    assert response.status_code == 400
+    assert 'error' in response.json
@@ -0,0 +1,56 @@
+"""
+Offline trip log processing against /get_saving_for_travel_batch.
+"""
+import math
+
+import pandas as pd
+import pytest
+
+import main
+from trip_logs import process_file
+
+TRIPS = [
+    {'transport_type': 1, 'distance': 12.5},
+    {'transport_type': 2, 'distance': 3, 'avg_consumption': 9.1, 'fuel_type': 1, 'fuel_price': 6.2},
+    {'transport_type': 3, 'distance': 40, 'fuel_type': 0, 'lon': 19.9387, 'lat': 50.0614},
+    {'transport_type': 0, 'distance': 1.2, 'lon': 22.0045, 'lat': 50.0379},
+    {'transport_type': 1, 'distance': 8, 'lon': 22.0, 'lat': 50.04},
+    {'transport_type': 3, 'distance': 25, 'fuel_type': 1},
+]
+INVALID_TRIPS = [
+    {'transport_type': 9, 'distance': 5},
+    {'transport_type': 1.5, 'distance': 5},
+    {'transport_type': 'bike', 'distance': 5},
+    {'transport_type': 1, 'distance': 5, 'fuel_type': 7},
+    {'transport_type': 1, 'distance': 'far'},
+]
+
+
+def savings_file(app_config, tmp_path, trips, workers):
+    input_path, output_path = str(tmp_path / "trips.csv"), str(tmp_path / f"savings_{workers}.csv")
+    pd.DataFrame(trips).to_csv(input_path, index=False)
+    rows, _ = process_file(input_path, output_path, app_config, workers=workers, chunksize=2, max_pending=1,
+                           progress=lambda line: None)
+    assert rows == len(trips)
+    return pd.read_csv(output_path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_savings_match_batch_endpoint(app_config, tmp_path, workers):
+    trips = TRIPS * 3
+    result = savings_file(app_config, tmp_path, trips, workers)
+    keys = sorted({key for trip in trips for key in trip})
+    response = main.app.test_client().post('/get_saving_for_travel_batch',
+                                           json={key: [trip.get(key) for trip in trips] for key in keys})
+    assert response.status_code == 200
+    assert result['cost_difference'].tolist() == pytest.approx(response.json['cost_difference'], rel=1e-12)
+    assert result['co2_difference'].tolist() == pytest.approx(response.json['co2_difference'], rel=1e-12)
+    assert result['transport_type'].tolist() == [trip['transport_type'] for trip in trips]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_invalid_trips_have_empty_savings(app_config, tmp_path, workers):
+    result = savings_file(app_config, tmp_path, TRIPS[:1] + INVALID_TRIPS + TRIPS[1:2], workers)
+    assert not math.isnan(result['cost_difference'].iloc[0]) and not math.isnan(result['co2_difference'].iloc[-1])
+    assert result['cost_difference'].iloc[1:-1].isna().all()
+    assert result['co2_difference'].iloc[1:-1].isna().all()
@@ -0,0 +1,111 @@
+"""
+Circuit breaker and request coalescing of the air quality client, against the local GIOŚ stub.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from air_quality.resilience import AsyncSingleFlight, CircuitBreaker, SingleFlight
+from benchmarks import upstream_faults
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats == {'success': 1, 'failure': 5, 'rejected': 1, 'opened': 1}
+
+
+def test_breaker_half_open_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.allow()
+    breaker.record_failure()
+    clock.now = 9.9
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_single_flight_shares_one_call():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("key", func)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(single_flight.do("key", func))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    while single_flight.stats['shared'] < 5:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+    assert calls == [1]
+    assert results == ["result"] * 6
+    assert single_flight.stats == {'leader': 1, 'shared': 5}
+
+
+def test_single_flight_shares_errors():
+    single_flight = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        single_flight.do("key", lambda: 1 / 0)
+    assert single_flight.do("key", lambda: "next") == "next"
+
+
+def test_async_single_flight_shares_one_call():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", func) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["result"] * 10
+    assert calls == [1]
+
+
+@pytest.mark.parametrize("scenario", [upstream_faults.coalescing, upstream_faults.async_coalescing,
+                                      upstream_faults.circuit_breaker, upstream_faults.station_errors,
+                                      upstream_faults.flaky_upstream],
+                         ids=lambda scenario: scenario.__name__)
+def test_upstream_fault_scenario(app_config, scenario):
+    assert scenario(app_config)
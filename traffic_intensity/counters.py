@@ -0,0 +1,172 @@
+"""
+Per-counter traffic profiles served from a compact binary store.
+
+The store is built from normalize_traffic/*.csv by the traffic pipeline or by this module's CLI: a float32 .npy
+array of shape (counters, 7, 24) that is memory-mapped at runtime, so all worker processes share the same pages,
+and a small JSON index with the counter ids and a digest of the source files. The app only loads the store, it
+never parses the csv files. `--check` tells whether the store still matches the csv files.
+
+Counters are looked up by id. The OpenData export has no counter coordinates, so there is no lookup by location.
+
+Usage:
+    python -m traffic_intensity.counters [--check]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from traffic_intensity.traffic import DAYS_OF_WEEK, HOURS_PER_DAY
+from utils.metrics import metrics
+
+
+def source_files(normalized_dir):
+    """
+    List the per-counter csv files in natural order (MQ_K2_1 before MQ_K10_1).
+
+    Args:
+        normalized_dir (str): Directory with per-counter csv files.
+
+    Returns:
+        list: Paths of the csv files.
+    """
+    return sorted(glob.glob(os.path.join(normalized_dir, "*.csv")),
+                  key=lambda path: [int(part) if part.isdigit() else part
+                                    for part in re.split(r"(\d+)", os.path.basename(path))])
+
+
+def source_digest(normalized_dir):
+    """
+    Digest of the names and contents of the per-counter csv files, independent of their modification times.
+
+    Args:
+        normalized_dir (str): Directory with per-counter csv files.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for path in source_files(normalized_dir):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def build_store(normalized_dir, store_file, index_file):
+    """
+    Build the binary counter store from per-counter csv files.
+
+    Args:
+        normalized_dir (str): Directory with per-counter csv files (Id, Dzien tygodnia, Godzina, Natężenie).
+        store_file (str): Target .npy file.
+        index_file (str): Target JSON index file.
+
+    Returns:
+        int: Number of counters in the store.
+    """
+    import pandas as pd
+    files = source_files(normalized_dir)
+    ids = [os.path.splitext(os.path.basename(path))[0] for path in files]
+    profiles = np.full((len(files), len(DAYS_OF_WEEK), HOURS_PER_DAY), np.nan, dtype=np.float32)
+    day_index = {day: i for i, day in enumerate(DAYS_OF_WEEK)}
+    for i, path in enumerate(files):
+        df = pd.read_csv(path)
+        profiles[i, df["Dzien tygodnia"].map(day_index).to_numpy(), df["Godzina"].to_numpy()] = df["Natężenie"]
+
+    # Written to temporary files and renamed, so workers mapping the old store keep reading consistent data
+    np.save(f"{store_file}.tmp.npy", profiles)
+    with open(f"{index_file}.tmp", "w", encoding="utf-8") as file:
+        json.dump({"ids": ids, "sources": source_digest(normalized_dir)}, file)
+    os.replace(f"{store_file}.tmp.npy", store_file)
+    os.replace(f"{index_file}.tmp", index_file)
+    return len(ids)
+
+
+class CounterTraffic:
+    """
+    Class for serving traffic intensity of individual counters.
+
+    Attributes:
+        config (Config): Configuration object containing counter store settings (traffic.counters).
+        profiles (numpy.ndarray): Memory-mapped array of shape (counters, 7, 24).
+        ids (list): Counter identifiers, in the order of the first axis of profiles.
+        sources (str): Digest of the csv files the store was built from.
+
+    Methods:
+        counter_traffic: Traffic intensity of a counter given by id.
+    """
+
+    def __init__(self, config):
+        """
+        Initializes the CounterTraffic class from a store built beforehand.
+
+        Args:
+            config (Config): Configuration object containing traffic settings.
+
+        Raises:
+            FileNotFoundError: If the store has not been built.
+        """
+        self.config = config.traffic.counters
+        for path in (self.config.store_file, self.config.index_file):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Counter store file {path} is missing, "
+                                        "build it with python -m traffic_intensity.counters")
+        self.profiles = np.load(self.config.store_file, mmap_mode="r")
+        with open(self.config.index_file, encoding="utf-8") as file:
+            index = json.load(file)
+        self.ids = index["ids"]
+        self.sources = index.get("sources")
+        self.positions = {counter: i for i, counter in enumerate(self.ids)}
+
+    def counter_traffic(self, counter_id, hour, day_of_week):
+        """
+        Traffic intensity of a counter given by id.
+
+        Args:
+            counter_id (str): Counter identifier, e.g. "MQ_K10_1".
+            hour (int): Hour of the day (0-23).
+            day_of_week (str): English day name.
+
+        Returns:
+            float | None: Traffic intensity or None if there is no data.
+        """
+        with metrics.stage("traffic.counter_lookup"):
+            counter = self.positions.get(counter_id)
+            if counter is None or day_of_week not in DAYS_OF_WEEK or not 0 <= hour < HOURS_PER_DAY:
+                return None
+            value = self.profiles[counter, DAYS_OF_WEEK.index(day_of_week), hour]
+            return None if np.isnan(value) else float(value)
+
+
+def main():
+    from hydra import initialize, compose
+    parser = argparse.ArgumentParser(description="Build the per-counter traffic store from the csv profiles.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only check that the store matches the csv files, exit code 1 if it does not")
+    args = parser.parse_args()
+    with initialize(version_base=None, config_path="../conf", job_name="counter_store"):
+        config = compose(config_name="config")
+    cfg = config.traffic.counters
+    normalized_dir = config.traffic.pipeline.normalized_dir
+    if args.check:
+        try:
+            stored = CounterTraffic(config).sources
+        except FileNotFoundError as e:
+            sys.exit(str(e))
+        if stored != source_digest(normalized_dir):
+            sys.exit(f"Counter store {cfg.store_file} is out of date with {normalized_dir}, "
+                     "rebuild it with python -m traffic_intensity.counters")
+        print(f"Counter store {cfg.store_file} is up to date")
+        return
+    count = build_store(normalized_dir, cfg.store_file, cfg.index_file)
+    print(f"Stored {count} counters in {cfg.store_file}")
+
+
+if __name__ == "__main__":
+    main()
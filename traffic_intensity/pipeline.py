@@ -0,0 +1,278 @@
+"""
+Traffic intensity ingestion pipeline.
+
+Turns the raw OpenData export of traffic counters (pomiar_natezenia_drogowego.CSV) into the per-counter
+profiles in normalize_traffic/*.csv and the city-wide global_avarage_traffic.csv served by the app.
+
+The export is streamed in chunks, twice: the first pass collects the daily minimum and maximum of every
+counter, the second normalizes measurements to 0-1 within each (counter, day) and adds them to per
+(counter, day of week, hour) sums. Both passes only keep the current chunk and small aggregates in
+memory. The sums are stored in a state file, so later runs only process dates that were not seen before.
+
+Usage:
+    python -m traffic_intensity.pipeline data/pomiar_natezenia_drogowego.CSV [--full]
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from hydra import initialize, compose
+
+from traffic_intensity.counters import build_store
+from traffic_intensity.traffic import DAYS_OF_WEEK, HOURS_PER_DAY
+
+
+class TrafficPipeline:
+    """
+    Chunked, incremental computation of normalized traffic profiles.
+
+    Attributes:
+        config (Config): Pipeline configuration (traffic.pipeline).
+        ids (list): Counter identifiers, in the order of the first axis of the aggregates.
+        dates (set): Dates (YYYY-MM-DD) already included in the aggregates.
+        sums (numpy.ndarray): Sum of normalized intensity per (counter, day of week, hour).
+        counts (numpy.ndarray): Number of normalized values added to sums.
+        rows (numpy.ndarray): Number of measurements per cell, including ones that could not be normalized.
+
+    Methods:
+        load_state: Restore aggregates of previous runs.
+        save_state: Store aggregates for the next run.
+        process: Add new dates of a raw export to the aggregates.
+        profiles: Per-counter mean normalized intensity.
+        write_outputs: Regenerate per-counter and global csv files.
+    """
+
+    def __init__(self, config):
+        """
+        Initializes the TrafficPipeline class.
+
+        Args:
+            config (Config): Pipeline configuration (traffic.pipeline).
+        """
+        self.config = config
+        self.id_pattern = re.compile(self.config.id_pattern)
+        self.ids = []
+        self.dates = set()
+        self.sums = np.zeros((0, len(DAYS_OF_WEEK), HOURS_PER_DAY))
+        self.counts = np.zeros((0, len(DAYS_OF_WEEK), HOURS_PER_DAY), dtype=np.int64)
+        self.rows = np.zeros((0, len(DAYS_OF_WEEK), HOURS_PER_DAY), dtype=np.int64)
+
+    def load_state(self, path):
+        """
+        Restore aggregates of previous runs.
+
+        Args:
+            path (str): State file written by save_state.
+        """
+        with np.load(path, allow_pickle=False) as state:
+            self.ids = state["ids"].tolist()
+            self.dates = set(state["dates"].tolist())
+            self.sums = state["sums"]
+            self.counts = state["counts"]
+            self.rows = state["rows"]
+
+    def save_state(self, path):
+        """
+        Store aggregates for the next run.
+
+        Args:
+            path (str): Target .npz file.
+        """
+        np.savez_compressed(path, ids=np.array(self.ids, dtype=str), dates=np.array(sorted(self.dates), dtype=str),
+                            sums=self.sums, counts=self.counts, rows=self.rows)
+
+    def read_chunks(self, raw_file):
+        """
+        Stream the raw export as (Id, date, hour, value) chunks restricted to selected counters and new dates.
+
+        Args:
+            raw_file (str): Path to the raw csv export.
+
+        Yields:
+            pandas.DataFrame: Chunk with columns Id, Date (datetime64), Hour and Value.
+        """
+        columns = self.config.columns
+        date_cache = {}
+        known_dates = pd.to_datetime(sorted(self.dates))
+        reader = pd.read_csv(raw_file, chunksize=self.config.chunksize,
+                             usecols=[columns.id, columns.date, columns.hour, columns.value],
+                             dtype={columns.id: "category", columns.date: "category", columns.hour: "category"})
+        for chunk in reader:
+            # String columns are read as categoricals, so matching and parsing runs once per distinct value
+            ids = chunk[columns.id].cat
+            id_matches = np.append(ids.categories.str.fullmatch(self.id_pattern), False)
+
+            dates = chunk[columns.date].cat
+            new_dates = [date for date in dates.categories if date not in date_cache]
+            if new_dates:
+                date_cache.update(zip(new_dates, pd.to_datetime(new_dates, format=self.config.date_format)))
+            date_values = pd.DatetimeIndex([date_cache[date] for date in dates.categories] + [pd.NaT])
+
+            hours = chunk[columns.hour].cat
+            hour_values = pd.to_numeric(pd.Series(hours.categories).str.partition(":")[0], errors="coerce")
+            hour_values = np.append(hour_values, np.nan)
+
+            chunk_dates = date_values[dates.codes]
+            chunk_hours = hour_values[hours.codes]
+            keep = (id_matches[ids.codes] & ~chunk_dates.isin(known_dates)
+                    & (chunk_hours >= 0) & (chunk_hours < HOURS_PER_DAY))
+            yield pd.DataFrame({
+                "Id": np.asarray(chunk[columns.id].to_numpy()[keep], dtype=object),
+                "Date": chunk_dates[keep],
+                "Hour": chunk_hours[keep].astype(int),
+                "Value": pd.to_numeric(chunk[columns.value][keep], errors="coerce").to_numpy(),
+            })
+
+    def daily_ranges(self, raw_file):
+        """
+        First pass: minimum and maximum intensity of every counter on every new date.
+
+        Args:
+            raw_file (str): Path to the raw csv export.
+
+        Returns:
+            pandas.DataFrame: Min and Max columns indexed by (Id, Date).
+        """
+        ranges = None
+        for chunk in self.read_chunks(raw_file):
+            part = chunk.groupby(["Id", "Date"])["Value"].agg(Min="min", Max="max")
+            if ranges is not None:
+                part = pd.concat([ranges, part]).groupby(level=["Id", "Date"]).agg({"Min": "min", "Max": "max"})
+            ranges = part
+        return ranges
+
+    def counter_index(self, ids):
+        """
+        Map counter identifiers to rows of the aggregates, growing them for new counters.
+
+        Args:
+            ids (numpy.ndarray): Counter identifiers.
+
+        Returns:
+            numpy.ndarray: Row index for every identifier.
+        """
+        positions = {counter: i for i, counter in enumerate(self.ids)}
+        new_ids = [counter for counter in pd.unique(ids) if counter not in positions]
+        if new_ids:
+            for counter in new_ids:
+                positions[counter] = len(self.ids)
+                self.ids.append(counter)
+            padding = ((0, len(new_ids)), (0, 0), (0, 0))
+            self.sums = np.pad(self.sums, padding)
+            self.counts = np.pad(self.counts, padding)
+            self.rows = np.pad(self.rows, padding)
+        return pd.Series(ids).map(positions).to_numpy()
+
+    def process(self, raw_file):
+        """
+        Add the dates of a raw export that are not in the aggregates yet.
+
+        Args:
+            raw_file (str): Path to the raw csv export.
+
+        Returns:
+            int: Number of measurements processed.
+        """
+        ranges = self.daily_ranges(raw_file)
+        if ranges is None or ranges.empty:
+            return 0
+
+        processed = 0
+        for chunk in self.read_chunks(raw_file):
+            chunk = chunk.join(ranges, on=["Id", "Date"])
+            # Constant days give 0/0 = NaN, the same as the notebook did
+            with np.errstate(divide="ignore", invalid="ignore"):
+                normalized = ((chunk["Value"] - chunk["Min"]) / (chunk["Max"] - chunk["Min"])).to_numpy()
+            cells = np.ravel_multi_index((self.counter_index(chunk["Id"].to_numpy()),
+                                          chunk["Date"].dt.dayofweek.to_numpy(),
+                                          chunk["Hour"].to_numpy()), self.sums.shape)
+            valid = ~np.isnan(normalized)
+            shape = self.sums.shape
+            self.sums += np.bincount(cells[valid], weights=normalized[valid], minlength=self.sums.size).reshape(shape)
+            self.counts += np.bincount(cells[valid], minlength=self.counts.size).reshape(shape)
+            self.rows += np.bincount(cells, minlength=self.rows.size).reshape(shape)
+            processed += len(chunk)
+
+        self.dates.update(ranges.index.get_level_values("Date").strftime("%Y-%m-%d"))
+        return processed
+
+    def profiles(self):
+        """
+        Per-counter mean normalized intensity for every day of week and hour.
+
+        Returns:
+            numpy.ndarray: Array of shape (counters, 7, 24), NaN where no value could be normalized.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.counts > 0, self.sums / self.counts, np.nan)
+
+    def write_outputs(self, normalized_dir, global_file):
+        """
+        Regenerate per-counter csv files and the global average traffic file.
+
+        The global average is the sum of counter profiles divided by the number of counters, with missing
+        values counted as 0, as in the original notebook.
+
+        Args:
+            normalized_dir (str): Directory for the per-counter files.
+            global_file (str): Path of the global average file.
+        """
+        os.makedirs(normalized_dir, exist_ok=True)
+        profiles = self.profiles()
+        days = np.repeat(DAYS_OF_WEEK, HOURS_PER_DAY)
+        hours = np.tile(np.arange(HOURS_PER_DAY), len(DAYS_OF_WEEK))
+        written = []
+        for i, counter in enumerate(self.ids):
+            present = self.rows[i].reshape(-1) > 0
+            if not present.any():
+                continue
+            written.append(i)
+            pd.DataFrame({
+                "Id": counter,
+                "Dzien tygodnia": days[present],
+                "Godzina": hours[present],
+                "Natężenie": profiles[i].reshape(-1)[present],
+            }).to_csv(os.path.join(normalized_dir, f"{counter}.csv"), index=False)
+
+        global_traffic = np.nan_to_num(profiles[written]).sum(axis=0) / max(len(written), 1)
+        pd.DataFrame({
+            "Traffic": global_traffic.reshape(-1),
+            "Week_day": days,
+            "Hour": hours,
+        }).to_csv(global_file, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize raw traffic counter data and compute average traffic.")
+    parser.add_argument("raw_file", help="Raw OpenData export, e.g. pomiar_natezenia_drogowego.CSV")
+    parser.add_argument("--full", action="store_true", help="Ignore the state of previous runs and rebuild everything")
+    parser.add_argument("--chunksize", type=int, default=None, help="Rows read per chunk")
+    args = parser.parse_args()
+
+    with initialize(version_base=None, config_path="../conf", job_name="traffic_pipeline"):
+        config = compose(config_name="config")
+    cfg = config.traffic.pipeline
+    if args.chunksize is not None:
+        cfg.chunksize = args.chunksize
+
+    start = time.perf_counter()
+    pipeline = TrafficPipeline(cfg)
+    if not args.full and os.path.exists(cfg.state_file):
+        pipeline.load_state(cfg.state_file)
+    processed = pipeline.process(args.raw_file)
+    if processed == 0 and not args.full:
+        print("No new dates found, outputs are up to date.")
+        return
+    pipeline.write_outputs(cfg.normalized_dir, config.traffic.average_traffic_file)
+    pipeline.save_state(cfg.state_file)
+    counters = config.traffic.counters
+    build_store(cfg.normalized_dir, counters.store_file, counters.index_file)
+    print(f"Processed {processed} measurements from {len(pipeline.ids)} counters and {len(pipeline.dates)} dates "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+
+from utils.metrics import metrics
+
+DAYS_OF_WEEK = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+HOURS_PER_DAY = 24
+
+
+class TrafficIntensity:
+    """
+    Class for serving average traffic intensity.
+
+    Attributes:
+        config (Config): Configuration object containing traffic settings.
+        matrix (numpy.ndarray): Traffic intensity of shape (7, 24) indexed by day of week (Monday first)
+            and hour, NaN where the source file has no data.
+
+    Methods:
+        day_index: Convert a day name to the matrix row.
+        lookup: Traffic intensity for a single day and hour.
+        day_curve: Traffic intensity for every hour of a day.
+        week_matrix: Traffic intensity for the whole week.
+    """
+
+    def __init__(self, config, matrix=None):
+        """
+        Initializes the TrafficIntensity class.
+
+        Args:
+            config (Config): Configuration object containing traffic settings.
+            matrix (numpy.ndarray | None): Preloaded (7, 24) matrix, e.g. from the runtime snapshot.
+                If None the average traffic file is read.
+        """
+        self.config = config.traffic
+        if matrix is None:
+            import pandas as pd
+            matrix = self.load_matrix(pd.read_csv(self.config.average_traffic_file))
+        self.matrix = matrix
+
+    def load_matrix(self, df):
+        """
+        Convert the long (value, day of week, hour) table into a dense day x hour matrix.
+
+        Args:
+            df (pandas.DataFrame): Average traffic table.
+
+        Returns:
+            numpy.ndarray: Matrix of shape (7, 24).
+        """
+        matrix = np.full((len(DAYS_OF_WEEK), HOURS_PER_DAY), np.nan)
+        days = df[self.config.day_of_week].map({day: i for i, day in enumerate(DAYS_OF_WEEK)})
+        hours = df[self.config.hour]
+        valid = days.notna() & hours.between(0, HOURS_PER_DAY - 1)
+        matrix[days[valid].astype(int), hours[valid].astype(int)] = df.loc[valid, self.config.value]
+        return matrix
+
+    @staticmethod
+    def day_index(day_of_week):
+        """
+        Convert a day name to the matrix row.
+
+        Args:
+            day_of_week (str): English day name, e.g. "Monday".
+
+        Returns:
+            int | None: Row index or None for an unknown day.
+        """
+        try:
+            return DAYS_OF_WEEK.index(day_of_week)
+        except ValueError:
+            return None
+
+    def lookup(self, hour, day_of_week):
+        """
+        Traffic intensity for a single day and hour.
+
+        Args:
+            hour (int): Hour of the day (0-23).
+            day_of_week (str): English day name.
+
+        Returns:
+            float | None: Traffic intensity or None if there is no data.
+        """
+        with metrics.stage("traffic.lookup"):
+            day = self.day_index(day_of_week)
+            if day is None or not 0 <= hour < HOURS_PER_DAY:
+                return None
+            value = self.matrix[day, hour]
+            return None if np.isnan(value) else float(value)
+
+    def day_curve(self, day_of_week):
+        """
+        Traffic intensity for every hour of a day.
+
+        Args:
+            day_of_week (str): English day name.
+
+        Returns:
+            numpy.ndarray | None: Read-only view of 24 values or None for an unknown day.
+        """
+        day = self.day_index(day_of_week)
+        if day is None:
+            return None
+        return self.week_matrix()[day]
+
+    def week_matrix(self):
+        """
+        Traffic intensity for the whole week.
+
+        Returns:
+            numpy.ndarray: Read-only view of the (7, 24) matrix.
+        """
+        view = self.matrix.view()
+        view.flags.writeable = False
+        return view
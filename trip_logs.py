@@ -0,0 +1,226 @@
+"""
+Offline cost and CO2 savings for trip logs.
+
+The trip file (csv or parquet) has one trip per row with the /get_saving_for_travel parameters as columns
+(transport_type, distance, avg_consumption, fuel_type, fuel_price, lon, lat). Missing columns and empty values
+use the same defaults as the endpoint. The file is streamed in chunks, chunks are processed by a pool of worker
+processes, each of them loading the paid parking zones once, and the results are appended to the output file in
+input order as soon as they are ready. At most trip_logs.max_pending chunks per worker are read ahead, so memory
+stays bounded for files of any size.
+
+The output has the input columns followed by cost_difference and co2_difference, empty for trips with an
+unknown transport or fuel type.
+
+Usage:
+    python -m trip_logs trips.csv savings.csv [--workers 4] [--chunksize 100000]
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from means_of_transport import Car, transport_summary_batch
+from pricing import PricingModel
+from utils.utils import calculate_cost_co2_difference
+
+# Models of the worker process, created once by init_worker
+worker_state = {}
+
+
+def init_worker(config):
+    """
+    Create the pricing model and paid parking zones of a worker process.
+
+    :param config: Plain dictionary of the application config.
+    """
+    from omegaconf import OmegaConf
+    from paid_parking_zones.calculator import PaidParkingZones
+    from utils.snapshot import RuntimeSnapshot
+    config = OmegaConf.create(config)
+    snapshot = RuntimeSnapshot.load()
+    # Zones of the snapshot are only reused when no override points to other zone files
+    if snapshot is not None and snapshot.config.paid_parking.data != config.paid_parking.data:
+        snapshot = None
+    worker_state['pricing'] = PricingModel.from_config(config)
+    worker_state['ppz'] = PaidParkingZones(config, zones=snapshot.zones if snapshot is not None else None)
+
+
+def trip_column(trips, param, dtype=float):
+    """
+    Read a trip parameter column, filling a missing column and empty values with the default.
+
+    :param trips: DataFrame chunk of the trip file.
+    :param param: Config node of the parameter (with 'value' and 'default').
+    :param dtype: Type of the resulting array.
+    :return: NumPy array of the parameter values, NaN where a float value has no default.
+    """
+    if param.value in trips:
+        raw = trips[param.value]
+        values = pd.to_numeric(raw, errors='coerce')
+    else:
+        raw = values = pd.Series(np.nan, index=trips.index)
+    if param.default is not None:
+        # Only empty values get the default, unparsable ones stay invalid
+        values = values.where(raw.notna(), param.default)
+    if dtype is float:
+        return values.to_numpy(dtype=float)
+    # Unparsable and non-integral values become -1, an identifier no transport or fuel type uses
+    values = values.where(values % 1 == 0).fillna(-1).astype(np.int64)
+    return values.astype(str).to_numpy() if dtype is str else values.to_numpy()
+
+
+def process_chunk(trips):
+    """
+    Calculate the savings of a chunk of trips, the same as /get_saving_for_travel_batch.
+
+    :param trips: DataFrame chunk of the trip file.
+    :return: The chunk with 'cost_difference' and 'co2_difference' columns added.
+    """
+    pricing = worker_state['pricing']
+    ppz = worker_state['ppz']
+    cfg_params = pricing.params
+    transport_types = trip_column(trips, cfg_params.transport_type, dtype=int)
+    distances = trip_column(trips, cfg_params.distance)
+    avg_consumptions = trip_column(trips, cfg_params.avg_consumption)
+    fuel_types = trip_column(trips, cfg_params.fuel_type, dtype=str)
+    fuel_prices = trip_column(trips, cfg_params.fuel_price)
+    lons = trip_column(trips, cfg_params.lon)
+    lats = trip_column(trips, cfg_params.lat)
+
+    transport_summary_cost = transport_summary_batch(transport_types, distances, pricing)
+    car_summary_cost = {'cost': np.full(len(trips), np.nan), 'co2': np.full(len(trips), np.nan)}
+    known_fuel = np.isin(fuel_types, list(pricing.car.co2_emission))
+    if known_fuel.any():
+        car_known = Car.cost_summary_batch(distances[known_fuel], avg_consumptions[known_fuel],
+                                           fuel_types[known_fuel], fuel_prices[known_fuel], lons[known_fuel],
+                                           lats[known_fuel], ppz, pricing)
+        car_summary_cost['cost'][known_fuel] = car_known['cost']
+        car_summary_cost['co2'][known_fuel] = car_known['co2']
+
+    savings = calculate_cost_co2_difference(car_summary_cost, transport_summary_cost)
+    return trips.assign(**savings)
+
+
+def read_chunks(path, chunksize):
+    """
+    Stream a csv or parquet trip file in DataFrame chunks.
+
+    :param path: Trip file, parquet if it ends with .parquet.
+    :param chunksize: Rows per chunk.
+    :return: Iterator of DataFrames.
+    """
+    if path.endswith('.parquet'):
+        parquet = import_pyarrow_parquet()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """
+    Appends result chunks to a csv or parquet file, parquet if the path ends with .parquet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_writer = None
+        self.header = True
+
+    def write(self, chunk):
+        if self.path.endswith('.parquet'):
+            import pyarrow
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = import_pyarrow_parquet().ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def import_pyarrow_parquet():
+    try:
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet trip logs require pyarrow (pip install pyarrow)") from e
+    return pyarrow.parquet
+
+
+def process_file(input_path, output_path, config, workers, chunksize, max_pending, progress=print):
+    """
+    Calculate savings for every trip of a trip file and write them to the output file.
+
+    :param input_path: Trip file, csv or parquet.
+    :param output_path: Result file, csv or parquet.
+    :param config: Application config.
+    :param workers: Worker processes, the chunks are processed in this process if 1.
+    :param chunksize: Rows per chunk.
+    :param max_pending: Chunks per worker read ahead of the writer.
+    :param progress: Function called with a progress line after every written chunk.
+    :return: Tuple of the number of rows and the elapsed seconds.
+    """
+    from omegaconf import OmegaConf
+    config = OmegaConf.to_container(config, resolve=True)
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def write(chunk):
+        nonlocal rows
+        writer.write(chunk)
+        rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        progress(f"{rows} rows, {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s")
+
+    try:
+        if workers <= 1:
+            init_worker(config)
+            for chunk in read_chunks(input_path, chunksize):
+                write(process_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config,)) as pool:
+                pending = collections.deque()
+                for chunk in read_chunks(input_path, chunksize):
+                    pending.append(pool.submit(process_chunk, chunk))
+                    if len(pending) >= workers * max_pending:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main():
+    from hydra import initialize, compose
+    parser = argparse.ArgumentParser(description="Calculate cost and CO2 savings for a csv or parquet trip log.")
+    parser.add_argument("input", help="Trip file, one trip per row with /get_saving_for_travel parameters as columns")
+    parser.add_argument("output", help="Result file, csv or parquet by extension")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--chunksize", type=int, default=None, help="Rows per chunk")
+    parser.add_argument("overrides", nargs="*", help="Config overrides, e.g. paid_parking.raster.enabled=true")
+    args = parser.parse_intermixed_args()
+
+    with initialize(version_base=None, config_path="conf", job_name="trip_logs"):
+        config = compose(config_name="config", overrides=args.overrides)
+    cfg = config.trip_logs
+    workers = args.workers or cfg.workers or os.cpu_count()
+    chunksize = args.chunksize or cfg.chunksize
+
+    rows, elapsed = process_file(args.input, args.output, config, workers, chunksize, cfg.max_pending,
+                                 progress=lambda line: print(line, file=sys.stderr, flush=True))
+    print(f"Processed {rows} trips in {elapsed:.1f}s with {workers} workers, {rows / max(elapsed, 1e-9):,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
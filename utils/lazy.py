@@ -0,0 +1,68 @@
+import threading
+import time
+
+
+class Lazy:
+    """
+    Proxy creating the wrapped object on first attribute access.
+
+    Heavy subsystems (zone geometries, station index, ...) are wrapped in Lazy at module level, so importing
+    the app does not load them and callers keep using the proxy as if it was the object itself.
+
+    Attributes:
+        name (str): Name used in startup reports.
+        load_time (float): Seconds spent in the factory, None before the object is created.
+
+    Methods:
+        get: Returns the wrapped object, creating it if needed.
+        reload: Creates the object again and replaces the current one.
+        loaded: Whether the object was already created.
+    """
+
+    def __init__(self, name, factory):
+        """
+        :param name: Name used in startup reports.
+        :param factory: Function without arguments creating the object.
+        """
+        self.__dict__.update(name=name, factory=factory, instance=None, load_time=None, lock=threading.Lock())
+
+    def get(self):
+        """
+        Returns the wrapped object, creating it on the first call. Thread safe.
+
+        :return: The wrapped object.
+        """
+        instance = self.instance
+        if instance is None:
+            with self.lock:
+                if self.instance is None:
+                    start = time.perf_counter()
+                    self.__dict__["instance"] = self.factory()
+                    self.__dict__["load_time"] = time.perf_counter() - start
+                instance = self.instance
+        return instance
+
+    def reload(self):
+        """
+        Creates a new wrapped object and replaces the current one. Callers keep using the current object
+        until the new one is ready.
+
+        :return: The new object.
+        """
+        with self.lock:
+            start = time.perf_counter()
+            instance = self.factory()
+            self.__dict__.update(instance=instance, load_time=time.perf_counter() - start)
+        return instance
+
+    def loaded(self):
+        """
+        :return: True if the object was already created.
+        """
+        return self.instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get(), name, value)
@@ -0,0 +1,395 @@
+"""
+Request and stage metrics in the Prometheus text format.
+
+The module keeps one process-wide registry, `metrics`. It records nothing until configured with
+metrics.enabled, so stage timers in the hot paths cost a single attribute check when metrics are off.
+
+With several worker processes every process writes its metrics to a JSON file in multiprocess_dir
+(at most every flush_interval seconds and on exit). /metrics merges the files of all processes: counters and
+histograms are summed, gauges report the maximum over the processes. When a worker exits, mark_process_dead
+folds its counters and histograms into an archive file and drops its gauges, so totals do not go backwards and
+a later process reusing the pid starts from zero.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRIC_HELP = {
+    "app_requests_total": ("counter", "Requests handled by route, method and status."),
+    "app_request_errors_total": ("counter", "Requests answered with an error status by route and status."),
+    "app_request_duration_seconds": ("histogram", "Request latency by route."),
+    "app_stage_duration_seconds": ("histogram", "Latency of internal stages of a request."),
+    "app_cache_lookups_total": ("counter", "Cache lookups by cache and result."),
+    "app_upstream_coalesced_total": ("counter", "Upstream calls that were sent (leader) or shared an in-flight one."),
+    "app_circuit_breaker_events_total": ("counter", "Upstream call results of the circuit breaker and openings."),
+    "app_air_quality_fallback_total": ("counter", "Failed air quality lookups served the last known value or not."),
+    "app_air_quality_history_records_total": ("counter", "Air quality history records by what happened to them."),
+    "app_air_quality_prefetch_snapshot_age_seconds": ("gauge", "Seconds since the prefetcher last published indices."),
+}
+
+NULL_STAGE = nullcontext()
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = "metrics.lock"
+
+
+class StageTimer:
+    """
+    Context manager observing its duration in app_stage_duration_seconds.
+    """
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe("app_stage_duration_seconds", time.perf_counter() - self.start, STAGE_BUCKETS,
+                              stage=self.stage)
+
+
+class Metrics:
+    """
+    Registry of counters, histograms and gauges.
+
+    Attributes:
+        enabled (bool): Whether metrics are recorded.
+        multiprocess_dir (str): Directory shared by worker processes, None for a single process.
+
+    Methods:
+        configure: Enable the registry from the metrics section of the config.
+        inc: Increase a counter.
+        observe: Record a value in a histogram.
+        stage: Context manager timing a stage of a request.
+        register_collector: Add a function reporting counters kept elsewhere.
+        register_gauge: Add a function reporting a current value.
+        unregister: Remove collectors and gauges, e.g. of an object that is replaced.
+        flush: Write the metrics of this process to multiprocess_dir.
+        render: Metrics of all processes in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.multiprocess_dir = None
+        self.flush_interval = 5
+        self.last_flush = 0
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self.gauges = []
+
+    def configure(self, config):
+        """
+        :param config: The metrics section of the configuration.
+        """
+        self.enabled = bool(config.enabled)
+        self.flush_interval = config.flush_interval
+        self.multiprocess_dir = config.multiprocess_dir if self.enabled else None
+        if self.multiprocess_dir:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            atexit.register(self.flush)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=REQUEST_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            counts = histogram[1]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            histogram[2] += value
+            histogram[3] += 1
+
+    def stage(self, name):
+        """
+        Time a stage of a request: `with metrics.stage("ppz.zone_lookup"): ...`
+
+        :param name: Stage name.
+        :return: Context manager, a shared no-op one when metrics are disabled.
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, name)
+
+    def register_collector(self, name, label, collect, **labels):
+        """
+        Report counters kept by another object, e.g. cache statistics, read at flush and scrape time.
+
+        :param name: Counter name.
+        :param label: Name of the label taking the keys returned by collect.
+        :param collect: Function returning a dictionary of label value to count.
+        :param labels: Constant labels.
+        :return: Registration to pass to unregister, None when metrics are disabled.
+        """
+        if self.enabled:
+            registration = (name, label, collect, labels)
+            self.collectors = self.collectors + [registration]
+            return registration
+
+    def register_gauge(self, name, read, **labels):
+        """
+        Report a current value kept by another object, e.g. the age of a snapshot, read at flush and scrape time.
+
+        :param name: Gauge name.
+        :param read: Function returning the value, or None when there is none yet.
+        :param labels: Constant labels.
+        :return: Registration to pass to unregister, None when metrics are disabled.
+        """
+        if self.enabled:
+            registration = (name, read, labels)
+            self.gauges = self.gauges + [registration]
+            return registration
+
+    def unregister(self, registrations):
+        """
+        Remove collectors and gauges, so a replaced object is neither reported nor kept alive by its functions.
+
+        :param registrations: Values returned by register_collector and register_gauge.
+        """
+        # Lists are replaced rather than changed, state() may be iterating the current ones in another thread
+        removed = [registration for registration in registrations if registration is not None]
+        self.collectors = [entry for entry in self.collectors if not any(entry is item for item in removed)]
+        self.gauges = [entry for entry in self.gauges if not any(entry is item for item in removed)]
+
+    def state(self):
+        """
+        :return: JSON serializable counters, histograms and gauges of this process, collectors included.
+        """
+        with self.lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, list(labels), list(buckets), list(counts), total, count]
+                          for (name, labels), (buckets, counts, total, count) in self.histograms.items()]
+        for name, label, collect, labels in self.collectors:
+            for label_value, value in collect().items():
+                counters.append([name, sorted({**labels, label: label_value}.items()), value])
+        gauges = []
+        for name, read, labels in self.gauges:
+            value = read()
+            if value is not None:
+                gauges.append([name, sorted(labels.items()), value])
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def flush(self, force=True):
+        """
+        Write the metrics of this process to multiprocess_dir.
+
+        :param force: Write even if flush_interval did not pass since the last write.
+        """
+        if not self.multiprocess_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_flush < self.flush_interval:
+            return
+        self.last_flush = now
+        path = os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.json")
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.state(), file)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """
+        :return: States of all processes, or of this process only without multiprocess_dir.
+        """
+        if not self.multiprocess_dir:
+            return [self.state()]
+        self.flush()
+        # Not while mark_process_dead moves a worker into the archive, its metrics would be counted twice or not at all
+        with locked(self.multiprocess_dir, exclusive=False):
+            paths = [os.path.join(self.multiprocess_dir, ARCHIVE_FILE)]
+            paths += glob.glob(os.path.join(self.multiprocess_dir, "metrics_*.json"))
+            states = [read_state(path) for path in paths]
+        return [state for state in states if state is not None]
+
+    def render(self):
+        """
+        :return: Metrics of all processes in the Prometheus text exposition format.
+        """
+        counters, histograms, gauges = merge_states(self.collect())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in METRIC_HELP:
+                metric_type, text = METRIC_HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+            described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def merge_states(states):
+    """
+    Merge process states: counters and histograms are summed, gauges report the maximum.
+
+    :param states: States as returned by Metrics.state.
+    :return: Tuple of counters, histograms and gauges, dictionaries keyed by (name, labels).
+    """
+    counters = {}
+    histograms = {}
+    gauges = {}
+    for state in states:
+        for name, labels, value in state["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total, count in state["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [buckets, [0] * len(buckets), 0.0, 0])
+            merged[1] = [a + b for a, b in zip(merged[1], counts)]
+            merged[2] += total
+            merged[3] += count
+        for name, labels, value in state.get("gauges", []):
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = max(gauges.get(key, value), value)
+    return counters, histograms, gauges
+
+
+def read_state(path):
+    """
+    :param path: State file written by Metrics.flush or mark_process_dead.
+    :return: The state or None if the file is missing or unreadable.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def locked(directory, exclusive):
+    """
+    Hold a shared or exclusive lock on the state files of a multiprocess directory.
+
+    :param directory: multiprocess_dir.
+    :param exclusive: Whether the state files are going to be changed.
+    """
+    import fcntl
+    with open(os.path.join(directory, LOCK_FILE), "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def mark_process_dead(directory, pid):
+    """
+    Fold the counters and histograms of an exited process into the archive and drop its gauges.
+
+    :param directory: multiprocess_dir.
+    :param pid: Process id of the exited process.
+    """
+    path = os.path.join(directory, f"metrics_{pid}.json")
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    with locked(directory, exclusive=True):
+        state = read_state(path)
+        if state is None:
+            return
+        archive = read_state(archive_path) or {"counters": [], "histograms": []}
+        counters, histograms, _ = merge_states([archive, state])
+        archive = {
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), buckets, counts, total, count]
+                           for (name, labels), (buckets, counts, total, count) in histograms.items()],
+        }
+        temporary = f"{archive_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(archive, file)
+        os.replace(temporary, archive_path)
+        os.remove(path)
+
+
+def remove_states(directory):
+    """
+    Remove the state files of all processes and the archive, e.g. left over from a previous run.
+
+    :param directory: multiprocess_dir.
+    """
+    for path in glob.glob(os.path.join(directory, "metrics_*.json")) + [os.path.join(directory, ARCHIVE_FILE)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def instrument_app(app):
+    """
+    Count and time every request of a Flask app and serve /metrics.
+
+    Does nothing when metrics are disabled.
+
+    :param app: Flask application.
+    """
+    if not metrics.enabled:
+        return
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.observe("app_request_duration_seconds", time.perf_counter() - start, route=route)
+        metrics.inc("app_requests_total", route=route, method=request.method, status=str(response.status_code))
+        if response.status_code >= 400:
+            metrics.inc("app_request_errors_total", route=route, status=str(response.status_code))
+        metrics.flush(force=False)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
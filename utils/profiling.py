@@ -0,0 +1,159 @@
+"""
+On-demand profiling of single requests.
+
+With profiling.enabled the app is wrapped in a WSGI middleware that runs cProfile around requests carrying the
+profiling header (or query flag) and saves a pstats dump of each of them. Only the most recent profiling.keep
+dumps are kept, they are listed on /profiles and downloaded from /profiles/<id>. Without profiling.enabled
+nothing is wrapped, so normal requests are served exactly as before.
+
+Inspect a dump with `python -m pstats <file>` or render it as a flame graph, e.g. with snakeviz or flameprof.
+"""
+import cProfile
+import itertools
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+
+class ProfileStore:
+    """
+    Directory of pstats dumps with JSON metadata, bounded to the most recent profiles.
+
+    The directory can be shared by several worker processes.
+
+    Attributes:
+        directory (str): Directory with the dumps.
+        keep (int): Number of most recent profiles kept.
+
+    Methods:
+        save: Store the profile of a request.
+        list: Metadata of the stored profiles, newest first.
+        path: Path of the pstats dump of a profile.
+    """
+
+    def __init__(self, directory, keep):
+        self.directory = directory
+        self.keep = keep
+        self.ids = itertools.count()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, profile_id, extension=".prof"):
+        return os.path.join(self.directory, f"{profile_id}{extension}")
+
+    def save(self, profiler, metadata):
+        """
+        :param profiler: Stopped cProfile.Profile.
+        :param metadata: JSON serializable description of the request.
+        :return: Id of the stored profile.
+        """
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self.ids)}"
+        profiler.dump_stats(self.path(profile_id))
+        with open(self.path(profile_id, ".json"), "w", encoding="utf-8") as file:
+            json.dump({"id": profile_id, **metadata}, file)
+        self.prune()
+        return profile_id
+
+    def list(self):
+        """
+        :return: List of profile metadata dictionaries, newest first.
+        """
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as file:
+                    profiles.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda profile: profile["created"], reverse=True)
+
+    def prune(self):
+        for profile in self.list()[self.keep:]:
+            for extension in (".prof", ".json"):
+                try:
+                    os.remove(self.path(profile["id"], extension))
+                except OSError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware profiling requests that ask for it with a header or a query flag.
+
+    The id of the saved profile is returned in the X-Profile-Id response header.
+    """
+
+    def __init__(self, wsgi_app, config, store):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.header = "HTTP_" + config.header.upper().replace("-", "_")
+        self.query_flag = config.query_flag
+
+    def requested(self, environ):
+        if environ.get(self.header):
+            return True
+        query = environ.get("QUERY_STRING", "")
+        return self.query_flag in query and self.query_flag in parse_qs(query, keep_blank_values=True)
+
+    def __call__(self, environ, start_response):
+        if not self.requested(environ):
+            return self.wsgi_app(environ, start_response)
+
+        response_headers = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            response_headers[:] = [status, headers, exc_info]
+            return lambda data: None
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.wsgi_app(environ, capture_start_response)
+            try:
+                body = b"".join(response)
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        status, headers, exc_info = response_headers
+        profile_id = self.store.save(profiler, {
+            "created": time.time(),
+            "method": environ.get("REQUEST_METHOD"),
+            "path": environ.get("PATH_INFO"),
+            "query": environ.get("QUERY_STRING", ""),
+            "status": status,
+            "duration": duration,
+        })
+        start_response(status, headers + [("X-Profile-Id", profile_id)], exc_info)
+        return [body]
+
+
+def enable_profiling(app, config):
+    """
+    Wrap a Flask app in the profiling middleware and add the /profiles routes.
+
+    Does nothing when profiling is disabled.
+
+    :param app: Flask application.
+    :param config: The profiling section of the configuration.
+    """
+    if not config.enabled:
+        return
+    from flask import jsonify, send_from_directory
+
+    store = ProfileStore(config.directory, config.keep)
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, config, store)
+
+    @app.route("/profiles", methods=["GET"])
+    def list_profiles():
+        return jsonify(store.list())
+
+    @app.route("/profiles/<profile_id>", methods=["GET"])
+    def download_profile(profile_id):
+        return send_from_directory(os.path.abspath(store.directory), f"{profile_id}.prof", as_attachment=True)
@@ -0,0 +1,49 @@
+import threading
+
+from utils.snapshot import file_signatures
+
+
+class DataWatcher:
+    """
+    Background thread calling a function when any of the watched files changes.
+
+    Files are compared by size and modification time. Changes are reported only when all files exist, so a
+    file being replaced is not picked up half way.
+
+    Attributes:
+        files (list): Watched file paths.
+        interval (float): Seconds between checks.
+
+    Methods:
+        start: Start watching.
+        stop: Stop watching.
+    """
+
+    def __init__(self, files, interval, on_change):
+        """
+        :param files: File paths to watch.
+        :param interval: Seconds between checks.
+        :param on_change: Function without arguments called after a change.
+        """
+        self.files = list(files)
+        self.interval = interval
+        self.on_change = on_change
+        self.signatures = file_signatures(self.files)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="data-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            signatures = file_signatures(self.files)
+            if signatures is None or signatures == self.signatures:
+                continue
+            self.signatures = signatures
+            self.on_change()
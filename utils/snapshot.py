@@ -0,0 +1,147 @@
+"""
+Prebuilt runtime snapshot for a fast cold start.
+
+The snapshot is a single uncompressed .npz file with the resolved config, the paid parking zone geometries
+as WKB, the air quality station coordinates and the average traffic matrix. Loading it needs neither hydra,
+geopandas, pandas nor parsing of the source files. The snapshot records the size and modification time of
+every source file and is ignored when any of them changed or when its format version differs.
+
+Usage:
+    python -m utils.snapshot
+"""
+import json
+import os
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = "conf/runtime_snapshot.npz"
+CONFIG_FILE = "conf/config.yaml"
+
+
+def source_files(config):
+    """
+    List the files the snapshot is built from.
+
+    :param config: Configuration object.
+    :return: List of file paths.
+    """
+    zone_sources = config.paid_parking.data
+    zone_sources = [zone_sources] if isinstance(zone_sources, str) else list(zone_sources)
+    files = [CONFIG_FILE, config.air_pollution.sensor_list_data, config.traffic.average_traffic_file]
+    for source in zone_sources:
+        if os.path.isdir(source):
+            files.extend(os.path.join(source, name) for name in sorted(os.listdir(source)))
+        else:
+            files.append(source)
+    return files
+
+
+def file_signatures(files):
+    """
+    :param files: List of file paths.
+    :return: List of [path, size, mtime_ns], None for missing files.
+    """
+    signatures = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signatures.append([path, stat.st_size, stat.st_mtime_ns])
+    return signatures
+
+
+def build_snapshot(config, path=SNAPSHOT_FILE):
+    """
+    Build the runtime snapshot from the source files referenced by the config.
+
+    :param config: Configuration object.
+    :param path: Target .npz file.
+    """
+    import shapely
+    from omegaconf import OmegaConf
+    from air_quality.air_data import AirQuality
+    from paid_parking_zones.calculator import PaidParkingZones
+    from traffic_intensity.traffic import TrafficIntensity
+
+    gdf_zones = PaidParkingZones.load_zones(config.paid_parking.data)
+    wkb = shapely.to_wkb(gdf_zones.geometry.values.to_numpy())
+    with open(config.air_pollution.sensor_list_data, "r", encoding="utf-8") as file:
+        station_ids, station_coords = AirQuality.parse_stations(json.load(file))
+    traffic_matrix = TrafficIntensity(config).matrix
+
+    np.savez(path,
+             version=np.array(SNAPSHOT_VERSION),
+             sources=np.array(json.dumps(file_signatures(source_files(config)))),
+             config=np.array(OmegaConf.to_yaml(config)),
+             zone_wkb=np.frombuffer(b"".join(wkb), dtype=np.uint8),
+             zone_wkb_offsets=np.cumsum([0] + [len(geometry) for geometry in wkb]),
+             zone_names=np.array(gdf_zones["Podstrefa"].to_numpy(), dtype=str),
+             zone_crs=np.array(gdf_zones.crs.to_wkt() if gdf_zones.crs is not None else ""),
+             station_ids=station_ids,
+             station_coords=station_coords,
+             traffic_matrix=traffic_matrix)
+
+
+class RuntimeSnapshot:
+    """
+    Data loaded from the runtime snapshot.
+
+    Attributes:
+        config (Config): Resolved configuration.
+        zones (tuple): (geometries, subzone names, crs) for PaidParkingZones.
+        stations (tuple): (station_ids, station_coords) for AirQuality.
+        traffic_matrix (numpy.ndarray): (7, 24) matrix for TrafficIntensity.
+
+    Methods:
+        load: Load a snapshot if it exists and is up to date.
+    """
+
+    def __init__(self, data):
+        from omegaconf import OmegaConf
+        self.data = data
+        self.config = OmegaConf.create(str(data["config"]))
+        OmegaConf.set_struct(self.config, True)
+        self.stations = (data["station_ids"], data["station_coords"])
+        self.traffic_matrix = data["traffic_matrix"]
+
+    @property
+    def zones(self):
+        import shapely
+        wkb = self.data["zone_wkb"].tobytes()
+        offsets = self.data["zone_wkb_offsets"]
+        geometries = shapely.from_wkb([wkb[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+        crs = str(self.data["zone_crs"]) or None
+        return geometries, self.data["zone_names"].astype(object), crs
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_FILE):
+        """
+        Load a snapshot if it exists, has the current format version and its source files did not change.
+
+        :param path: Snapshot file.
+        :return: RuntimeSnapshot or None.
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as npz:
+            data = {key: npz[key] for key in npz.files}
+        if int(data["version"]) != SNAPSHOT_VERSION:
+            return None
+        signatures = json.loads(str(data["sources"]))
+        if file_signatures([path for path, _, _ in signatures]) != signatures:
+            return None
+        return cls(data)
+
+
+def main():
+    from hydra import initialize, compose
+    with initialize(version_base=None, config_path="../conf", job_name="snapshot"):
+        config = compose(config_name="config")
+    build_snapshot(config)
+    print(f"Runtime snapshot written to {SNAPSHOT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Startup time report: where import and initialization time of the app goes.
+
+Usage:
+    python -m utils.startup_report [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+
+def import_times(module="main"):
+    """
+    Measure import time of the packages imported by a module in a fresh interpreter (python -X importtime).
+
+    :param module: Module to import.
+    :return: List of (package, cumulative seconds) for direct imports of the module, slowest first.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Every nesting level is indented by two more spaces, only direct imports of the module are counted
+        if len(name) - len(name.lstrip()) == 3:
+            times.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(times, key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where app import and init time goes.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    print(f"{'import (inside main)':<50}{'seconds':>10}")
+    for name, seconds in import_times()[:args.top]:
+        print(f"{name:<50}{seconds:>10.3f}")
+
+    start = time.perf_counter()
+    import main as app_module
+    import_seconds = time.perf_counter() - start
+    print(f"\n{'stage':<50}{'seconds':>10}")
+    print(f"{'import main':<50}{import_seconds:>10.3f}")
+    print(f"{'runtime snapshot used':<50}{str(app_module.snapshot is not None):>10}")
+    for dataset in app_module.datasets:
+        dataset.get()
+        print(f"{'init ' + dataset.name:<50}{dataset.load_time:>10.3f}")
+    print(f"{'total':<50}{time.perf_counter() - start:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
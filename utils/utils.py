@@ -1,3 +1,8 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
 
 
 def calculate_cost_co2_difference(car_calculation, selected_transport_calculation):
@@ -6,4 +11,20 @@ def calculate_cost_co2_difference(car_calculation, selected_transport_calculatio
         co2_difference = car_calculation['co2'] - selected_transport_calculation['co2']
         return {'cost_difference': cost_difference, 'co2_difference': co2_difference}
     else:
-        return None  # Handle the case where one or both dictionaries don't have the expected keys
\ No newline at end of file
+        return None  # Handle the case where one or both dictionaries don't have the expected keys
+
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """
+    Calculate great-circle distances between points given in degrees (scalars or arrays).
+
+    :param lat1: Latitude of the first point(s).
+    :param lon1: Longitude of the first point(s).
+    :param lat2: Latitude of the second point(s).
+    :param lon2: Longitude of the second point(s).
+    :return: Distances in kilometers.
+    """
+    lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2_rad - lat1_rad) / 2) ** 2 + \
+        np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin((lon2_rad - lon1_rad) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
@@ -0,0 +1,16 @@
+"""
+Production entry point, served by gunicorn with the settings from gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the datasets are loaded here once, in the master process, and shared copy-on-write by the
+forked workers.
+"""
+import gc
+
+from main import app, load_datasets
+
+load_datasets()
+# Objects created so far live as long as the process, keeping them out of garbage collection stops the
+# collector from touching (and so copying) their memory pages in every worker
+gc.freeze()